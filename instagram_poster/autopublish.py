@@ -22,6 +22,8 @@ _LOG_FILE = _PROJECT_ROOT / ".autopublish_log.json"
 _STOPPED_FILE = _PROJECT_ROOT / ".autopublish_stopped"
 _REEL_LOCK_FILE = _PROJECT_ROOT / ".autopublish_reel.lock"
 _STORY_REUSE_LOCK_FILE = _PROJECT_ROOT / ".autopublish_story_reuse.lock"
+_ARCHIVE_STAMP_FILE = _PROJECT_ROOT / ".autopublish_archive_last"  # mtime = último arquivo automático
+_ARCHIVE_INTERVAL_SEC = 24 * 3600
 _MEDIA_LOCK_STALE_SEC = 120  # lock com mais de 2 min é considerado órfão
 
 
@@ -59,6 +61,8 @@ def _file_lock(lock_path: Path) -> Generator[bool, None, None]:
                 pass
 
 
+_DUE_WAKE_SLACK_SEC = 0.5  # acordar ligeiramente depois da hora agendada (Time <= agora já é verdade)
+
 _REEL_MARK_USED_RETRIES = 3
 _REEL_MARK_USED_RETRY_DELAY_SEC = 2
 
@@ -72,7 +76,7 @@ _last_check: Optional[datetime] = None
 _started_at: Optional[datetime] = None
 _total_published: int = 0
 _total_errors: int = 0
-_last_reel_row_indices: Optional[frozenset] = None
+_last_reel_post_ids: Optional[frozenset] = None
 _last_reel_at: Optional[datetime] = None  # último Reel (auto ou reuse) — usado para intervalo de reuse
 _last_story_reuse_at: Optional[datetime] = None  # última Story (com post ou reuse)
 _current_interval_minutes: Optional[int] = None
@@ -280,6 +284,7 @@ def _add_log_entry(
             entry["comment_id"] = comment_id
         if post_data:
             entry["row"] = post_data.get("row_index")
+            entry["post_id"] = post_data.get("post_id")
             entry["date"] = post_data.get("date", "")
             entry["time"] = post_data.get("time", "")
             entry["quote"] = post_data.get("image_text", "")
@@ -391,6 +396,16 @@ def run_once() -> Optional[bool]:
     return success
 
 
+def _deferred_by_api_usage(what: str) -> bool:
+    """Tráfego não crítico: True (adiar) se o uso da Graph API estiver perto do limite (ig_usage)."""
+    from instagram_poster import ig_usage
+    reason = ig_usage.defer_reason()
+    if reason:
+        logger.info("Autopublish: %s adiado(a) — %s", what, reason)
+        return True
+    return False
+
+
 def try_publish_auto_reel() -> bool:
     """
     Se houver pelo menos 5 posts publicados que nunca foram usados em nenhum Reel,
@@ -399,7 +414,7 @@ def try_publish_auto_reel() -> bool:
     O Reel automático usa apenas posts nunca usados em Reels (allow_reuse=False).
     Usa lock entre processos para evitar duplicados.
     """
-    global _last_reel_row_indices
+    global _last_reel_post_ids
     with _file_lock(_REEL_LOCK_FILE) as lock_ok:
         if not lock_ok:
             logger.info("Outro processo a publicar Reel; a ignorar para evitar duplicado.")
@@ -409,7 +424,7 @@ def try_publish_auto_reel() -> bool:
 
 def _try_publish_auto_reel_impl() -> bool:
     """Implementação de try_publish_auto_reel (chamada dentro do lock)."""
-    global _last_reel_row_indices
+    global _last_reel_post_ids
     try:
         from instagram_poster.reel_generator import (
             create_reel_video,
@@ -428,11 +443,11 @@ def _try_publish_auto_reel_impl() -> bool:
     posts = get_posts_for_reel(n=5, allow_reuse=False)
     if len(posts) < 5:
         return False
-    current_indices = frozenset(p.get("row_index") for p in posts if p.get("row_index") is not None)
-    if len(current_indices) < 5:
+    current_ids = frozenset(p.get("post_id") for p in posts if p.get("post_id"))
+    if len(current_ids) < 5:
         return False
     with _lock:
-        if _last_reel_row_indices == current_indices:
+        if _last_reel_post_ids == current_ids:
             return False
 
     # Áudio aleatório da pasta MUSIC
@@ -457,11 +472,11 @@ def _try_publish_auto_reel_impl() -> bool:
         video_url = upload_video_bytes(video_bytes)
         creation_id = ig_client.create_reel(video_url=video_url, caption=caption)
         media_id = ig_client.publish_media(creation_id, max_wait=240)
-        row_indices = [p.get("row_index") for p in posts if p.get("row_index") is not None]
+        post_ids = [p.get("post_id") for p in posts if p.get("post_id")]
         last_err = None
         for attempt in range(1, _REEL_MARK_USED_RETRIES + 1):
             try:
-                mark_posts_used_in_reel(row_indices)
+                mark_posts_used_in_reel(post_ids)
                 logger.info("Reel: posts marcados como usados (tentativa %s)", attempt)
                 break
             except Exception as e:
@@ -470,11 +485,11 @@ def _try_publish_auto_reel_impl() -> bool:
                 if attempt < _REEL_MARK_USED_RETRIES:
                     _time.sleep(_REEL_MARK_USED_RETRY_DELAY_SEC)
         else:
-            msg = f"Reel publicado no Instagram mas falha a gravar posts usados em reels_used_rows.json após {_REEL_MARK_USED_RETRIES} tentativas. Atualiza manualmente assets/reels_used_rows.json com as linhas {row_indices} para evitar Reel duplicado. Erro: {last_err}"
+            msg = f"Reel publicado no Instagram mas falha a gravar posts usados em reels_used_posts.json após {_REEL_MARK_USED_RETRIES} tentativas. Atualiza manualmente assets/reels_used_posts.json com os post_id {post_ids} para evitar Reel duplicado. Erro: {last_err}"
             logger.error(msg)
             _add_log_entry(False, msg, entry_type="error")
         with _lock:
-            _last_reel_row_indices = current_indices
+            _last_reel_post_ids = current_ids
             _last_reel_at = datetime.now()
         _add_log_entry(
             True,
@@ -534,6 +549,8 @@ def _try_publish_reel_reuse_impl() -> bool:
         last = _last_reel_at
     if last is not None and (now - last).total_seconds() < interval_minutes * 60:
         return False
+    if _deferred_by_api_usage("Reel reuse agendado"):
+        return False
 
     posts = get_posts_for_reel(n=5, allow_reuse=True)
     if len(posts) < 5:
@@ -590,6 +607,31 @@ def try_publish_story_reuse_scheduled() -> bool:
         return _try_publish_story_reuse_impl()
 
 
+def try_archive_scheduled() -> bool:
+    """
+    Arquivo automático (SHEETS_ARCHIVE_AFTER_DAYS > 0): no máximo uma vez por dia, move os posts
+    publicados antigos para o separador de arquivo. Devolve True se arquivou alguma linha.
+    """
+    from instagram_poster.config import get_sheets_archive_after_days
+    days = get_sheets_archive_after_days()
+    if days <= 0:
+        return False
+    try:
+        if _time.time() - _ARCHIVE_STAMP_FILE.stat().st_mtime < _ARCHIVE_INTERVAL_SEC:
+            return False
+    except OSError:
+        pass
+    from instagram_poster.scheduler import run_archive
+    ok, message, n = run_archive(days)
+    if not ok:
+        logger.info("Autopublish: arquivo adiado: %s", message)
+        return False
+    _ARCHIVE_STAMP_FILE.touch()
+    if n:
+        _add_log_entry(None, f"Arquivo: {message}", entry_type="check")
+    return n > 0
+
+
 def _try_publish_story_reuse_impl() -> bool:
     """Implementação de try_publish_story_reuse_scheduled (chamada dentro do lock)."""
     global _last_story_reuse_at
@@ -617,6 +659,8 @@ def _try_publish_story_reuse_impl() -> bool:
         last = now - timedelta(hours=25)
     if (now - last).total_seconds() < interval_minutes * 60:
         return False
+    if _deferred_by_api_usage("Story reuse agendada"):
+        return False
 
     # Todos os posts publicados com imagem (não apenas os últimos 30); reuse usa o histórico todo
     posts = get_published_posts_with_image()
@@ -626,9 +670,10 @@ def _try_publish_story_reuse_impl() -> bool:
     # Evitar reutilizar um post que já foi usado numa Story nas últimas 48 h (evita "cópias da mesma")
     cutoff = now - timedelta(hours=48)
     story_log = [e for e in get_log() if e.get("type") == "story"]
-    recently_used_rows = set()
+    recently_used_ids = set()
+    recently_used_rows = set()  # entradas antigas do log, só com o número da linha
     for e in story_log:
-        if e.get("row") is None:
+        if e.get("post_id") is None and e.get("row") is None:
             continue
         ts = e.get("timestamp")
         if isinstance(ts, str):
@@ -637,9 +682,15 @@ def _try_publish_story_reuse_impl() -> bool:
             except (ValueError, TypeError):
                 ts = now
         if (ts or now) >= cutoff:
-            recently_used_rows.add(e.get("row"))
-    recently_used_rows = frozenset(recently_used_rows)
-    posts_available = [p for p in posts if p.get("row_index") not in recently_used_rows]
+            if e.get("post_id"):
+                recently_used_ids.add(e["post_id"])
+            else:
+                recently_used_rows.add(e.get("row"))
+    posts_available = [
+        p for p in posts
+        if p.get("post_id") not in recently_used_ids
+        and not (p.tab is None and p.get("row_index") in recently_used_rows)
+    ]
     if not posts_available:
         logger.info("Autopublish Story reuse: todos os posts recentes já usados em Story; a saltar para evitar duplicado.")
         return False
@@ -683,6 +734,12 @@ def _loop(interval_minutes: int):
     """Loop interno do thread de background."""
     logger.info("Autopublish: thread iniciado (intervalo=%dmin)", interval_minutes)
     interval_secs = interval_minutes * 60
+    try:
+        # Escritas no Sheet que ficaram em fila (ex.: antes de um reinício) são aplicadas em background
+        from instagram_poster import sheet_write_queue
+        sheet_write_queue.start_worker()
+    except Exception:
+        logger.exception("Autopublish: erro ao iniciar fila de escritas do Sheet")
     while not _stop_event.is_set():
         # Registar cada ciclo no log para o historico actualizar sempre no intervalo definido
         cycle_start = datetime.now()
@@ -698,6 +755,13 @@ def _loop(interval_minutes: int):
             # publicacoes duplicadas. Publicar no maximo 1 post por ciclo e esperar o intervalo.
         except Exception:
             logger.exception("Autopublish: erro no loop")
+        try:
+            from instagram_poster import prestage
+            staged = prestage.stage_upcoming()
+            if staged:
+                _add_log_entry(None, f"Pré-preparado(s) {staged} post(s) para publicação à hora", entry_type="check")
+        except Exception:
+            logger.exception("Autopublish: erro na pré-preparação de posts")
         try:
             from instagram_poster.config import get_autopublish_reel_every_5
             if get_autopublish_reel_every_5():
@@ -708,6 +772,10 @@ def _loop(interval_minutes: int):
             try_publish_reel_reuse_scheduled()
         except Exception:
             logger.exception("Autopublish: erro ao tentar Reel reuse agendado")
+        try:
+            try_archive_scheduled()
+        except Exception:
+            logger.exception("Autopublish: erro no arquivo automático")
         try:
             try_publish_story_reuse_scheduled()
         except Exception:
@@ -727,10 +795,37 @@ def _loop(interval_minutes: int):
                     logger.info("Autopublish: autoresposta a %d comentário(s)", result["replied"])
         except Exception:
             logger.exception("Autopublish: erro ao executar autoresposta a comentários")
-        _stop_event.wait(timeout=interval_secs)
+        _wait_for_next_cycle(interval_secs)
     logger.info("Autopublish: thread parado")
 
 
+def _wait_for_next_cycle(interval_secs: float) -> None:
+    """
+    Espera pelo próximo ciclo. Se um post pré-preparado (prestage) tiver hora antes disso, acorda
+    nesse segundo e publica-o (run_once), voltando depois a esperar pelo ciclo.
+    """
+    deadline = _time.monotonic() + interval_secs
+    while not _stop_event.is_set():
+        remaining = deadline - _time.monotonic()
+        if remaining <= 0:
+            return
+        try:
+            from instagram_poster import prestage
+            due_in = prestage.seconds_until_next_due()
+        except Exception:
+            logger.exception("Autopublish: erro a ler posts pré-preparados")
+            due_in = None
+        if due_in is None or due_in + _DUE_WAKE_SLACK_SEC >= remaining:
+            _stop_event.wait(timeout=remaining)
+            return
+        if _stop_event.wait(timeout=due_in + _DUE_WAKE_SLACK_SEC):
+            return
+        try:
+            run_once()
+        except Exception:
+            logger.exception("Autopublish: erro ao publicar post pré-preparado")
+
+
 def start_background_loop(interval_minutes: int = 5) -> bool:
     """Inicia o thread de background. Retorna True se iniciou, False se ja estava a correr."""
     global _thread, _started_at, _current_interval_minutes, _log, _total_published, _total_errors
@@ -12,7 +12,17 @@ import time as _time
 from datetime import datetime, timezone
 from pathlib import Path
 
-from instagram_poster.ig_client import get_comments, get_media_ids, get_my_id, reply_to_comment
+import requests
+
+from instagram_poster import ig_usage
+from instagram_poster.ig_client import (
+    get_comments_many,
+    get_media_ids,
+    get_media_with_comments,
+    get_my_id,
+    parse_timestamp,
+    reply_to_comment,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -67,15 +77,7 @@ def _save_last_run_timestamp(dt: datetime) -> None:
 
 def _parse_comment_timestamp(comment: dict) -> datetime | None:
     """Extrai e parseia o timestamp do comentário (formato ISO da API)."""
-    ts = comment.get("timestamp")
-    if not ts:
-        return None
-    try:
-        s = str(ts).replace("Z", "+00:00").replace("+0000", "+00:00")
-        dt = datetime.fromisoformat(s)
-        return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
-    except (ValueError, TypeError):
-        return None
+    return parse_timestamp(comment.get("timestamp"))
 
 
 def _normalize_comment_id(comment_id: str) -> str:
@@ -133,6 +135,22 @@ def _is_reply_not_top_level(comment: dict) -> bool:
     return bool(comment.get("parent_id") or comment.get("parent") or comment.get("reply_to"))
 
 
+def _fetch_comments_by_media(max_media: int, last_run: datetime | None) -> dict:
+    """
+    Comentários dos max_media posts mais recentes: {media_id: lista de comentários ou a excepção}.
+    Um só pedido com expansão de campos (get_media_with_comments), seguindo a paginação só até
+    comentários anteriores à última verificação. Se a API recusar a expansão (ex.: resposta demasiado
+    grande), lista os posts e lê os comentários de cada um (em simultâneo se o aiohttp estiver instalado).
+    """
+    try:
+        media = get_media_with_comments(limit=max_media, stop_before=last_run)
+        return {m["id"]: m["comments"] for m in media if m.get("id")}
+    except requests.HTTPError as e:
+        logger.info("Expansão de comentários recusada pela API (%s); a ler comentários por post", e)
+    media_ids = get_media_ids(limit=max_media)
+    return get_comments_many(media_ids, stop_before=last_run)
+
+
 def run_autoreply(
     message: str = _DEFAULT_MESSAGE,
     max_media: int = 10,
@@ -144,8 +162,14 @@ def run_autoreply(
     - Espera pela resposta da API antes de avançar para o próximo.
     - Pausa configurável entre respostas (default 3s).
     Máximo _MAX_REPLIES_PER_RUN respostas por execução.
+    Tráfego não crítico (ig_usage): as pausas crescem com o uso da API e a execução é adiada
+    (devolve "deferred" com o motivo) quando o uso se aproxima do limite.
     """
     _migrate_from_dir_format()
+    deferred = ig_usage.defer_reason()
+    if deferred:
+        logger.info("Autoresposta adiada: %s", deferred)
+        return {"replied": 0, "skipped": 0, "errors": [], "log": [f"Adiada: {deferred}."], "replied_items": [], "media_count": 0, "comments_total": 0, "deferred": deferred}
     run_start = datetime.now(timezone.utc)
     last_run = _load_last_run_timestamp()
 
@@ -157,11 +181,12 @@ def run_autoreply(
     replied_to_this_run: set[str] = set()
 
     try:
-        media_ids = get_media_ids(limit=max_media)
+        comments_by_media = _fetch_comments_by_media(max_media, last_run)
+        media_ids = list(comments_by_media)
         log.append(f"Verificados {len(media_ids)} post(s).")
     except Exception as e:
         errors.append(f"Erro ao obter posts: {e}")
-        return {"replied": 0, "skipped": 0, "errors": errors, "log": [f"Erro: {e}"], "replied_items": [], "media_count": 0, "comments_total": 0}
+        return {"replied": 0, "skipped": 0, "errors": errors, "log": [f"Erro: {e}"], "replied_items": [], "media_count": 0, "comments_total": 0, "deferred": None}
 
     comments_total = 0
     processed_ids: set[str] = set()
@@ -170,11 +195,12 @@ def run_autoreply(
         if replied_count >= _MAX_REPLIES_PER_RUN:
             log.append(f"Limite de {_MAX_REPLIES_PER_RUN} respostas por execução atingido.")
             break
-        try:
-            comments = get_comments(media_id)
-        except Exception as e:
-            errors.append(f"Erro ao obter comentários do post {media_id}: {e}")
-            log.append(f"Post {media_id}: erro — {e}")
+        if deferred:
+            break
+        comments = comments_by_media.get(media_id) or []
+        if isinstance(comments, BaseException):
+            errors.append(f"Erro ao obter comentários do post {media_id}: {comments}")
+            log.append(f"Post {media_id}: erro — {comments}")
             continue
 
         comments_total += len(comments)
@@ -219,6 +245,12 @@ def run_autoreply(
                 skipped_count += 1
                 continue
 
+            deferred = ig_usage.defer_reason()
+            if deferred:
+                log.append(f"Adiada a meio: {deferred}.")
+                logger.info("Autoresposta adiada a meio: %s", deferred)
+                break
+
             if not _try_claim_replied_id(comment_id):
                 skipped_count += 1
                 log.append(f"  — Ignorado (já reservado/respondido): @{comment.get('username', '?')}")
@@ -234,14 +266,16 @@ def run_autoreply(
                 log.append(f"  ✓ Respondido: @{username} «{text_preview}...»")
                 logger.info("Autoresposta enviada ao comentário %s", comment_id)
                 if delay_seconds > 0:
-                    _time.sleep(delay_seconds)
+                    _time.sleep(delay_seconds * ig_usage.slowdown_factor())
             except Exception as e:
                 _remove_replied_id(comment_id)
                 replied_to_this_run.discard(comment_id)
                 errors.append(f"Erro ao responder ao comentário {comment_id}: {e}")
                 log.append(f"  ✗ Erro @{username}: {e}")
 
-    _save_last_run_timestamp(run_start)
+    if not deferred:
+        # Se adiada, os comentários por processar continuam posteriores à última verificação
+        _save_last_run_timestamp(run_start)
     if not log:
         log.append("Nenhum comentário encontrado nos posts verificados.")
 
@@ -253,4 +287,5 @@ def run_autoreply(
         "replied_items": replied_items,
         "media_count": len(media_ids),
         "comments_total": comments_total,
+        "deferred": deferred,
     }
@@ -46,6 +46,8 @@ GOOGLE_CREDENTIALS_PATH: str = _optional("GOOGLE_CREDENTIALS_PATH", "")
 IG_SHEET_ID: str = _optional("IG_SHEET_ID", "1UBdukuHNvpfdcyBxKIQAt5pRIKFrGLYI6tZdYhfYCig")
 # Nome do separador/aba (ex.: Folha1)
 SHEET_TAB_NAME: str = _optional("SHEET_TAB_NAME", "Folha1")
+# Separador para onde são movidos os posts publicados antigos (criado se não existir)
+SHEET_ARCHIVE_TAB_NAME: str = _optional("SHEET_ARCHIVE_TAB_NAME", "Arquivo")
 
 
 def get_ig_sheet_id() -> str:
@@ -53,6 +55,163 @@ def get_ig_sheet_id() -> str:
     return get_runtime_override("IG_SHEET_ID") or IG_SHEET_ID
 
 
+# Cache do Sheet: segundos durante os quais o snapshot lido (get_all_values) é reutilizado. 0 = sem cache.
+SHEETS_CACHE_TTL_SECONDS: str = _optional("SHEETS_CACHE_TTL_SECONDS", "60")
+
+
+def get_sheets_cache_ttl_seconds() -> float:
+    """TTL (segundos) do snapshot do Sheet partilhado no processo. Valores inválidos -> 60."""
+    val = get_runtime_override("SHEETS_CACHE_TTL_SECONDS") or os.getenv("SHEETS_CACHE_TTL_SECONDS") or SHEETS_CACHE_TTL_SECONDS
+    try:
+        return max(0.0, float(val))
+    except (ValueError, TypeError):
+        return 60.0
+
+
+# Antes de reler o Sheet após o TTL, consultar o modifiedTime/version do ficheiro no Drive (pedido leve)
+SHEETS_CHANGE_DETECTION: str = _optional("SHEETS_CHANGE_DETECTION", "true")
+
+
+def get_sheets_change_detection_enabled() -> bool:
+    """Se True, o snapshot expirado continua a ser usado enquanto o ficheiro no Drive não mudar."""
+    val = get_runtime_override("SHEETS_CHANGE_DETECTION") or os.getenv("SHEETS_CHANGE_DETECTION") or SHEETS_CHANGE_DETECTION
+    return val.lower() in ("true", "1", "yes", "on")
+
+
+# Espelho local (SQLite) do Sheet — opcional
+SHEETS_LOCAL_MIRROR: str = _optional("SHEETS_LOCAL_MIRROR", "false")
+SHEETS_LOCAL_MIRROR_PATH: str = _optional("SHEETS_LOCAL_MIRROR_PATH", "")
+
+
+def get_sheets_local_mirror_enabled() -> bool:
+    """Se True, o conteúdo do Sheet é espelhado numa base SQLite local (ver local_store)."""
+    val = get_runtime_override("SHEETS_LOCAL_MIRROR") or os.getenv("SHEETS_LOCAL_MIRROR") or SHEETS_LOCAL_MIRROR
+    return val.lower() in ("true", "1", "yes", "on")
+
+
+def get_sheets_local_mirror_path() -> Path:
+    """Caminho da base SQLite do espelho (default: .sheet_mirror.db na raiz do projeto)."""
+    raw = get_runtime_override("SHEETS_LOCAL_MIRROR_PATH") or os.getenv("SHEETS_LOCAL_MIRROR_PATH") or SHEETS_LOCAL_MIRROR_PATH
+    return Path(raw.strip()) if raw and raw.strip() else _env_root / ".sheet_mirror.db"
+
+
+# Limite de pedidos à API do Sheets (token bucket partilhado entre processos). 0 = sem limite.
+# A quota da Google é de 60 leituras e 60 escritas por minuto por utilizador; os defaults deixam margem.
+SHEETS_READ_REQUESTS_PER_MINUTE: str = _optional("SHEETS_READ_REQUESTS_PER_MINUTE", "50")
+SHEETS_WRITE_REQUESTS_PER_MINUTE: str = _optional("SHEETS_WRITE_REQUESTS_PER_MINUTE", "50")
+
+
+def _get_requests_per_minute(key: str, default_str: str) -> float:
+    val = get_runtime_override(key) or os.getenv(key) or default_str
+    try:
+        return max(0.0, float(val))
+    except (ValueError, TypeError):
+        return 50.0
+
+
+def get_sheets_read_requests_per_minute() -> float:
+    """Leituras por minuto permitidas ao Sheets (todos os processos). 0 = sem limite."""
+    return _get_requests_per_minute("SHEETS_READ_REQUESTS_PER_MINUTE", SHEETS_READ_REQUESTS_PER_MINUTE)
+
+
+def get_sheets_write_requests_per_minute() -> float:
+    """Escritas por minuto permitidas ao Sheets (todos os processos). 0 = sem limite."""
+    return _get_requests_per_minute("SHEETS_WRITE_REQUESTS_PER_MINUTE", SHEETS_WRITE_REQUESTS_PER_MINUTE)
+
+
+# Arquivo automático: posts publicados há mais de N dias passam para SHEET_ARCHIVE_TAB_NAME (uma vez por dia).
+# 0 = desactivado (arquivar só manualmente com scripts/archive_published_rows.py).
+SHEETS_ARCHIVE_AFTER_DAYS: str = _optional("SHEETS_ARCHIVE_AFTER_DAYS", "0")
+
+
+def get_sheets_archive_after_days() -> int:
+    """Dias após a publicação a partir dos quais uma linha é arquivada automaticamente (0 = desactivado)."""
+    val = get_runtime_override("SHEETS_ARCHIVE_AFTER_DAYS") or os.getenv("SHEETS_ARCHIVE_AFTER_DAYS") or SHEETS_ARCHIVE_AFTER_DAYS
+    try:
+        return max(0, int(val))
+    except (ValueError, TypeError):
+        return 0
+
+
+# Coordenação entre máquinas que publicam a partir do mesmo Sheet: antes de publicar, cada nó reserva
+# a linha escrevendo Status = "publishing:<nó>:<epoch>" e confirma por releitura. Sem PUBLISH_CLAIM_ENABLED,
+# só fica activa quando PUBLISH_NODE_ID está definido (instalações de um só nó não pagam a reserva).
+PUBLISH_CLAIM_ENABLED: str = _optional("PUBLISH_CLAIM_ENABLED", "")
+PUBLISH_CLAIM_STALE_MINUTES: str = _optional("PUBLISH_CLAIM_STALE_MINUTES", "30")
+PUBLISH_NODE_ID: str = _optional("PUBLISH_NODE_ID", "")
+
+
+def get_publish_claim_enabled() -> bool:
+    """
+    Se True, a publicação reserva a linha no Sheet (Status publishing:...) antes de publicar.
+    Default: activa só se PUBLISH_NODE_ID estiver definido explicitamente.
+    """
+    val = get_runtime_override("PUBLISH_CLAIM_ENABLED") or os.getenv("PUBLISH_CLAIM_ENABLED") or PUBLISH_CLAIM_ENABLED
+    if not val.strip():
+        return bool((get_runtime_override("PUBLISH_NODE_ID") or os.getenv("PUBLISH_NODE_ID") or PUBLISH_NODE_ID).strip())
+    return val.lower() in ("true", "1", "yes", "on")
+
+
+def get_publish_claim_stale_seconds() -> float:
+    """Idade (segundos) a partir da qual uma reserva de outro nó é considerada abandonada. Mínimo 1 minuto."""
+    val = get_runtime_override("PUBLISH_CLAIM_STALE_MINUTES") or os.getenv("PUBLISH_CLAIM_STALE_MINUTES") or PUBLISH_CLAIM_STALE_MINUTES
+    try:
+        return max(1.0, float(val)) * 60.0
+    except (ValueError, TypeError):
+        return 30 * 60.0
+
+
+def get_publish_node_id() -> str:
+    """Identificador deste nó nas reservas (default: hostname). ':' e espaços são substituídos por '-'."""
+    raw = get_runtime_override("PUBLISH_NODE_ID") or os.getenv("PUBLISH_NODE_ID") or PUBLISH_NODE_ID or socket.gethostname()
+    node = "-".join((raw or "").replace(":", " ").split())
+    return node or "node"
+
+
+# Pré-preparação (prestage): o container de cada post ready é criado e validado estes minutos antes da
+# hora agendada; à hora só falta o media_publish. 0 = desactivado (default). Máximo 23 h (os containers expiram).
+# Corre no ciclo do autopublish (app) e no scripts/autopublish_cli.py (Task Scheduler): com o CLI, a
+# antecedência deve ser maior que o intervalo da tarefa, senão o post é publicado antes de ser pré-preparado.
+PUBLISH_PRESTAGE_LEAD_MINUTES: str = _optional("PUBLISH_PRESTAGE_LEAD_MINUTES", "0")
+
+
+def get_publish_prestage_lead_seconds() -> float:
+    """Antecedência (segundos) da pré-preparação dos containers; 0 = desactivada."""
+    val = (
+        get_runtime_override("PUBLISH_PRESTAGE_LEAD_MINUTES")
+        or os.getenv("PUBLISH_PRESTAGE_LEAD_MINUTES")
+        or PUBLISH_PRESTAGE_LEAD_MINUTES
+    )
+    try:
+        return min(max(0.0, float(val)), 23 * 60.0) * 60.0
+    except (ValueError, TypeError):
+        return 0.0
+
+
+# Governador do uso da Graph API (ig_usage): tráfego não crítico (autoresposta, Stories/Reels reutilizados)
+# abranda a partir de IG_USAGE_SLOWDOWN_PERCENT e é adiado a partir de IG_USAGE_DEFER_PERCENT.
+IG_USAGE_SLOWDOWN_PERCENT: str = _optional("IG_USAGE_SLOWDOWN_PERCENT", "60")
+IG_USAGE_DEFER_PERCENT: str = _optional("IG_USAGE_DEFER_PERCENT", "85")
+
+
+def get_ig_usage_slowdown_percent() -> float:
+    """Uso da API (%) a partir do qual o tráfego não crítico abranda."""
+    val = get_runtime_override("IG_USAGE_SLOWDOWN_PERCENT") or os.getenv("IG_USAGE_SLOWDOWN_PERCENT") or IG_USAGE_SLOWDOWN_PERCENT
+    try:
+        return min(max(0.0, float(val)), 100.0)
+    except (ValueError, TypeError):
+        return 60.0
+
+
+def get_ig_usage_defer_percent() -> float:
+    """Uso da API (%) a partir do qual o tráfego não crítico é adiado."""
+    val = get_runtime_override("IG_USAGE_DEFER_PERCENT") or os.getenv("IG_USAGE_DEFER_PERCENT") or IG_USAGE_DEFER_PERCENT
+    try:
+        return min(max(0.0, float(val)), 100.0)
+    except (ValueError, TypeError):
+        return 85.0
+
+
 # Credenciais Google em memória (ex.: carregadas por upload do JSON na UI)
 _runtime_google_credentials: Optional[dict[str, Any]] = None
 # Overrides em runtime (ex.: preenchidos na UI Streamlit)
@@ -3,18 +3,97 @@ Cliente para a Instagram Graph API oficial (via Instagram Login).
 Publicação de imagens via endpoints /media e /media_publish.
 Docs: https://developers.facebook.com/docs/instagram-platform/instagram-api-with-instagram-login/content-publishing/
 """
+import asyncio
+import http.cookiejar
+import importlib.util
+import itertools
+import json
 import logging
+import os
+import random
+import statistics
+import threading
 import time
-from typing import Optional
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterator, Optional
 
 import requests
+from requests.adapters import HTTPAdapter
 
+from instagram_poster import ig_usage
 from instagram_poster.config import IG_GRAPH_API_VERSION, get_ig_access_token, get_ig_business_id
 
 logger = logging.getLogger(__name__)
 
 BASE_URL = "https://graph.instagram.com"
 
+# Sessão HTTP partilhada por todo o processo (keep-alive): as chamadas reutilizam ligações TCP+TLS
+# abertas a graph.instagram.com em vez de fazer um handshake por pedido.
+_POOL_CONNECTIONS = 2  # hosts em pool (graph.instagram.com e pouco mais)
+_POOL_MAXSIZE = 10  # ligações abertas por host (thread do autopublish, comentários, páginas do Streamlit)
+# Timeouts (ligação, leitura) em segundos, por tipo de pedido
+TIMEOUT_DEFAULT = (5, 30)
+TIMEOUT_STATUS = (5, 15)  # polling do estado de containers
+TIMEOUT_VIDEO = (5, 60)  # criação de containers de vídeo (o Instagram valida o video_url antes de responder)
+TIMEOUT_CHECK = (5, 10)  # verificações rápidas (página de Configuração)
+
+_session_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+
+# Polling do estado dos containers: primeira verificação rápida, depois backoff exponencial com jitter.
+# (primeira verificação, intervalo inicial, intervalo máximo) em segundos, por tipo de container.
+_POLL_PROFILES = {
+    "image": (1.0, 1.0, 5.0),
+    "video": (5.0, 3.0, 15.0),  # Story em vídeo
+    "reel": (10.0, 5.0, 30.0),
+}
+_POLL_JITTER = 0.2  # ±20%
+_POLL_MIN_DELAY_SEC = 0.5
+# Tempos até FINISHED observados (por tipo), persistidos para o calendário de polling se ajustar sozinho
+_CONTAINER_TIMINGS_FILE = Path(__file__).resolve().parent.parent / ".ig_container_timings.json"
+_TIMINGS_HISTORY = 20  # amostras guardadas por tipo
+_TIMINGS_MIN_SAMPLES = 3  # abaixo disto usa só o perfil fixo
+_timings_lock = threading.Lock()
+_timings_cache: Optional[dict[str, list[dict[str, float]]]] = None
+# Containers criados neste processo: creation_id -> (tipo, instante de criação em time.monotonic())
+_containers: dict[str, tuple[str, float]] = {}
+
+
+def get_session() -> requests.Session:
+    """
+    Sessão requests partilhada (pool de ligações com keep-alive), criada na primeira utilização.
+    Pode ser usada em simultâneo por várias threads: o estado mutável da sessão (cookies) está
+    desligado e o pool do urllib3 é thread-safe. Os pedidos passam sempre o timeout explícito.
+    Todas as respostas passam pelo modelo de uso da API (ig_usage.record_response).
+    """
+    global _session
+    if _session is not None:
+        return _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+            adapter = HTTPAdapter(pool_connections=_POOL_CONNECTIONS, pool_maxsize=_POOL_MAXSIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.hooks["response"].append(_record_usage)
+            _session = session
+    return _session
+
+
+def _record_usage(resp: requests.Response, *args: Any, **kwargs: Any) -> None:
+    ig_usage.record_response(resp)
+
+
+def reset_session() -> None:
+    """Fecha as ligações em pool (a próxima chamada cria uma sessão nova)."""
+    global _session
+    with _session_lock:
+        session, _session = _session, None
+    if session is not None:
+        session.close()
+
 
 def _url(path: str) -> str:
     return f"{BASE_URL}/{IG_GRAPH_API_VERSION}{path}"
@@ -36,7 +115,11 @@ def get_my_id() -> str:
     _check_config()
     url = _url("/me")
     params = {"fields": "id", "access_token": get_ig_access_token()}
-    resp = requests.get(url, params=params, timeout=30)
+    resp = get_session().get(url, params=params, timeout=TIMEOUT_DEFAULT)
+    return _parse_my_id(resp)
+
+
+def _parse_my_id(resp: requests.Response) -> str:
     resp.raise_for_status()
     data = resp.json()
     user_id = data.get("id")
@@ -45,6 +128,32 @@ def get_my_id() -> str:
     return str(user_id)
 
 
+def _response_id(resp: requests.Response, error_message: str) -> str:
+    """Campo id da resposta JSON (container, media ou reply); ValueError se faltar."""
+    data = resp.json()
+    object_id = data.get("id")
+    if not object_id:
+        logger.error("Resposta sem 'id': %s", data)
+        raise ValueError(error_message)
+    return object_id
+
+
+def _raise_for_status_logged(resp: requests.Response, operation: str) -> None:
+    try:
+        resp.raise_for_status()
+    except requests.HTTPError:
+        logger.error("%s falhou: status=%s body=%s", operation, resp.status_code, resp.text)
+        raise
+
+
+def _create_media_params(image_url: str, caption: str) -> dict[str, str]:
+    return {
+        "image_url": image_url,
+        "caption": caption,
+        "access_token": get_ig_access_token(),
+    }
+
+
 def create_media(image_url: str, caption: str) -> str:
     """
     Cria um content container para uma imagem (feed).
@@ -52,35 +161,15 @@ def create_media(image_url: str, caption: str) -> str:
     Devolve o creation_id (container ID) para usar em publish_media.
     """
     _check_config()
-    ig_id = get_ig_business_id()
-    url = _url(f"/{ig_id}/media")
-    params = {
-        "image_url": image_url,
-        "caption": caption,
-        "access_token": get_ig_access_token(),
-    }
+    url = _url(f"/{get_ig_business_id()}/media")
     logger.info("A criar media container para image_url=%s", image_url[:80] + "..." if len(image_url) > 80 else image_url)
-    resp = requests.post(url, params=params, timeout=30)
-    try:
-        resp.raise_for_status()
-    except requests.HTTPError:
-        logger.error("create_media falhou: status=%s body=%s", resp.status_code, resp.text)
-        raise
-    data = resp.json()
-    creation_id = data.get("id")
-    if not creation_id:
-        logger.error("Resposta sem 'id': %s", data)
-        raise ValueError("Resposta da API sem container ID")
-    return creation_id
+    resp = get_session().post(url, params=_create_media_params(image_url, caption), timeout=TIMEOUT_DEFAULT)
+    _raise_for_status_logged(resp, "create_media")
+    return _register_container(_response_id(resp, "Resposta da API sem container ID"), "image")
 
 
-def create_story(image_url: Optional[str] = None, video_url: Optional[str] = None) -> str:
-    """
-    Cria um content container para uma Story (imagem ou vídeo 9:16, ex.: 1080x1920).
-    A API do Instagram aceita image_url (JPEG) ou video_url (MP4). A música só entra se estiver dentro do vídeo.
-    POST com JSON body e Bearer token (evita problemas de encoding na query).
-    """
-    _check_config()
+def _story_request(image_url: Optional[str], video_url: Optional[str]) -> tuple[dict[str, str], dict[str, str], bool]:
+    """(headers, payload JSON, é vídeo) para criar o container de uma Story."""
     if video_url and video_url.strip():
         media_url = video_url.strip()
         media_key = "video_url"
@@ -89,13 +178,14 @@ def create_story(image_url: Optional[str] = None, video_url: Optional[str] = Non
         media_key = "image_url"
     else:
         raise ValueError("É obrigatório indicar image_url ou video_url para criar uma Story.")
-    ig_id = get_ig_business_id()
-    url = _url(f"/{ig_id}/media")
     token = get_ig_access_token()
     headers = {"Content-Type": "application/json", "Authorization": f"Bearer {token}"}
     payload = {"media_type": "STORIES", media_key: media_url}
     logger.info("A criar Story container para %s=%s", media_key, media_url[:80] + "..." if len(media_url) > 80 else media_url)
-    resp = requests.post(url, json=payload, headers=headers, timeout=60 if media_key == "video_url" else 30)
+    return headers, payload, media_key == "video_url"
+
+
+def _parse_story_response(resp: requests.Response) -> str:
     try:
         resp.raise_for_status()
     except requests.HTTPError as e:
@@ -117,100 +207,336 @@ def create_story(image_url: Optional[str] = None, video_url: Optional[str] = Non
             raise ValueError(
                 f"Instagram Story falhou (400). A imagem deve ser JPEG e estar num URL público. Resposta: {body}"
             ) from e
-    data = resp.json()
-    creation_id = data.get("id")
-    if not creation_id:
-        logger.error("Resposta sem 'id': %s", data)
-        raise ValueError("Resposta da API sem container ID para Story")
-    return creation_id
+    return _response_id(resp, "Resposta da API sem container ID para Story")
 
 
-def create_reel(video_url: str, caption: str) -> str:
+def create_story(image_url: Optional[str] = None, video_url: Optional[str] = None) -> str:
     """
-    Cria um content container para um Reel (vídeo).
-    POST /{ig-user-id}/media com media_type=REELS e video_url.
-    Devolve o creation_id para usar em publish_media(creation_id, max_wait=180).
+    Cria um content container para uma Story (imagem ou vídeo 9:16, ex.: 1080x1920).
+    A API do Instagram aceita image_url (JPEG) ou video_url (MP4). A música só entra se estiver dentro do vídeo.
+    POST com JSON body e Bearer token (evita problemas de encoding na query).
     """
     _check_config()
-    ig_id = get_ig_business_id()
-    url = _url(f"/{ig_id}/media")
-    params = {
+    headers, payload, is_video = _story_request(image_url, video_url)
+    url = _url(f"/{get_ig_business_id()}/media")
+    resp = get_session().post(
+        url, json=payload, headers=headers, timeout=TIMEOUT_VIDEO if is_video else TIMEOUT_DEFAULT
+    )
+    return _register_container(_parse_story_response(resp), "video" if is_video else "image")
+
+
+def _create_reel_params(video_url: str, caption: str) -> dict[str, str]:
+    return {
         "media_type": "REELS",
         "video_url": video_url,
         "caption": caption,
         "access_token": get_ig_access_token(),
     }
-    logger.info("A criar Reel container para video_url=%s", video_url[:80] + "..." if len(video_url) > 80 else video_url)
-    resp = requests.post(url, params=params, timeout=30)
-    try:
-        resp.raise_for_status()
-    except requests.HTTPError:
-        logger.error("create_reel falhou: status=%s body=%s", resp.status_code, resp.text)
-        raise
-    data = resp.json()
-    creation_id = data.get("id")
-    if not creation_id:
-        logger.error("Resposta sem 'id': %s", data)
-        raise ValueError("Resposta da API sem container ID para Reel")
-    return creation_id
 
 
-def _wait_for_container(creation_id: str, max_wait: int = 120, interval: int = 3) -> str:
+def create_reel(video_url: str, caption: str) -> str:
     """
-    Polling do status do container até FINISHED.
-    O Instagram processa o container de forma assíncrona — chamar
-    media_publish antes de FINISHED resulta em erro 400.
+    Cria um content container para um Reel (vídeo).
+    POST /{ig-user-id}/media com media_type=REELS e video_url.
+    Devolve o creation_id para usar em publish_media(creation_id, max_wait=180).
     """
-    elapsed = 0
-    status = "UNKNOWN"
-    while elapsed < max_wait:
-        url = _url(f"/{creation_id}")
-        params = {"fields": "status,status_code", "access_token": get_ig_access_token()}
-        resp = requests.get(url, params=params, timeout=15)
-        if not resp.ok:
-            logger.warning("Erro ao verificar container %s: %s", creation_id, resp.text[:200])
-            time.sleep(interval)
-            elapsed += interval
-            continue
-        data = resp.json()
-        status = data.get("status_code") or data.get("status", "")
-        logger.info("Container %s: status=%s (elapsed=%ds)", creation_id, status, elapsed)
-        if status == "FINISHED":
-            return status
-        if status == "ERROR":
-            raise ValueError(f"Container falhou: {data}")
-        time.sleep(interval)
-        elapsed += interval
+    _check_config()
+    url = _url(f"/{get_ig_business_id()}/media")
+    logger.info("A criar Reel container para video_url=%s", video_url[:80] + "..." if len(video_url) > 80 else video_url)
+    resp = get_session().post(url, params=_create_reel_params(video_url, caption), timeout=TIMEOUT_VIDEO)
+    _raise_for_status_logged(resp, "create_reel")
+    return _register_container(_response_id(resp, "Resposta da API sem container ID para Reel"), "reel")
+
+
+def _container_status(creation_id: str, data: dict, elapsed: float) -> str:
+    """Estado do container a partir da resposta de GET /{creation_id}; ValueError se ERROR ou EXPIRED."""
+    status = data.get("status_code") or data.get("status", "")
+    logger.info("Container %s: status=%s (elapsed=%ds)", creation_id, status, elapsed)
+    if status == "ERROR":
+        raise ValueError(f"Container falhou: {data}")
+    if status == "EXPIRED":
+        raise ValueError(f"Container {creation_id} expirou (não foi publicado a tempo). É preciso criar um novo.")
+    return status
+
+
+def _container_timeout(creation_id: str, max_wait: int, status: str) -> TimeoutError:
     logger.warning(
         "Container %s não ficou pronto em %ds (último status: %s)",
         creation_id,
         max_wait,
         status,
     )
-    raise TimeoutError(
+    return TimeoutError(
         f"Container {creation_id} não ficou pronto em {max_wait}s (último status: {status}). "
         "Para Reels pode ser necessário aumentar max_wait (ex.: 240s)."
     )
 
 
-def publish_media(creation_id: str, max_wait: int = 120) -> str:
+def _register_container(creation_id: str, kind: str) -> str:
+    """Regista o tipo e o instante de criação do container (usados no polling de publish_media)."""
+    _containers[creation_id] = (kind, time.monotonic())
+    return creation_id
+
+
+def _load_timings() -> dict[str, list[dict[str, float]]]:
+    global _timings_cache
+    with _timings_lock:
+        if _timings_cache is None:
+            try:
+                data = json.loads(_CONTAINER_TIMINGS_FILE.read_text(encoding="utf-8"))
+                _timings_cache = data if isinstance(data, dict) else {}
+            except (OSError, ValueError):
+                _timings_cache = {}
+        return _timings_cache
+
+
+def _record_container_timing(kind: str, ready_sec: float, polls: int) -> None:
+    """Guarda o tempo estimado até FINISHED e o nº de verificações (últimas _TIMINGS_HISTORY por tipo)."""
+    timings = _load_timings()
+    with _timings_lock:
+        history = timings.setdefault(kind, [])
+        history.append({"ready_sec": round(ready_sec, 2), "polls": polls, "at": int(time.time())})
+        del history[:-_TIMINGS_HISTORY]
+        tmp = _CONTAINER_TIMINGS_FILE.with_suffix(".tmp")
+        try:
+            tmp.write_text(json.dumps(timings, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, _CONTAINER_TIMINGS_FILE)
+        except OSError as e:
+            logger.debug("Não foi possível gravar tempos dos containers: %s", e)
+
+
+def _expected_ready_sec(kind: str) -> Optional[float]:
+    """Mediana do tempo até FINISHED para este tipo de container; None sem histórico suficiente."""
+    history = _load_timings().get(kind) or []
+    samples = [h["ready_sec"] for h in history if isinstance(h, dict) and h.get("ready_sec") is not None]
+    if len(samples) < _TIMINGS_MIN_SAMPLES:
+        return None
+    return statistics.median(samples)
+
+
+def _poll_delays(kind: str, since_created: float) -> Iterator[float]:
     """
-    Publica o container criado por create_media ou create_reel.
-    Espera até o container estar FINISHED antes de chamar media_publish.
-    Default 120s para feed/Story; para Reels use max_wait=240 (processamento mais lento).
+    Esperas antes de cada verificação do container. A primeira é rápida (perfil do tipo) ou, com
+    histórico, perto de 90% da mediana observada até FINISHED (descontando o tempo já passado desde
+    a criação); as seguintes crescem exponencialmente até ao máximo do perfil, com jitter.
     """
-    _check_config()
-    ig_id = get_ig_business_id()
+    first, step, cap = _POLL_PROFILES.get(kind, _POLL_PROFILES["image"])
+    expected = _expected_ready_sec(kind)
+    if expected is not None:
+        first = expected * 0.9
+    delay = max(_POLL_MIN_DELAY_SEC, first - since_created)
+    yield delay * random.uniform(1 - _POLL_JITTER, 1 + _POLL_JITTER)
+    delay = step
+    while True:
+        yield delay * random.uniform(1 - _POLL_JITTER, 1 + _POLL_JITTER)
+        delay = min(cap, delay * 2)
 
-    _wait_for_container(creation_id, max_wait=max_wait)
 
-    url = _url(f"/{ig_id}/media_publish")
-    params = {
-        "creation_id": creation_id,
-        "access_token": get_ig_access_token(),
-    }
-    logger.info("A publicar media container %s", creation_id)
-    resp = requests.post(url, params=params, timeout=30)
+class _ContainerPoll:
+    """Estado da espera por um container: calendário de verificações, prazo e registo de tempos."""
+
+    def __init__(self, creation_id: str, max_wait: int):
+        self.creation_id = creation_id
+        self.max_wait = max_wait
+        self.kind, created = _containers.get(creation_id, ("image", None))
+        self.start = time.monotonic()
+        self.created = created if created is not None else self.start
+        self.deadline = self.start + max_wait
+        self.delays = _poll_delays(self.kind, self.start - self.created)
+        self.polls = 0
+        self.last_pending = self.start - self.created  # último instante (desde a criação) sem FINISHED
+        self.status = "UNKNOWN"
+
+    def next_delay(self) -> Optional[float]:
+        """Segundos até à próxima verificação, ou None se o prazo acabou."""
+        remaining = self.deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        return min(next(self.delays), remaining)
+
+    def handle(self, data: Optional[dict], error: str = "") -> bool:
+        """
+        Processa o estado devolvido pela API (data=None se a verificação falhou).
+        True se o container está FINISHED; ValueError se ERROR ou EXPIRED.
+        """
+        self.polls += 1
+        now = time.monotonic()
+        if data is None:
+            logger.warning("Erro ao verificar container %s: %s", self.creation_id, error[:200])
+            return False
+        try:
+            self.status = _container_status(self.creation_id, data, now - self.start)
+        except ValueError:
+            _containers.pop(self.creation_id, None)
+            raise
+        if self.status != "FINISHED":
+            self.last_pending = now - self.created
+            return False
+        # Ficou pronto algures entre a última verificação pendente e esta: usar o ponto médio
+        ready_sec = (self.last_pending + (now - self.created)) / 2
+        _containers.pop(self.creation_id, None)
+        _record_container_timing(self.kind, ready_sec, self.polls)
+        logger.info(
+            "Container %s (%s) pronto em ~%.1fs, %d verificação(ões)", self.creation_id, self.kind, ready_sec, self.polls
+        )
+        return True
+
+    def timeout(self) -> TimeoutError:
+        return _container_timeout(self.creation_id, self.max_wait, self.status)
+
+
+class _ContainerWaiter:
+    __slots__ = ("poll", "due", "event", "error")
+
+    def __init__(self, poll: _ContainerPoll, due: float):
+        self.poll = poll
+        self.due = due
+        self.event = threading.Event()
+        self.error: Optional[Exception] = None
+
+
+_TRACKER_GRACE_SEC = 30  # margem do waiter além de max_wait, caso a thread do tracker morra
+_BATCH_MAX_FAILURES = 3  # falhas seguidas do pedido com ids= (sem ID culpado) antes de passar a pedidos individuais
+_BATCH_RETRY_AFTER_SEC = 300  # volta a tentar o pedido com ids= após este tempo
+
+
+class _ContainerTracker:
+    """
+    Uma thread verifica todos os containers em espera (de qualquer thread: feed, Story com post,
+    Reel, páginas do Streamlit) com um único GET /?ids=a,b,c&fields=status,status_code por tick,
+    e acorda cada waiter (threading.Event) quando o seu container fica FINISHED, falha ou expira o prazo.
+    Cada container mantém o seu calendário (_poll_delays); o tick acontece quando o primeiro vence e
+    verifica todos os pendentes (o pedido custa o mesmo com 1 ou N IDs). Se o pedido com vários IDs
+    falhar, verifica um a um nesse tick: um ID que falhe sozinho (inválido, apagado) sai do lote e passa
+    a ser verificado à parte; se todos funcionarem sozinhos, a falha conta para desactivar o lote
+    (_BATCH_MAX_FAILURES seguidas), que volta a ser tentado após _BATCH_RETRY_AFTER_SEC.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiters: dict[str, _ContainerWaiter] = {}
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._solo: set[str] = set()  # IDs que falharam sozinhos: fora do lote
+        self._batch_failures = 0
+        self._batch_disabled_until = 0.0
+
+    def wait(self, creation_id: str, max_wait: int) -> str:
+        """Bloqueia até o container estar FINISHED; ValueError (ERROR/EXPIRED) ou TimeoutError."""
+        with self._lock:
+            waiter = self._waiters.get(creation_id)
+            if waiter is None:
+                poll = _ContainerPoll(creation_id, max_wait)
+                waiter = _ContainerWaiter(poll, time.monotonic() + (poll.next_delay() or 0.0))
+                self._waiters[creation_id] = waiter
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="ig-container-tracker", daemon=True)
+                self._thread.start()
+        self._wake.set()
+        if not waiter.event.wait(timeout=max_wait + _TRACKER_GRACE_SEC):
+            with self._lock:
+                self._waiters.pop(creation_id, None)
+            raise waiter.poll.timeout()
+        if waiter.error is not None:
+            raise waiter.error
+        return waiter.poll.status
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if not self._waiters:
+                    self._thread = None
+                    return
+                next_due = min(w.due for w in self._waiters.values())
+            pause = next_due - time.monotonic()
+            if pause > 0:
+                self._wake.wait(pause)
+                self._wake.clear()
+                continue
+            with self._lock:
+                batch = dict(self._waiters)
+            try:
+                results = self._fetch(list(batch))
+            except Exception as e:
+                results = {cid: (None, str(e)) for cid in batch}
+            for creation_id, waiter in batch.items():
+                data, error = results.get(creation_id, (None, "sem resposta"))
+                self._advance(creation_id, waiter, data, error)
+
+    def _advance(self, creation_id: str, waiter: _ContainerWaiter, data: Optional[dict], error: str) -> None:
+        try:
+            done = waiter.poll.handle(data, error)
+        except ValueError as e:
+            waiter.error, done = e, True
+        if not done:
+            delay = waiter.poll.next_delay()
+            if delay is None:
+                waiter.error, done = waiter.poll.timeout(), True
+            else:
+                waiter.due = time.monotonic() + delay
+        if done:
+            with self._lock:
+                self._waiters.pop(creation_id, None)
+                self._solo.discard(creation_id)
+            waiter.event.set()
+
+    def _fetch(self, ids: list[str]) -> dict[str, tuple[Optional[dict], str]]:
+        """Estado de vários containers: {creation_id: (dados ou None, texto do erro)}."""
+        params = _container_status_params()
+        with self._lock:
+            solo = [cid for cid in ids if cid in self._solo]
+        batch = [cid for cid in ids if cid not in solo]
+        results: dict[str, tuple[Optional[dict], str]] = {}
+        batch_failed = False
+        if len(batch) > 1 and time.monotonic() >= self._batch_disabled_until:
+            resp = get_session().get(_url("/"), params={**params, "ids": ",".join(batch)}, timeout=TIMEOUT_STATUS)
+            if resp.ok:
+                self._batch_failures = 0
+                data = resp.json()
+                results = {cid: (data.get(cid), "" if cid in data else "ausente na resposta") for cid in batch}
+                batch = []
+            else:
+                logger.info("Verificação em lote de containers falhou (%s); a verificar um a um", resp.status_code)
+                batch_failed = True
+        for cid in batch + solo:
+            resp = get_session().get(_url(f"/{cid}"), params=params, timeout=TIMEOUT_STATUS)
+            results[cid] = (resp.json(), "") if resp.ok else (None, resp.text or str(resp.status_code))
+        failed = {cid for cid, (data, _) in results.items() if data is None}
+        with self._lock:
+            self._solo = (self._solo - set(results)) | (failed & set(self._waiters))
+        if batch_failed and not failed & set(batch):
+            # Todos os IDs funcionam sozinhos: a falha é do pedido com ids=, não de um container
+            self._batch_failures += 1
+            if self._batch_failures >= _BATCH_MAX_FAILURES:
+                logger.info(
+                    "Pedido com vários IDs falhou %d vezes seguidas; verificações individuais durante %ds",
+                    self._batch_failures, _BATCH_RETRY_AFTER_SEC,
+                )
+                self._batch_failures = 0
+                self._batch_disabled_until = time.monotonic() + _BATCH_RETRY_AFTER_SEC
+        return results
+
+
+_container_tracker = _ContainerTracker()
+
+
+def _container_status_params() -> dict[str, str]:
+    return {"fields": "status,status_code", "access_token": get_ig_access_token()}
+
+
+def _wait_for_container(creation_id: str, max_wait: int = 120) -> str:
+    """
+    Espera até o container estar FINISHED.
+    O Instagram processa o container de forma assíncrona — chamar
+    media_publish antes de FINISHED resulta em erro 400.
+    As verificações são feitas pelo _container_tracker (um pedido por tick para todos os containers
+    em espera), com um calendário que depende do tipo de container (imagem, vídeo, Reel) e dos tempos
+    observados em publicações anteriores (_poll_delays). ERROR e EXPIRED terminam logo a espera.
+    """
+    return _container_tracker.wait(creation_id, max_wait)
+
+
+def _parse_publish_response(resp: requests.Response, creation_id: str) -> str:
     try:
         resp.raise_for_status()
     except requests.HTTPError as e:
@@ -240,29 +566,127 @@ def publish_media(creation_id: str, max_wait: int = 120) -> str:
                 "O contentor pode ainda não estar FINISHED (aumentar max_wait) ou ter expirado (criar novo)."
             ) from e
         raise
-    data = resp.json()
-    media_id = data.get("id")
-    if not media_id:
-        logger.error("Resposta sem 'id': %s", data)
-        raise ValueError("Resposta da API sem media ID")
-    return media_id
+    return _response_id(resp, "Resposta da API sem media ID")
 
 
-def get_media_ids(limit: int = 25) -> list[str]:
+def publish_media(creation_id: str, max_wait: int = 120, wait: bool = True) -> str:
     """
-    Obtém os IDs dos media (posts, reels) do utilizador.
-    GET /{ig-user-id}/media
-    Devolve lista de media IDs (máx. limit).
+    Publica o container criado por create_media ou create_reel.
+    Espera até o container estar FINISHED antes de chamar media_publish.
+    Default 120s para feed/Story; para Reels use max_wait=240 (processamento mais lento).
+    Com wait=False (container já validado, ex.: pré-preparado pelo prestage) chama só o media_publish.
     """
     _check_config()
     ig_id = get_ig_business_id()
-    url = _url(f"/{ig_id}/media")
-    params = {"fields": "id", "access_token": get_ig_access_token(), "limit": min(limit, 50)}
-    resp = requests.get(url, params=params, timeout=30)
+
+    if wait:
+        _wait_for_container(creation_id, max_wait=max_wait)
+
+    url = _url(f"/{ig_id}/media_publish")
+    params = {
+        "creation_id": creation_id,
+        "access_token": get_ig_access_token(),
+    }
+    logger.info("A publicar media container %s", creation_id)
+    resp = get_session().post(url, params=params, timeout=TIMEOUT_DEFAULT)
+    return _parse_publish_response(resp, creation_id)
+
+
+# Paginação por cursor (paging.next): tamanho máximo de página aceite pela API nos edges de media/comentários
+_PAGE_SIZE_MAX = 50
+_MEDIA_PAGE_SIZE = 25
+_COMMENTS_PAGE_SIZE = 50
+
+
+def parse_timestamp(value: Any) -> Optional[datetime]:
+    """Timestamp ISO da API (ex.: 2024-05-01T12:00:00+0000) como datetime com fuso; None se inválido."""
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(str(value).replace("Z", "+00:00").replace("+0000", "+00:00"))
+    except (ValueError, TypeError):
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def _parse_page(resp: requests.Response) -> tuple[list[dict], Optional[str]]:
+    """(itens, URL da página seguinte ou None) de uma resposta paginada."""
     resp.raise_for_status()
     data = resp.json()
     items = data.get("data") or []
-    return [x["id"] for x in items if x.get("id")]
+    return items, (data.get("paging") or {}).get("next") if items else None
+
+
+def _page_reaches(items: list[dict], stop_before: Optional[datetime]) -> bool:
+    """
+    True se a página mostra que as seguintes só têm itens com timestamp <= stop_before: está por ordem
+    decrescente de timestamp (com pelo menos 2 itens, para a ordem ser visível) e o último já é antigo.
+    Se a ordem não for decrescente, não se pára (segue-se o cursor até ao fim).
+    """
+    if stop_before is None or len(items) < 2:
+        return False
+    stamps = [parse_timestamp(x.get("timestamp")) for x in items]
+    if any(t is None for t in stamps):
+        return False
+    return all(a >= b for a, b in zip(stamps, stamps[1:])) and stamps[-1] <= stop_before
+
+
+def _page_params(fields: str, page_size: int) -> dict[str, Any]:
+    return {"fields": fields, "access_token": get_ig_access_token(), "limit": max(1, min(page_size, _PAGE_SIZE_MAX))}
+
+
+def _iter_pages(
+    url: str, params: Optional[dict[str, Any]], stop_before: Optional[datetime] = None
+) -> Iterator[list[dict]]:
+    """Páginas de um edge, seguindo paging.next só quando a anterior foi consumida (um pedido por página)."""
+    next_url: Optional[str] = url
+    next_params: Optional[dict[str, Any]] = params
+    while next_url:
+        resp = get_session().get(next_url, params=next_params, timeout=TIMEOUT_DEFAULT)
+        items, next_url = _parse_page(resp)
+        # paging.next já traz todos os parâmetros (cursor, fields, limit e token)
+        next_params = None
+        if items:
+            yield items
+        if _page_reaches(items, stop_before):
+            return
+
+
+def iter_media(
+    fields: str = "id,timestamp", page_size: int = _MEDIA_PAGE_SIZE, stop_before: Optional[datetime] = None
+) -> Iterator[dict]:
+    """
+    Media do utilizador (posts, reels), do mais recente para o mais antigo, página a página.
+    GET /{ig-user-id}/media, seguindo paging.next à medida que o iterador é consumido; com stop_before
+    (e timestamp nos fields) pára na página que já só chega a media anteriores a essa data.
+    """
+    _check_config()
+    url = _url(f"/{get_ig_business_id()}/media")
+    for page in _iter_pages(url, _page_params(fields, page_size), stop_before):
+        yield from page
+
+
+def iter_comments(
+    media_id: str, page_size: int = _COMMENTS_PAGE_SIZE, stop_before: Optional[datetime] = None
+) -> Iterator[dict]:
+    """
+    Comentários top-level de um media, página a página (GET /{media-id}/comments + paging.next).
+    Com stop_before, deixa de pedir páginas quando chega a comentários anteriores (ver _page_reaches).
+    """
+    _check_config()
+    url = _url(f"/{media_id}/comments")
+    for page in _iter_pages(url, _page_params(_COMMENT_FIELDS, page_size), stop_before):
+        yield from page
+
+
+def get_media_ids(limit: int = 25) -> list[str]:
+    """
+    Obtém os IDs dos media (posts, reels) do utilizador.
+    GET /{ig-user-id}/media
+    Devolve lista de media IDs (máx. limit; segue a paginação se limit for maior que uma página).
+    """
+    media = iter_media(fields="id", page_size=min(limit, _PAGE_SIZE_MAX))
+    return [m["id"] for m in itertools.islice(media, max(0, limit)) if m.get("id")]
 
 
 def get_comment_replies(comment_id: str) -> list[dict]:
@@ -277,28 +701,103 @@ def get_comment_replies(comment_id: str) -> list[dict]:
         "fields": "replies.limit(100){id,from}",
         "access_token": get_ig_access_token(),
     }
-    resp = requests.get(url, params=params, timeout=30)
+    resp = get_session().get(url, params=params, timeout=TIMEOUT_DEFAULT)
     resp.raise_for_status()
     data = resp.json()
     replies = data.get("replies") or {}
     return replies.get("data") or []
 
 
-def get_comments(media_id: str) -> list[dict]:
+# Campos pedidos por comentário (top-level + replies, para saber se já respondemos)
+_COMMENT_FIELDS = "id,text,username,timestamp,from,replies.limit(100){id,from}"
+
+
+def get_comments(media_id: str, stop_before: Optional[datetime] = None) -> list[dict]:
     """
-    Obtém os comentários de um media (apenas top-level).
+    Obtém os comentários de um media (apenas top-level), todas as páginas.
     GET /{media-id}/comments?fields=id,text,username,timestamp,replies
+    Com stop_before, pára de paginar ao chegar a comentários anteriores a essa data (iter_comments).
+    """
+    return list(iter_comments(media_id, stop_before=stop_before))
+
+
+def _media_with_comments_fields(comments_per_media: int) -> str:
+    n = max(1, min(comments_per_media, _PAGE_SIZE_MAX))
+    return f"id,timestamp,comments.limit({n}){{{_COMMENT_FIELDS}}}"
+
+
+def _expand_comments(media: dict, stop_before: Optional[datetime]) -> dict:
+    """Media da expansão com "comments" como lista; segue o paging.next do edge embutido se preciso."""
+    edge = media.get("comments") or {}
+    comments = list(edge.get("data") or [])
+    next_url = (edge.get("paging") or {}).get("next")
+    if next_url and not _page_reaches(comments, stop_before):
+        for page in _iter_pages(next_url, None, stop_before):
+            comments.extend(page)
+    return {**media, "comments": comments}
+
+
+def iter_media_with_comments(
+    page_size: int = _MEDIA_PAGE_SIZE,
+    comments_per_media: int = _COMMENTS_PAGE_SIZE,
+    stop_before: Optional[datetime] = None,
+) -> Iterator[dict]:
+    """
+    Media do mais recente para o mais antigo, cada um com "comments" (lista de comentários top-level).
+    Usa expansão de campos: GET /{ig-user-id}/media?fields=id,timestamp,comments.limit(n){...} traz
+    page_size media e os primeiros n comentários de cada num só pedido, em vez de 1 + N.
+    Só os media com mais de n comentários (e ainda não em stop_before) pedem páginas extra.
     """
     _check_config()
-    url = _url(f"/{media_id}/comments")
-    params = {
-        "fields": "id,text,username,timestamp,from,replies.limit(100){id,from}",
-        "access_token": get_ig_access_token(),
-    }
-    resp = requests.get(url, params=params, timeout=30)
-    resp.raise_for_status()
-    data = resp.json()
-    return data.get("data") or []
+    url = _url(f"/{get_ig_business_id()}/media")
+    params = _page_params(_media_with_comments_fields(comments_per_media), page_size)
+    for page in _iter_pages(url, params):
+        for media in page:
+            yield _expand_comments(media, stop_before)
+
+
+def get_media_with_comments(
+    limit: int = 10, comments_per_media: int = _COMMENTS_PAGE_SIZE, stop_before: Optional[datetime] = None
+) -> list[dict]:
+    """Os limit media mais recentes com os seus comentários (ver iter_media_with_comments); 1 pedido para limit <= 50."""
+    media = iter_media_with_comments(
+        page_size=min(limit, _PAGE_SIZE_MAX), comments_per_media=comments_per_media, stop_before=stop_before
+    )
+    return list(itertools.islice(media, max(0, limit)))
+
+
+def get_comments_many(media_ids: list[str], stop_before: Optional[datetime] = None) -> dict[str, Any]:
+    """
+    Comentários de vários media: {media_id: lista de comentários ou a excepção do pedido}.
+    Com aiohttp instalado, os pedidos correm em simultâneo num event loop (ig_client_async);
+    senão, ou se já houver um event loop a correr nesta thread, um a um pela sessão partilhada.
+    Cada media segue a paginação como get_comments (stop_before idem).
+    """
+    if media_ids and _async_available():
+        from instagram_poster.ig_client_async import AsyncInstagramClient
+
+        async def _fetch() -> dict[str, Any]:
+            async with AsyncInstagramClient() as client:
+                return await client.get_comments_many(media_ids, stop_before=stop_before)
+
+        return asyncio.run(_fetch())
+    result: dict[str, Any] = {}
+    for media_id in media_ids:
+        try:
+            result[media_id] = get_comments(media_id, stop_before=stop_before)
+        except Exception as e:
+            result[media_id] = e
+    return result
+
+
+def _async_available() -> bool:
+    """True se aiohttp está instalado e não há um event loop a correr nesta thread (asyncio.run possível)."""
+    try:
+        asyncio.get_running_loop()
+        return False
+    except RuntimeError:
+        pass
+    return importlib.util.find_spec("aiohttp") is not None
 
 
 def reply_to_comment(comment_id: str, message: str) -> str:
@@ -311,10 +810,13 @@ def reply_to_comment(comment_id: str, message: str) -> str:
     _check_config()
     url = _url(f"/{comment_id}/replies")
     params = {"message": message[:300], "access_token": get_ig_access_token()}
-    resp = requests.post(url, params=params, timeout=30)
+    resp = get_session().post(url, params=params, timeout=TIMEOUT_DEFAULT)
+    return _parse_reply_response(resp)
+
+
+def _parse_reply_response(resp: requests.Response) -> str:
     resp.raise_for_status()
-    data = resp.json()
-    reply_id = data.get("id")
+    reply_id = resp.json().get("id")
     if not reply_id:
         raise ValueError("Resposta da API sem ID da reply")
     return reply_id
@@ -0,0 +1,241 @@
+"""
+Versão assíncrona (asyncio + aiohttp) do cliente da Instagram Graph API.
+Mesmos endpoints, parâmetros, mensagens de erro e excepções que ig_client (os pedidos são montados
+e as respostas interpretadas pelas mesmas funções), mas várias operações podem correr em simultâneo
+num só event loop: ler comentários de muitos posts, esperar por vários containers, etc.
+
+Uso:
+    async with AsyncInstagramClient() as ig:
+        creation_id = await ig.create_media(image_url, caption)
+        media_id = await ig.publish_media(creation_id)
+
+O aiohttp é opcional (pip install aiohttp); o código síncrono continua a usar ig_client.
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, AsyncIterator, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from instagram_poster import ig_client, ig_usage
+from instagram_poster.config import get_ig_access_token, get_ig_business_id
+
+logger = logging.getLogger(__name__)
+
+_MAX_CONCURRENCY = 8  # pedidos em simultâneo por cliente (a API penaliza rajadas)
+_KEEPALIVE_SEC = 30
+
+
+def _import_aiohttp():
+    try:
+        import aiohttp
+    except ImportError:
+        raise ImportError("aiohttp não encontrado. Instala com: pip install aiohttp") from None
+    return aiohttp
+
+
+def _to_requests_response(status: int, reason: str, headers: Any, body: bytes, url: str, charset: Optional[str]):
+    """Resposta do aiohttp como requests.Response, para reutilizar a interpretação de ig_client."""
+    resp = requests.Response()
+    resp.status_code = status
+    resp.reason = reason or ""
+    resp.headers = CaseInsensitiveDict(headers)
+    resp._content = body
+    resp.url = url
+    resp.encoding = charset or "utf-8"
+    return resp
+
+
+class AsyncInstagramClient:
+    """
+    Cliente assíncrono com pool de ligações (keep-alive) próprio, aberto em __aenter__ e fechado em
+    __aexit__. Deve ser usado dentro do event loop onde foi aberto.
+    """
+
+    def __init__(self, max_concurrency: int = _MAX_CONCURRENCY):
+        self._max_concurrency = max(1, max_concurrency)
+        self._session = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self) -> "AsyncInstagramClient":
+        aiohttp = _import_aiohttp()
+        connector = aiohttp.TCPConnector(limit=ig_client._POOL_MAXSIZE, keepalive_timeout=_KEEPALIVE_SEC)
+        self._session = aiohttp.ClientSession(connector=connector, cookie_jar=aiohttp.DummyCookieJar())
+        self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        timeout: tuple[float, float],
+        params: Optional[dict[str, Any]] = None,
+        json: Optional[dict[str, Any]] = None,
+        headers: Optional[dict[str, str]] = None,
+    ) -> requests.Response:
+        """
+        Um pedido HTTP; erros de rede são convertidos nas excepções equivalentes do requests.
+        A resposta actualiza o modelo de uso da API (ig_usage), como na sessão de ig_client.
+        """
+        if self._session is None:
+            raise RuntimeError("AsyncInstagramClient não está aberto (usar 'async with').")
+        aiohttp = _import_aiohttp()
+        connect, read = timeout
+        client_timeout = aiohttp.ClientTimeout(sock_connect=connect, sock_read=read)
+        async with self._semaphore:
+            try:
+                async with self._session.request(
+                    method, url, params=params, json=json, headers=headers, timeout=client_timeout
+                ) as resp:
+                    body = await resp.read()
+                    result = _to_requests_response(
+                        resp.status, resp.reason, resp.headers, body, str(resp.url), resp.charset
+                    )
+                    ig_usage.record_response(result)
+                    return result
+            except asyncio.TimeoutError as e:
+                raise requests.Timeout(f"Timeout em {method} {url}") from e
+            except aiohttp.ClientError as e:
+                raise requests.ConnectionError(str(e)) from e
+
+    async def get_my_id(self) -> str:
+        """Como ig_client.get_my_id."""
+        ig_client._check_config()
+        params = {"fields": "id", "access_token": get_ig_access_token()}
+        resp = await self._request("GET", ig_client._url("/me"), ig_client.TIMEOUT_DEFAULT, params=params)
+        return ig_client._parse_my_id(resp)
+
+    async def create_media(self, image_url: str, caption: str) -> str:
+        """Como ig_client.create_media."""
+        ig_client._check_config()
+        url = ig_client._url(f"/{get_ig_business_id()}/media")
+        logger.info("A criar media container para image_url=%s", image_url[:80] + "..." if len(image_url) > 80 else image_url)
+        resp = await self._request(
+            "POST", url, ig_client.TIMEOUT_DEFAULT, params=ig_client._create_media_params(image_url, caption)
+        )
+        ig_client._raise_for_status_logged(resp, "create_media")
+        return ig_client._register_container(ig_client._response_id(resp, "Resposta da API sem container ID"), "image")
+
+    async def create_story(self, image_url: Optional[str] = None, video_url: Optional[str] = None) -> str:
+        """Como ig_client.create_story."""
+        ig_client._check_config()
+        headers, payload, is_video = ig_client._story_request(image_url, video_url)
+        url = ig_client._url(f"/{get_ig_business_id()}/media")
+        timeout = ig_client.TIMEOUT_VIDEO if is_video else ig_client.TIMEOUT_DEFAULT
+        resp = await self._request("POST", url, timeout, json=payload, headers=headers)
+        return ig_client._register_container(ig_client._parse_story_response(resp), "video" if is_video else "image")
+
+    async def create_reel(self, video_url: str, caption: str) -> str:
+        """Como ig_client.create_reel."""
+        ig_client._check_config()
+        url = ig_client._url(f"/{get_ig_business_id()}/media")
+        logger.info("A criar Reel container para video_url=%s", video_url[:80] + "..." if len(video_url) > 80 else video_url)
+        resp = await self._request(
+            "POST", url, ig_client.TIMEOUT_VIDEO, params=ig_client._create_reel_params(video_url, caption)
+        )
+        ig_client._raise_for_status_logged(resp, "create_reel")
+        return ig_client._register_container(
+            ig_client._response_id(resp, "Resposta da API sem container ID para Reel"), "reel"
+        )
+
+    async def wait_for_container(self, creation_id: str, max_wait: int = 120) -> str:
+        """
+        Como ig_client._wait_for_container, sem bloquear o event loop: a espera é feita pelo tracker
+        partilhado de ig_client, que verifica todos os containers pendentes num só pedido por tick.
+        """
+        return await asyncio.to_thread(ig_client._wait_for_container, creation_id, max_wait)
+
+    async def publish_media(self, creation_id: str, max_wait: int = 120) -> str:
+        """Como ig_client.publish_media."""
+        ig_client._check_config()
+        ig_id = get_ig_business_id()
+        await self.wait_for_container(creation_id, max_wait=max_wait)
+        params = {"creation_id": creation_id, "access_token": get_ig_access_token()}
+        logger.info("A publicar media container %s", creation_id)
+        resp = await self._request("POST", ig_client._url(f"/{ig_id}/media_publish"), ig_client.TIMEOUT_DEFAULT, params=params)
+        return ig_client._parse_publish_response(resp, creation_id)
+
+    async def _iter_pages(
+        self, url: str, params: dict[str, Any], stop_before: Optional[datetime] = None
+    ) -> AsyncIterator[list[dict]]:
+        """Como ig_client._iter_pages: segue paging.next só quando a página anterior foi consumida."""
+        next_url: Optional[str] = url
+        next_params: Optional[dict[str, Any]] = params
+        while next_url:
+            resp = await self._request("GET", next_url, ig_client.TIMEOUT_DEFAULT, params=next_params)
+            items, next_url = ig_client._parse_page(resp)
+            next_params = None
+            if items:
+                yield items
+            if ig_client._page_reaches(items, stop_before):
+                return
+
+    async def iter_media(
+        self,
+        fields: str = "id,timestamp",
+        page_size: int = ig_client._MEDIA_PAGE_SIZE,
+        stop_before: Optional[datetime] = None,
+    ) -> AsyncIterator[dict]:
+        """Como ig_client.iter_media."""
+        ig_client._check_config()
+        url = ig_client._url(f"/{get_ig_business_id()}/media")
+        async for page in self._iter_pages(url, ig_client._page_params(fields, page_size), stop_before):
+            for item in page:
+                yield item
+
+    async def iter_comments(
+        self,
+        media_id: str,
+        page_size: int = ig_client._COMMENTS_PAGE_SIZE,
+        stop_before: Optional[datetime] = None,
+    ) -> AsyncIterator[dict]:
+        """Como ig_client.iter_comments."""
+        ig_client._check_config()
+        url = ig_client._url(f"/{media_id}/comments")
+        params = ig_client._page_params(ig_client._COMMENT_FIELDS, page_size)
+        async for page in self._iter_pages(url, params, stop_before):
+            for item in page:
+                yield item
+
+    async def get_media_ids(self, limit: int = 25) -> list[str]:
+        """Como ig_client.get_media_ids."""
+        ids: list[str] = []
+        if limit <= 0:
+            return ids
+        async for media in self.iter_media(fields="id", page_size=min(limit, ig_client._PAGE_SIZE_MAX)):
+            if media.get("id"):
+                ids.append(media["id"])
+            if len(ids) >= limit:
+                break
+        return ids
+
+    async def get_comments(self, media_id: str, stop_before: Optional[datetime] = None) -> list[dict]:
+        """Como ig_client.get_comments."""
+        return [c async for c in self.iter_comments(media_id, stop_before=stop_before)]
+
+    async def get_comments_many(self, media_ids: list[str], stop_before: Optional[datetime] = None) -> dict[str, Any]:
+        """
+        Comentários de vários media em simultâneo: {media_id: lista de comentários ou a excepção}.
+        As páginas de cada media são pedidas em sequência (o cursor vem da página anterior).
+        """
+        results = await asyncio.gather(
+            *(self.get_comments(m, stop_before=stop_before) for m in media_ids), return_exceptions=True
+        )
+        return dict(zip(media_ids, results))
+
+    async def reply_to_comment(self, comment_id: str, message: str) -> str:
+        """Como ig_client.reply_to_comment."""
+        ig_client._check_config()
+        params = {"message": message[:300], "access_token": get_ig_access_token()}
+        resp = await self._request("POST", ig_client._url(f"/{comment_id}/replies"), ig_client.TIMEOUT_DEFAULT, params=params)
+        return ig_client._parse_reply_response(resp)
@@ -0,0 +1,223 @@
+"""
+Modelo partilhado do uso da Graph API (rate limits da Meta).
+Cada resposta do ig_client (síncrono e assíncrono) passa por record_response: os headers de uso
+(X-App-Usage, X-Business-Use-Case-Usage, ...) e os erros de rate limit (códigos 4, 17, 32, 613)
+actualizam a percentagem de uso e o instante até ao qual a API está bloqueada. O estado é gravado em
+.ig_api_usage.json, partilhado entre a app e o CLI/Task Scheduler.
+
+O tráfego não crítico (autoresposta a comentários, Stories e Reels reutilizados) consulta
+defer_reason() e slowdown_factor(): abranda a partir de IG_USAGE_SLOWDOWN_PERCENT e é adiado a partir
+de IG_USAGE_DEFER_PERCENT, deixando margem para os posts agendados do feed.
+"""
+import json
+import logging
+import threading
+import time as _time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional
+
+import requests
+
+from instagram_poster.config import get_ig_usage_defer_percent, get_ig_usage_slowdown_percent
+
+logger = logging.getLogger(__name__)
+
+# Códigos de erro da Meta/Instagram que indicam rate limit
+RATE_LIMIT_ERROR_CODES = (4, 17, 32, 613)
+RATE_LIMIT_LABELS = {
+    4: "rate limit da app",
+    17: "rate limit do utilizador",
+    32: "rate limit de páginas",
+    613: "rate limit customizado",
+}
+# Headers de uso da Meta (valor em percentagem; 100 = no limite)
+USAGE_HEADERS = ("X-App-Usage", "X-Business-Use-Case-Usage", "X-Ad-Account-Usage", "X-Page-Usage")
+_PERCENT_KEYS = ("call_count", "total_time", "total_cputime", "acc_id_util_pct")
+_REGAIN_KEY = "estimated_time_to_regain_access"  # minutos
+
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent
+_USAGE_FILE = _PROJECT_ROOT / ".ig_api_usage.json"
+_WINDOW_SEC = 3600  # a Meta conta o uso numa janela móvel de 1 h
+_BLOCK_DEFAULT_SEC = 3600  # bloqueio assumido após um erro de rate limit sem estimativa de recuperação
+_SAVE_MIN_INTERVAL_SEC = 30
+_SAVE_MIN_DELTA_PCT = 5.0
+_MAX_SLOWDOWN = 4.0  # factor das pausas do tráfego não crítico perto do limiar de adiamento
+
+_lock = threading.Lock()
+_state: dict[str, Any] = {"pct": 0.0, "at": 0.0, "blocked_until": 0.0, "headers": {}}
+_saved: dict[str, float] = {"pct": 0.0, "at": 0.0, "blocked_until": 0.0}
+_file_mtime: float = 0.0
+
+
+def parse_usage(value: str) -> tuple[Optional[float], float]:
+    """
+    (maior percentagem, minutos até recuperar o acesso) de um header de uso.
+    Aceita o formato JSON da Meta ({"call_count":28,"total_time":25,...}, ou por conta/negócio com
+    listas) e o formato antigo com percentagens separadas por vírgula.
+    """
+    raw = str(value or "").strip()
+    pcts: list[float] = []
+    regain = 0.0
+    try:
+        data = json.loads(raw)
+    except ValueError:
+        for part in raw.split(","):
+            p = part.replace("%", "").strip()
+            try:
+                pcts.append(float(p))
+            except ValueError:
+                pass
+        return (max(pcts) if pcts else None), 0.0
+
+    stack = [data]
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, dict):
+            for k, v in obj.items():
+                if isinstance(v, (int, float)) and not isinstance(v, bool):
+                    if k in _PERCENT_KEYS:
+                        pcts.append(float(v))
+                    elif k == _REGAIN_KEY:
+                        regain = max(regain, float(v))
+                else:
+                    stack.append(v)
+        elif isinstance(obj, list):
+            stack.extend(obj)
+        elif isinstance(obj, (int, float)) and not isinstance(obj, bool):
+            pcts.append(float(obj))
+    return (max(pcts) if pcts else None), regain
+
+
+def _rate_limit_code(resp: requests.Response) -> Optional[int]:
+    if resp.status_code < 400:
+        return None
+    try:
+        code = (resp.json().get("error") or {}).get("code")
+    except (ValueError, AttributeError):
+        return None
+    return code if code in RATE_LIMIT_ERROR_CODES else None
+
+
+def _sync_from_file() -> None:
+    """Junta o estado gravado por outro processo, se o ficheiro mudou (chamar com _lock)."""
+    global _file_mtime
+    try:
+        mtime = _USAGE_FILE.stat().st_mtime
+    except OSError:
+        return
+    if mtime <= _file_mtime:
+        return
+    _file_mtime = mtime
+    try:
+        data = json.loads(_USAGE_FILE.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return
+    if float(data.get("at", 0)) > _state["at"]:
+        _state.update(pct=float(data.get("pct", 0)), at=float(data["at"]), headers=data.get("headers") or {})
+    _state["blocked_until"] = max(_state["blocked_until"], float(data.get("blocked_until", 0)))
+
+
+def _save(force: bool) -> None:
+    """Grava o estado (chamar com _lock); sem force, só se mudou o suficiente desde a última gravação."""
+    global _file_mtime
+    if not force and (
+        abs(_state["pct"] - _saved["pct"]) < _SAVE_MIN_DELTA_PCT
+        and _state["at"] - _saved["at"] < _SAVE_MIN_INTERVAL_SEC
+    ):
+        return
+    _sync_from_file()
+    tmp = _USAGE_FILE.with_suffix(".tmp")
+    try:
+        tmp.write_text(json.dumps(_state, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(_USAGE_FILE)
+        _file_mtime = _USAGE_FILE.stat().st_mtime
+    except OSError as e:
+        logger.debug("Não foi possível gravar %s: %s", _USAGE_FILE.name, e)
+        return
+    _saved.update(pct=_state["pct"], at=_state["at"], blocked_until=_state["blocked_until"])
+
+
+def record_response(resp: requests.Response) -> None:
+    """Actualiza o modelo de uso a partir de uma resposta da Graph API (nunca levanta excepções)."""
+    try:
+        headers = {name: resp.headers[name] for name in USAGE_HEADERS if name in resp.headers}
+        pct: Optional[float] = None
+        regain = 0.0
+        for value in headers.values():
+            p, r = parse_usage(value)
+            if p is not None:
+                pct = p if pct is None else max(pct, p)
+            regain = max(regain, r)
+        code = _rate_limit_code(resp)
+        if pct is None and not regain and code is None:
+            return
+        now = _time.time()
+        with _lock:
+            if pct is not None:
+                _state.update(pct=pct, at=now, headers=headers)
+            blocked = False
+            if regain > 0 or code is not None:
+                until = now + (regain * 60 if regain > 0 else _BLOCK_DEFAULT_SEC)
+                blocked = until > _state["blocked_until"] + 60
+                _state["blocked_until"] = max(_state["blocked_until"], until)
+            _save(force=blocked)
+        if blocked:
+            logger.warning(
+                "Graph API em rate limit%s; tráfego não crítico adiado até %s",
+                f" (código {code}: {RATE_LIMIT_LABELS.get(code, 'limite da API')})" if code is not None else "",
+                datetime.fromtimestamp(_state["blocked_until"]).strftime("%H:%M"),
+            )
+    except Exception:
+        logger.debug("Falha a registar o uso da Graph API", exc_info=True)
+
+
+def usage_percent() -> float:
+    """
+    Uso estimado agora (0-100+): a última leitura, reduzida linearmente com a idade
+    (a janela da Meta é de 1 h); 100 enquanto a API estiver bloqueada.
+    """
+    with _lock:
+        _sync_from_file()
+        pct, at, blocked_until = _state["pct"], _state["at"], _state["blocked_until"]
+    now = _time.time()
+    if blocked_until > now:
+        return max(100.0, pct)
+    return pct * max(0.0, 1.0 - (now - at) / _WINDOW_SEC)
+
+
+def defer_reason() -> Optional[str]:
+    """Motivo para adiar tráfego não crítico (None = pode avançar)."""
+    with _lock:
+        _sync_from_file()
+        blocked_until = _state["blocked_until"]
+    if blocked_until > _time.time():
+        return f"API em rate limit até {datetime.fromtimestamp(blocked_until).strftime('%H:%M')}"
+    pct = usage_percent()
+    limit = get_ig_usage_defer_percent()
+    if pct >= limit:
+        return f"uso da API a {pct:.0f}% (adiamento a partir de {limit:.0f}%)"
+    return None
+
+
+def slowdown_factor() -> float:
+    """Multiplicador das pausas do tráfego não crítico: 1 abaixo do limiar de abrandamento, até _MAX_SLOWDOWN."""
+    pct = usage_percent()
+    low, high = get_ig_usage_slowdown_percent(), get_ig_usage_defer_percent()
+    if pct <= low or high <= low:
+        return 1.0
+    return 1.0 + (_MAX_SLOWDOWN - 1.0) * min(1.0, (pct - low) / (high - low))
+
+
+def snapshot() -> dict[str, Any]:
+    """Estado actual para a UI: uso estimado, última leitura, bloqueio e headers."""
+    with _lock:
+        _sync_from_file()
+        state = dict(_state)
+    return {
+        "usage_percent": usage_percent(),
+        "last_percent": state["pct"],
+        "last_at": datetime.fromtimestamp(state["at"]) if state["at"] else None,
+        "blocked_until": datetime.fromtimestamp(state["blocked_until"]) if state["blocked_until"] > _time.time() else None,
+        "headers": state.get("headers") or {},
+    }
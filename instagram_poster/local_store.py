@@ -0,0 +1,215 @@
+"""
+Espelho local (SQLite) do separador de conteúdo do Google Sheet.
+Opcional (SHEETS_LOCAL_MIRROR=true): o sheets_client sincroniza aqui cada leitura completa do Sheet
+(só as linhas alteradas são reescritas) e, enquanto o ficheiro não mudar no Drive, carrega o snapshot
+a partir da base local em vez de voltar a ler o Sheet — também noutros processos (CLI, reinícios).
+As escritas feitas pelo sheets_client vão para o Sheet e para a base local (write-through).
+O Sheet continua a ser a superfície de edição humana e a fonte de verdade.
+"""
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Generator, Optional
+
+from instagram_poster.config import get_sheets_local_mirror_enabled, get_sheets_local_mirror_path
+
+logger = logging.getLogger(__name__)
+
+# Coluna do Sheet -> coluna da tabela posts (mesma ordem que sheets_client)
+COLUMN_MAP: dict[str, str] = {
+    "Date": "date",
+    "Time": "time",
+    "Image Text": "image_text",
+    "Caption": "caption",
+    "Gemini_Prompt": "gemini_prompt",
+    "Status": "status",
+    "Published": "published",
+    "ImageURL": "image_url",
+    "Image Prompt": "image_prompt",
+    "ID": "post_key",  # coluna ID opcional do Sheet (o post_id derivado não é guardado)
+}
+_DB_COLUMNS = tuple(COLUMN_MAP.values())
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS posts (
+    row_index INTEGER PRIMARY KEY,
+    {", ".join(f"{c} TEXT NOT NULL DEFAULT ''" for c in _DB_COLUMNS)},
+    row_hash TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_posts_schedule ON posts(status, published, date, time);
+CREATE INDEX IF NOT EXISTS idx_posts_date ON posts(date, time);
+CREATE INDEX IF NOT EXISTS idx_posts_post_key ON posts(post_key);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+_init_lock = threading.Lock()
+_initialized_paths: set[str] = set()
+
+
+def is_enabled() -> bool:
+    return get_sheets_local_mirror_enabled()
+
+
+@contextmanager
+def _connect() -> Generator[sqlite3.Connection, None, None]:
+    """Ligação à base local (uma por operação; WAL permite leituras concorrentes entre processos)."""
+    path: Path = get_sheets_local_mirror_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=10)
+    try:
+        with _init_lock:
+            if str(path) not in _initialized_paths:
+                conn.execute("PRAGMA journal_mode=WAL")
+                _migrate_schema(conn)
+                conn.executescript(_SCHEMA)
+                _initialized_paths.add(str(path))
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def _migrate_schema(conn: sqlite3.Connection) -> None:
+    """Bases criadas por versões anteriores: acrescenta as colunas de COLUMN_MAP que faltem."""
+    existing = {r[1] for r in conn.execute("PRAGMA table_info(posts)")}
+    if not existing:
+        return
+    for c in _DB_COLUMNS:
+        if c not in existing:
+            conn.execute(f"ALTER TABLE posts ADD COLUMN {c} TEXT NOT NULL DEFAULT ''")
+            # Coluna nova ainda vazia: forçar ressincronização com o Sheet
+            conn.execute("UPDATE posts SET row_hash = ''")
+            conn.execute("UPDATE meta SET value = NULL WHERE key = 'marker'")
+
+
+def _get_meta(conn: sqlite3.Connection, key: str) -> Optional[str]:
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def _set_meta(conn: sqlite3.Connection, key: str, value: Optional[str]) -> None:
+    conn.execute("INSERT OR REPLACE INTO meta(key, value) VALUES (?, ?)", (key, value))
+
+
+def _row_values(row: list[Any], header_idx: dict[str, int]) -> tuple[str, ...]:
+    n = len(row)
+    out = []
+    for name in COLUMN_MAP:
+        idx = header_idx.get(name, -1)
+        v = row[idx] if 0 <= idx < n else ""
+        out.append("" if v is None else str(v))
+    return tuple(out)
+
+
+def _hash_values(values: tuple[str, ...]) -> str:
+    return hashlib.sha1("\x1f".join(values).encode("utf-8")).hexdigest()
+
+
+def sync_rows(sheet_key: str, marker: Optional[str], rows: list[list[str]]) -> int:
+    """
+    Sincroniza a base local com uma leitura completa do Sheet (rows = get_all_values()).
+    Apenas as linhas cujo conteúdo mudou são reescritas; linhas que deixaram de existir são apagadas.
+    Devolve o número de linhas inseridas/alteradas.
+    """
+    header = rows[0] if rows else []
+    header_idx = {(h or "").strip(): i for i, h in enumerate(header) if (h or "").strip()}
+    with _connect() as conn:
+        same_sheet = _get_meta(conn, "sheet_key") == sheet_key
+        existing = dict(conn.execute("SELECT row_index, row_hash FROM posts")) if same_sheet else {}
+        if not same_sheet:
+            conn.execute("DELETE FROM posts")
+        changed = []
+        for i in range(1, len(rows)):
+            values = _row_values(rows[i], header_idx)
+            h = _hash_values(values)
+            if existing.get(i + 1) != h:
+                changed.append((i + 1, *values, h))
+        if changed:
+            placeholders = ", ".join("?" for _ in range(len(_DB_COLUMNS) + 2))
+            conn.executemany(
+                f"INSERT OR REPLACE INTO posts(row_index, {', '.join(_DB_COLUMNS)}, row_hash) VALUES ({placeholders})",
+                changed,
+            )
+        conn.execute("DELETE FROM posts WHERE row_index > ?", (len(rows),))
+        _set_meta(conn, "sheet_key", sheet_key)
+        _set_meta(conn, "marker", marker)
+        _set_meta(conn, "header", json.dumps(header, ensure_ascii=False))
+    if changed:
+        logger.info("Espelho local: %d linha(s) sincronizada(s)", len(changed))
+    return len(changed)
+
+
+def load_rows(sheet_key: str, marker: str) -> Optional[list[list[str]]]:
+    """
+    Reconstrói as linhas do Sheet (formato get_all_values) a partir da base local, se esta estiver
+    sincronizada com o mesmo Sheet e o mesmo marcador do Drive. Caso contrário devolve None.
+    Colunas do cabeçalho que não estão em COLUMN_MAP vêm vazias.
+    """
+    if not marker:
+        return None
+    with _connect() as conn:
+        if _get_meta(conn, "sheet_key") != sheet_key or _get_meta(conn, "marker") != marker:
+            return None
+        header = json.loads(_get_meta(conn, "header") or "[]")
+        db_rows = conn.execute(
+            f"SELECT row_index, {', '.join(_DB_COLUMNS)} FROM posts ORDER BY row_index"
+        ).fetchall()
+    if not header:
+        return None
+    width = len(header)
+    positions = [(j, i) for j, name in enumerate(COLUMN_MAP) for i, h in enumerate(header) if (h or "").strip() == name]
+    rows: list[list[str]] = [list(header)]
+    for db_row in db_rows:
+        row_index = db_row[0]
+        while len(rows) < row_index - 1:
+            rows.append([""] * width)
+        row = [""] * width
+        for j, i in positions:
+            row[i] = db_row[j + 1]
+        rows.append(row)
+    return rows
+
+
+def update_cells(sheet_key: str, updates: dict[int, dict[str, str]], marker: Optional[str]) -> None:
+    """
+    Write-through: aplica à base local as escritas já feitas no Sheet.
+    updates: {row_index: {nome da coluna no Sheet: valor}}. marker é o marcador do Drive depois da
+    escrita (None marca a base como desactualizada, obrigando a nova sincronização).
+    """
+    with _connect() as conn:
+        if _get_meta(conn, "sheet_key") != sheet_key:
+            return
+        for row_index, fields in updates.items():
+            cols = [(COLUMN_MAP[name], value) for name, value in fields.items() if name in COLUMN_MAP]
+            if not cols:
+                continue
+            conn.execute(
+                f"UPDATE posts SET {', '.join(f'{c} = ?' for c, _ in cols)} WHERE row_index = ?",
+                (*[v for _, v in cols], row_index),
+            )
+            current = conn.execute(
+                f"SELECT {', '.join(_DB_COLUMNS)} FROM posts WHERE row_index = ?", (row_index,)
+            ).fetchone()
+            if current:
+                conn.execute(
+                    "UPDATE posts SET row_hash = ? WHERE row_index = ?",
+                    (_hash_values(tuple(current)), row_index),
+                )
+        _set_meta(conn, "marker", marker)
+
+
+def mark_stale(sheet_key: str) -> None:
+    """Invalida o marcador (ex.: após append_rows): a próxima leitura volta a sincronizar com o Sheet."""
+    with _connect() as conn:
+        if _get_meta(conn, "sheet_key") == sheet_key:
+            _set_meta(conn, "marker", None)
@@ -0,0 +1,195 @@
+"""
+Pré-preparação de posts agendados.
+PUBLISH_PRESTAGE_LEAD_MINUTES antes da hora (Date + Time) de um post ready, obtém a imagem (gera e faz
+upload se preciso), cria o container (create_media) e espera que fique FINISHED, guardando o
+creation_id em .prestaged_containers.json. À hora agendada, scheduler.publish_post só chama o
+media_publish e o autopublish acorda nesse segundo (seconds_until_next_due), em vez de esperar pelo
+ciclo seguinte e pagar geração, upload e processamento nesse momento.
+Os containers do Instagram expiram ~24 h após a criação; os que estão perto disso são recriados.
+Um ciclo sem posts na janela não lê o Sheet (usa o índice de agendamento, revalidado pelo Drive).
+Desactivada por omissão (PUBLISH_PRESTAGE_LEAD_MINUTES=0); corre no ciclo do autopublish e no
+scripts/autopublish_cli.py (Task Scheduler).
+"""
+import json
+import logging
+import threading
+import time as _time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from instagram_poster import ig_client, sheets_client
+from instagram_poster.config import get_publish_prestage_lead_seconds
+
+logger = logging.getLogger(__name__)
+
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent
+_STAGED_FILE = _PROJECT_ROOT / ".prestaged_containers.json"
+_CONTAINER_TTL_SEC = 24 * 3600
+_RESTAGE_MARGIN_SEC = 3600  # containers com mais de TTL - 1 h são recriados na pré-preparação
+_PUBLISH_MARGIN_SEC = 10 * 60  # à hora de publicar, só usa containers com pelo menos 10 min de vida
+_DROP_AFTER_DUE_SEC = 6 * 3600  # entradas cuja hora passou há mais de 6 h (post publicado noutro nó, etc.)
+_STAGE_MAX_WAIT_SEC = 120
+
+_lock = threading.Lock()
+
+
+def _load() -> dict[str, dict[str, Any]]:
+    try:
+        data = json.loads(_STAGED_FILE.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _update(fn: Callable[[dict[str, dict[str, Any]]], Any]) -> Any:
+    """Aplica fn às entradas (post_id -> entrada) e grava o ficheiro de forma atómica."""
+    with _lock:
+        entries = _load()
+        result = fn(entries)
+        tmp = _STAGED_FILE.with_suffix(".tmp")
+        try:
+            tmp.write_text(json.dumps(entries, indent=2, ensure_ascii=False), encoding="utf-8")
+            tmp.replace(_STAGED_FILE)
+        except OSError as e:
+            logger.warning("Não foi possível gravar %s: %s", _STAGED_FILE.name, e)
+        return result
+
+
+def _age(entry: dict[str, Any]) -> float:
+    return _time.time() - float(entry.get("created_at", 0))
+
+
+def _due_at(entry: dict[str, Any]) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(entry["due_at"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _matches(entry: dict[str, Any], post: dict[str, Any]) -> bool:
+    """O container ainda corresponde ao post (caption e, se o Sheet tiver ImageURL, a mesma imagem)."""
+    if (post.get("caption") or "").strip() != entry.get("caption"):
+        return False
+    image_url = (post.get("image_url") or "").strip()
+    return not image_url.startswith(("http://", "https://")) or image_url == entry.get("image_url")
+
+
+def _stage(post: sheets_client.PostRecord, due: datetime, image_url: Optional[str]) -> dict[str, Any]:
+    """Cria e valida o container do post; devolve a entrada a guardar."""
+    from instagram_poster.scheduler import resolve_image_url
+
+    caption = (post.caption or "").strip()
+    image_url = image_url or resolve_image_url(post)
+    creation_id = ig_client.create_media(image_url=image_url, caption=caption)
+    ig_client._wait_for_container(creation_id, max_wait=_STAGE_MAX_WAIT_SEC)
+    logger.info("Pré-preparado: linha %s (%s), container %s", post.row_index, due.isoformat(timespec="minutes"), creation_id)
+    return {
+        "creation_id": creation_id,
+        "image_url": image_url,
+        "caption": caption,
+        "row_index": post.row_index,
+        "due_at": due.isoformat(timespec="seconds"),
+        "created_at": _time.time(),
+    }
+
+
+def _is_current(entry: Optional[dict[str, Any]], row_index: int, due: datetime) -> bool:
+    """A entrada é para esta linha e hora e o container ainda não precisa de ser recriado."""
+    return (
+        entry is not None
+        and entry.get("row_index") == row_index
+        and entry.get("due_at") == due.isoformat(timespec="seconds")
+        and _age(entry) < _CONTAINER_TTL_SEC - _RESTAGE_MARGIN_SEC
+    )
+
+
+def stage_upcoming(now: Optional[datetime] = None) -> int:
+    """
+    Pré-prepara os posts ready cuja hora cai entre agora e agora + PUBLISH_PRESTAGE_LEAD_MINUTES
+    (e recria os containers perto de expirar). Devolve o nº de containers criados.
+    Os candidatos vêm do índice de agendamento (sheets_client.get_ready_posts_between, sem reler o
+    Sheet enquanto não mudar no Drive); a linha completa só é lida quando há um container a criar.
+    """
+    lead = get_publish_prestage_lead_seconds()
+    if lead <= 0:
+        return 0
+    now = now or datetime.now()
+    candidates = sheets_client.get_ready_posts_between(now, now + timedelta(seconds=lead))
+
+    def prune(entries: dict[str, dict[str, Any]]) -> dict[str, dict[str, Any]]:
+        for post_id, entry in list(entries.items()):
+            due = _due_at(entry)
+            if due is None or _age(entry) >= _CONTAINER_TTL_SEC or (now - due).total_seconds() > _DROP_AFTER_DUE_SEC:
+                del entries[post_id]
+        return dict(entries)
+
+    entries = _update(prune) if candidates or _STAGED_FILE.exists() else {}
+    by_row = {e.get("row_index"): e for e in entries.values()}
+    staged = 0
+    for candidate in candidates:
+        due = datetime.combine(candidate.post_date, candidate.post_time)
+        if _is_current(by_row.get(candidate.row_index), candidate.row_index, due):
+            continue
+        try:
+            post = sheets_client.get_row_by_index(candidate.row_index, fresh=True)
+            if post is None or not post.is_ready or post.is_published or post.sort_key != candidate.sort_key:
+                logger.info("Pré-preparação: linha %s mudou desde a leitura; fica para o próximo ciclo", candidate.row_index)
+                continue
+            entry = entries.get(post.post_id)
+            if entry is not None and _matches(entry, post):
+                if _age(entry) < _CONTAINER_TTL_SEC - _RESTAGE_MARGIN_SEC:
+                    # Mesmo post noutra linha ou hora (linhas inseridas, reagendado): só actualizar a entrada
+                    moved = {"row_index": post.row_index, "due_at": due.isoformat(timespec="seconds")}
+                    _update(lambda e, pid=post.post_id, m=moved: e.get(pid, {}).update(m))
+                    by_row[post.row_index] = {**entry, **moved}
+                    continue
+                reuse_image = entry.get("image_url")
+            else:
+                reuse_image = None
+            new_entry = _stage(post, due, reuse_image)
+        except Exception as e:
+            logger.warning("Pré-preparação falhou (linha %s): %s", candidate.row_index, e)
+            continue
+        _update(lambda e, pid=post.post_id, ne=new_entry: e.__setitem__(pid, ne))
+        staged += 1
+    return staged
+
+
+def get_staged(post: dict[str, Any]) -> Optional[dict[str, Any]]:
+    """Entrada pré-preparada do post, se ainda corresponder ao post e o container não estiver perto de expirar."""
+    post_id = post.get("post_id")
+    if not post_id:
+        return None
+    with _lock:
+        entry = _load().get(post_id)
+    if entry is None or not entry.get("creation_id"):
+        return None
+    if not _matches(entry, post):
+        logger.info("Pré-preparação da linha %s não corresponde ao post actual (editado?); a ignorar", post.get("row_index"))
+        return None
+    if _age(entry) > _CONTAINER_TTL_SEC - _PUBLISH_MARGIN_SEC:
+        logger.info("Container pré-preparado da linha %s perto de expirar; a ignorar", post.get("row_index"))
+        return None
+    return entry
+
+
+def discard(post_id: Optional[str]) -> None:
+    """Remove a entrada do post (após publicar, ou se o container foi recusado)."""
+    if not post_id:
+        return
+    with _lock:
+        if post_id not in _load():
+            return
+    _update(lambda entries: entries.pop(post_id, None))
+
+
+def seconds_until_next_due(now: Optional[datetime] = None) -> Optional[float]:
+    """Segundos até à hora do próximo post pré-preparado (só horas futuras), ou None se não houver."""
+    now = now or datetime.now()
+    with _lock:
+        entries = _load()
+    future = [d for d in (_due_at(e) for e in entries.values()) if d is not None and d > now]
+    if not future:
+        return None
+    return (min(future) - now).total_seconds()
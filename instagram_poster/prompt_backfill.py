@@ -0,0 +1,80 @@
+"""
+Preenchimento em massa da coluna Gemini_Prompt a partir da Image Text.
+As conversões quote -> cena visual (LLM) correm em paralelo num pool limitado de threads;
+os resultados são escritos no Sheet em lotes (um batch_update por lote), não célula a célula.
+Linhas que já têm Gemini_Prompt são ignoradas, excepto com force=True.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Optional
+
+from instagram_poster import sheets_client
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_MAX_WORKERS = 4  # pedidos simultâneos ao LLM (Pollinations)
+_DEFAULT_BATCH_SIZE = 50  # linhas por batch_update
+
+
+def backfill_gemini_prompts(
+    force: bool = False,
+    max_workers: int = _DEFAULT_MAX_WORKERS,
+    batch_size: int = _DEFAULT_BATCH_SIZE,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+) -> dict[str, Any]:
+    """
+    Gera Gemini_Prompt para as linhas com Image Text e grava-os no Sheet em lotes.
+    - force: também regenera linhas que já têm Gemini_Prompt.
+    - on_progress(feitas, total): chamado na thread de quem invoca, após cada conversão.
+    Conversões que caem no prompt genérico de fallback (falha do LLM) não são gravadas,
+    para serem tentadas de novo na próxima execução.
+    Devolve {"total", "updated", "skipped", "failed"}.
+    """
+    from instagram_poster.image_generator import _GENERIC_FALLBACK_PROMPT, _quote_to_scene_prompt
+
+    rows = sheets_client.get_all_rows_with_image_text()
+    todo = [r for r in rows if r.image_text and (force or not r.gemini_prompt)]
+    result = {"total": len(todo), "updated": 0, "skipped": len(rows) - len(todo), "failed": 0}
+    if not todo:
+        return result
+    logger.info(
+        "Backfill Gemini_Prompt: %d linha(s) a converter, %d ignorada(s), %d thread(s)",
+        len(todo), result["skipped"], max_workers,
+    )
+
+    # Linhas resolvidas uma vez, desta leitura: cada lote só relê as suas linhas antes de escrever
+    rows_by_id: dict[str, int] = {}
+    for rec in todo:
+        rows_by_id.setdefault(rec.post_id, rec.row_index)
+    pending: dict[str, dict[str, str]] = {}
+
+    def flush() -> None:
+        if not pending:
+            return
+        missing = sheets_client.update_posts_fields(pending, rows=rows_by_id)
+        result["updated"] += len(pending) - len(missing)
+        result["failed"] += len(missing)
+        pending.clear()
+
+    done = 0
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="gemini-prompt") as pool:
+        futures = {pool.submit(_quote_to_scene_prompt, rec.image_text): rec for rec in todo}
+        for future in as_completed(futures):
+            rec = futures[future]
+            done += 1
+            try:
+                scene = future.result()
+            except Exception as e:
+                logger.warning("Backfill Gemini_Prompt: linha %s falhou: %s", rec.row_index, e)
+                scene = None
+            if not scene or scene == _GENERIC_FALLBACK_PROMPT:
+                result["failed"] += 1
+            else:
+                pending[rec.post_id] = {sheets_client.COL_GEMINI_PROMPT: scene}
+                if len(pending) >= batch_size:
+                    flush()
+            if on_progress:
+                on_progress(done, len(todo))
+    flush()
+    logger.info("Backfill Gemini_Prompt concluído: %s", result)
+    return result
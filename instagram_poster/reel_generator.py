@@ -30,43 +30,103 @@ logger = logging.getLogger(__name__)
 _ASSETS_MUSIC = Path(__file__).resolve().parent.parent / "assets" / "music"
 _MUSIC_FOLDER = _ASSETS_MUSIC / "MUSIC"
 _ASSETS_ROOT = Path(__file__).resolve().parent.parent / "assets"
-_REELS_USED_ROWS_FILE = _ASSETS_ROOT / "reels_used_rows.json"
+_REELS_USED_ROWS_FILE = _ASSETS_ROOT / "reels_used_rows.json"  # formato antigo (row_index); migrado para post_id
+_REELS_USED_POSTS_FILE = _ASSETS_ROOT / "reels_used_posts.json"
+# Existe enquanto a conversão de reels_used_rows.json não terminou (Sheet indisponível) mas já houve Reels novos
+_REELS_MIGRATION_PENDING_FILE = _ASSETS_ROOT / "reels_used_rows.pending"
 
 
-def get_reel_used_row_indices() -> set[int]:
-    """Lê assets/reels_used_rows.json e devolve o conjunto de row_index já usados em Reels."""
-    if not _REELS_USED_ROWS_FILE.exists():
-        return set()
+def _migrate_legacy_reel_used_rows() -> tuple[set[str], bool]:
+    """
+    Converte assets/reels_used_rows.json (row_index) para post_id usando as linhas actuais do Sheet.
+    Devolve (post_ids, completa). Só é completa se todas as linhas foram lidas sem erro; caso contrário
+    nada é gravado e a conversão repete-se na próxima leitura. O ficheiro antigo fica intacto.
+    Linhas que já não existem são ignoradas.
+    """
     try:
         with open(_REELS_USED_ROWS_FILE, encoding="utf-8") as f:
             data = json.load(f)
+    except (json.JSONDecodeError, OSError):
+        return set(), True
+    rows = [int(x) for x in data if isinstance(x, (int, float))] if isinstance(data, list) else []
+    if not rows:
+        return set(), True
+    from instagram_poster.sheets_client import get_row_by_index
+    post_ids = set()
+    for row_index in rows:
+        try:
+            rec = get_row_by_index(row_index)
+        except Exception as e:
+            logger.warning("Reels: conversão de reels_used_rows.json adiada (linha %s: %s)", row_index, e)
+            return post_ids, False
+        if rec is not None:
+            post_ids.add(rec.post_id)
+    logger.info("Reels: %d linha(s) de reels_used_rows.json convertidas para post_id", len(post_ids))
+    return post_ids, True
+
+
+def _read_reel_used_post_ids() -> set[str]:
+    try:
+        with open(_REELS_USED_POSTS_FILE, encoding="utf-8") as f:
+            data = json.load(f)
     except (json.JSONDecodeError, OSError):
         return set()
     if not isinstance(data, list):
         return set()
-    return set(int(x) for x in data if isinstance(x, (int, float)))
+    return set(str(x) for x in data if isinstance(x, str) and x)
 
 
-def mark_posts_used_in_reel(row_indices: list[int]) -> None:
-    """Regista os row_index como usados em Reels (persiste em assets/reels_used_rows.json)."""
-    if not row_indices:
-        return
-    current = get_reel_used_row_indices()
-    current.update(row_indices)
+def _load_reel_used_post_ids() -> tuple[set[str], bool]:
+    """(post_id usados em Reels, conversão do formato antigo concluída)."""
+    migrating = _REELS_USED_ROWS_FILE.exists() and (
+        not _REELS_USED_POSTS_FILE.exists() or _REELS_MIGRATION_PENDING_FILE.exists()
+    )
+    used = _read_reel_used_post_ids()
+    if not migrating:
+        return used, True
+    migrated, complete = _migrate_legacy_reel_used_rows()
+    used |= migrated
+    if complete:
+        try:
+            _write_reel_used_post_ids(used)
+            _REELS_MIGRATION_PENDING_FILE.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning("Não foi possível gravar reels_used_posts.json: %s", e)
+    return used, complete
+
+
+def get_reel_used_post_ids() -> set[str]:
+    """Lê assets/reels_used_posts.json e devolve o conjunto de post_id já usados em Reels."""
+    return _load_reel_used_post_ids()[0]
+
+
+def _write_reel_used_post_ids(post_ids: set[str]) -> None:
     _ASSETS_ROOT.mkdir(parents=True, exist_ok=True)
-    payload = sorted(current)
+    with open(_REELS_USED_POSTS_FILE, "w", encoding="utf-8") as f:
+        json.dump(sorted(post_ids), f, indent=0)
+
+
+def mark_posts_used_in_reel(post_ids: list[str]) -> None:
+    """Regista os post_id como usados em Reels (persiste em assets/reels_used_posts.json)."""
+    if not post_ids:
+        return
+    current, complete = _load_reel_used_post_ids()
+    current.update(post_ids)
     try:
-        with open(_REELS_USED_ROWS_FILE, "w", encoding="utf-8") as f:
-            json.dump(payload, f, indent=0)
-        logger.info("Reels: %d linha(s) marcadas como usadas em Reel (total: %d)", len(row_indices), len(payload))
+        if not complete:
+            # Gravar os Reels novos sem dar a conversão do formato antigo por terminada
+            _ASSETS_ROOT.mkdir(parents=True, exist_ok=True)
+            _REELS_MIGRATION_PENDING_FILE.touch()
+        _write_reel_used_post_ids(current)
+        logger.info("Reels: %d post(s) marcados como usados em Reel (total: %d)", len(post_ids), len(current))
     except OSError as e:
-        logger.warning("Não foi possível gravar reels_used_rows.json: %s", e)
+        logger.warning("Não foi possível gravar reels_used_posts.json: %s", e)
 
 
 def get_posts_for_reel(n: int, allow_reuse: bool = False) -> list[dict[str, Any]]:
     """
     Devolve até n posts publicados elegíveis para Reel.
-    Se allow_reuse for False, exclui posts cujo row_index já foi usado em algum Reel.
+    Se allow_reuse for False, exclui posts cujo post_id já foi usado em algum Reel.
     """
     from instagram_poster.sheets_client import get_last_published_posts
     all_posts = get_last_published_posts(n=30)
@@ -74,8 +134,8 @@ def get_posts_for_reel(n: int, allow_reuse: bool = False) -> list[dict[str, Any]
         return []
     if allow_reuse:
         return all_posts[:n]
-    used = get_reel_used_row_indices()
-    eligible = [p for p in all_posts if (p.get("row_index") or 0) not in used]
+    used = get_reel_used_post_ids()
+    eligible = [p for p in all_posts if p.get("post_id") not in used]
     return eligible[:n]
 
 
@@ -6,12 +6,15 @@ import logging
 import os
 import random
 import time as _time
+from collections.abc import Mapping
 from contextlib import contextmanager
-from datetime import date, datetime, time
+from datetime import date, datetime, time, timezone
 from pathlib import Path
 from typing import Any, Generator, Literal, Optional
 
-from instagram_poster import ig_client, sheets_client
+import requests
+
+from instagram_poster import ig_client, prestage, sheet_write_queue, sheets_client
 
 _PROJECT_ROOT = Path(__file__).resolve().parent.parent
 _PUBLISH_LOCK_FILE = _PROJECT_ROOT / ".autopublish_publish.lock"
@@ -19,6 +22,7 @@ _PUBLISH_LOCK_STALE_SEC = 120  # lock com mais de 2 min é considerado órfão
 from instagram_poster.config import (
     get_autopublish_story_with_post,
     get_image_provider,
+    get_publish_claim_enabled,
 )
 from instagram_poster.providers import AVAILABLE_PROVIDERS
 
@@ -81,17 +85,39 @@ def _reload_env_before_story_check() -> None:
         pass
 
 
-def _update_sheet_after_publish(row_index: int, image_url: str) -> None:
+def _update_sheet_after_publish(
+    row_index: int, image_url: str, post_id: Optional[str] = None, caption: Optional[str] = None
+) -> None:
+    """
+    Marca a linha como publicada e atualiza ImageURL no Sheet sem bloquear a publicação:
+    a escrita vai para a fila persistente (sheet_write_queue), esvaziada em background com backoff.
+    Se não for possível pôr em fila, escreve directamente no Sheet (com retry).
+    Com reservas entre nós (PUBLISH_CLAIM_ENABLED), escreve sempre directamente: a fila pode ficar em
+    backoff para lá de PUBLISH_CLAIM_STALE_MINUTES e outro nó retomaria a reserva e republicaria o post.
     """
-    Marca a linha como publicada e atualiza ImageURL no Sheet, com retry.
+    if get_publish_claim_enabled():
+        _update_sheet_after_publish_sync(row_index, image_url)
+        return
+    try:
+        sheets_client.mark_published_deferred(row_index, image_url=image_url, post_id=post_id, caption=caption)
+        sheet_write_queue.start_worker()
+        logger.info("Sheet: linha %s -> Published=yes, ImageURL em fila de escrita", row_index)
+        return
+    except Exception as e:
+        logger.warning("Falha a pôr escrita do Sheet em fila (linha %s): %s; a escrever directamente", row_index, e)
+    _update_sheet_after_publish_sync(row_index, image_url)
+
+
+def _update_sheet_after_publish_sync(row_index: int, image_url: str) -> None:
+    """
+    Marca a linha como publicada e atualiza ImageURL no Sheet (um único pedido), com retry.
     Se falhar após todos os retries, regista o erro em log (e no autopublish se disponível)
     mas não levanta exceção — o post já foi publicado no Instagram.
     """
     last_error = None
     for attempt in range(1, _SHEET_UPDATE_RETRIES + 1):
         try:
-            sheets_client.mark_published(row_index)
-            sheets_client.update_image_url(row_index, image_url)
+            sheets_client.mark_published(row_index, image_url=image_url)
             logger.info("Sheet atualizado: linha %s -> Published=yes, ImageURL (tentativa %s)", row_index, attempt)
             return
         except Exception as e:
@@ -111,6 +137,72 @@ def _update_sheet_after_publish(row_index: int, image_url: str) -> None:
         pass
 
 
+def _published_on_instagram(post: Mapping[str, Any], since: float) -> Optional[str]:
+    """
+    media_id de um post do Instagram publicado depois de since (epoch, menos 1 min de margem) com a
+    mesma caption do post; None se não houver. Erros da API propagam-se (não se pode confirmar).
+    """
+    caption = (post.get("caption") or "").strip()
+    stop_before = datetime.fromtimestamp(since - 60, tz=timezone.utc)
+    for media in ig_client.iter_media(fields="id,caption,timestamp", stop_before=stop_before):
+        ts = ig_client.parse_timestamp(media.get("timestamp"))
+        if ts is not None and ts < stop_before:
+            break
+        if caption and (media.get("caption") or "").strip() == caption:
+            return media.get("id")
+    return None
+
+
+def _confirm_abandoned_claim(post: Mapping[str, Any], claimed_at: float) -> bool:
+    """
+    True se o post com reserva abandonada pode ser publicado: o nó que a deixou pode ter caído depois
+    de publicar no Instagram e antes de marcar o Sheet. Se o post já estiver no Instagram, marca o Sheet.
+    """
+    row_index = post.get("row_index")
+    try:
+        media_id = _published_on_instagram(post, claimed_at)
+    except Exception as e:
+        logger.warning("Linha %s: não foi possível confirmar no Instagram a reserva abandonada: %s", row_index, e)
+        return False
+    if media_id is None:
+        return True
+    logger.warning(
+        "Linha %s: reserva abandonada mas o post já está no Instagram (media %s); a marcar como publicado",
+        row_index, media_id,
+    )
+    _update_sheet_after_publish_sync(row_index, post.get("image_url") or "")
+    return False
+
+
+def _claim_for_publish(post: dict[str, Any]) -> tuple[bool, Optional[str]]:
+    """
+    Reserva a linha no Sheet antes de publicar (coordenação entre nós; ver sheets_client.claim_post).
+    Devolve (pode publicar, reserva). Com PUBLISH_CLAIM_ENABLED=false devolve (True, None), excepto
+    para uma reserva abandonada que já esteja publicada no Instagram.
+    Se a reserva falhar por erro do Sheet, não publica (não há forma de excluir os outros nós).
+    """
+    if not get_publish_claim_enabled():
+        abandoned = sheets_client.parse_claim(post.get("status") or "")
+        return (abandoned is None or _confirm_abandoned_claim(post, abandoned[1])), None
+    row_index = post.get("row_index")
+    try:
+        claim = sheets_client.claim_post(row_index, post.get("post_id"), confirm_takeover=_confirm_abandoned_claim)
+    except Exception as e:
+        logger.warning("Falha a reservar a linha %s no Sheet: %s", row_index, e)
+        return False, None
+    return claim is not None, claim
+
+
+def _release_claim(post: dict[str, Any], claim: Optional[str]) -> None:
+    """Liberta a reserva após uma publicação falhada, para o post ser tentado de novo (por qualquer nó)."""
+    if not claim:
+        return
+    try:
+        sheets_client.release_claim(post.get("row_index"), claim, restore_status=post.get("status") or "ready")
+    except Exception as e:
+        logger.warning("Falha a libertar a reserva da linha %s (expira sozinha): %s", post.get("row_index"), e)
+
+
 def select_post_to_publish(
     mode: Literal["next", "row"],
     row_index: Optional[int] = None,
@@ -132,21 +224,17 @@ def select_post_to_publish(
     raise ValueError("mode deve ser 'next' ou 'row'")
 
 
-def publish_post(post: dict[str, Any]) -> str:
+def resolve_image_url(post: dict[str, Any]) -> str:
     """
-    Publica um post no Instagram e marca o Sheet como publicado.
-    - post: dicionário com image_url (opcional), gemini_prompt, image_text, caption, row_index.
-    - Se image_url estiver vazio, gera a imagem com o provedor activo usando Gemini_Prompt (ou Image Text como fallback)
-      e faz upload para Cloudinary para obter um URL público.
-    - Devolve o media_id do post publicado.
+    URL público da imagem do post: ImageURL do Sheet ou, se vazio, imagem gerada com o provedor activo
+    a partir de Gemini_Prompt (ou Image Text como fallback) e enviada para Cloudinary.
+    ValueError se não houver imagem nem forma de a gerar.
     """
     image_url = (post.get("image_url") or "").strip()
     gemini_prompt = (post.get("gemini_prompt") or "").strip()
     image_text = (post.get("image_text") or "").strip()
-    caption = (post.get("caption") or "").strip()
+    post_id = post.get("post_id")
     row_index = post.get("row_index")
-    if row_index is None:
-        raise ValueError("O post não tem row_index (linha do Sheet).")
 
     # "yes" e valores não-URL vêm da coluna Image Prompt por engano; tratar como vazio
     if image_url and not (image_url.startswith("http://") or image_url.startswith("https://")):
@@ -161,7 +249,7 @@ def publish_post(post: dict[str, Any]) -> str:
                 prompt=gemini_prompt or image_text,
                 quote_text=image_text,
                 use_full_prompt=bool(gemini_prompt),
-                public_id_prefix=f"keepcalm_{row_index}",
+                public_id_prefix=f"keepcalm_{post_id or row_index}",
             )
         except Exception as e:
             raise ValueError(
@@ -175,10 +263,59 @@ def publish_post(post: dict[str, Any]) -> str:
             f"O post não tem ImageURL no Sheet. Preenche ImageURL ou configura "
             f"o provedor de imagens ({provider_label}) na página Configuração."
         )
+    return image_url
+
+
+def _publish_staged(post: dict[str, Any]) -> tuple[Optional[str], Optional[str]]:
+    """
+    Publica o container pré-preparado do post (prestage), se houver um válido: só media_publish.
+    Devolve (media_id, image_url); (None, image_url da pré-preparação ou None) se não houver container
+    ou se o media_publish for recusado com 4xx (ex.: container expirado ou inválido), para publicar pelo
+    caminho normal. Erros de rede, timeouts e 5xx propagam: o media_publish pode ter sido aplicado e
+    recriar daria um duplicado.
+    """
+    staged = prestage.get_staged(post)
+    if staged is None:
+        return None, None
+    try:
+        media_id = ig_client.publish_media(staged["creation_id"], wait=False)
+    except (ValueError, requests.HTTPError) as e:
+        response = e.response if isinstance(e, requests.HTTPError) else None
+        if isinstance(e, requests.HTTPError) and (response is None or not 400 <= response.status_code < 500):
+            raise
+        logger.warning(
+            "Container pré-preparado %s recusado (linha %s): %s; a criar um novo",
+            staged["creation_id"], post.get("row_index"), e,
+        )
+        prestage.discard(post.get("post_id"))
+        return None, staged["image_url"]
+    logger.info("Post pré-preparado publicado: linha %s, container %s", post.get("row_index"), staged["creation_id"])
+    return media_id, staged["image_url"]
+
+
+def publish_post(post: dict[str, Any]) -> str:
+    """
+    Publica um post no Instagram e marca o Sheet como publicado.
+    - post: dicionário com image_url (opcional), gemini_prompt, image_text, caption, row_index.
+    - Se image_url estiver vazio, gera a imagem com o provedor activo usando Gemini_Prompt (ou Image Text como fallback)
+      e faz upload para Cloudinary para obter um URL público.
+    - Se o post foi pré-preparado (prestage), publica o container já criado e validado.
+    - Devolve o media_id do post publicado.
+    """
+    caption = (post.get("caption") or "").strip()
+    row_index = post.get("row_index")
+    if row_index is None:
+        raise ValueError("O post não tem row_index (linha do Sheet).")
+    post_id = post.get("post_id")
 
-    creation_id = ig_client.create_media(image_url=image_url, caption=caption)
-    media_id = ig_client.publish_media(creation_id)
-    _update_sheet_after_publish(row_index, image_url)
+    media_id, image_url = _publish_staged(post)
+    if media_id is None:
+        # Reutilizar a imagem já gerada na pré-preparação, se o container foi recusado
+        image_url = image_url or resolve_image_url(post)
+        creation_id = ig_client.create_media(image_url=image_url, caption=caption)
+        media_id = ig_client.publish_media(creation_id)
+    prestage.discard(post_id)
+    _update_sheet_after_publish(row_index, image_url, post_id=post_id, caption=caption)
 
     # Publicar Story automaticamente com o mesmo conteúdo, se activado
     _reload_env_before_story_check()
@@ -278,7 +415,8 @@ def run_publish_next(
     """
     Publica o próximo post (ready, não publicado, Date <= hoje).
     Devolve (sucesso, mensagem, media_id ou None, post_data ou None).
-    Usa lock entre processos para evitar duplicados (Task Scheduler + Streamlit).
+    Usa lock entre processos para evitar duplicados (Task Scheduler + Streamlit) e, entre máquinas,
+    a reserva da linha no Sheet (PUBLISH_CLAIM_ENABLED).
     """
     post = select_post_to_publish(mode="next", today=today, now=now)
     if not post:
@@ -289,10 +427,16 @@ def run_publish_next(
             logger.info("Outro processo a publicar; a ignorar para evitar duplicado.")
             return False, "Outro processo a publicar. Aguarda o próximo ciclo.", None, post
         # Re-leitura dentro do lock: evita republicar se o Sheet foi atualizado por outro processo
-        fresh = sheets_client.get_row_by_index(row_index)
-        if fresh and (str(fresh.get("published") or "").strip().lower() in ("yes", "y", "1", "true")):
+        fresh = sheets_client.get_row_by_index(row_index, fresh=True)
+        if fresh and fresh.is_published:
             logger.info("Linha %s já está publicada no Sheet; a ignorar para evitar duplicado.", row_index)
             return False, f"Linha {row_index} já está publicada no Sheet. Pode ter sido atualizada por outro processo.", None, post
+        if fresh and fresh.post_id != post.get("post_id"):
+            logger.info("Linha %s mudou de post desde a selecção (linhas inseridas/apagadas); a ignorar neste ciclo.", row_index)
+            return False, f"Linha {row_index} mudou desde a selecção. O post será escolhido de novo no próximo ciclo.", None, post
+        claim_ok, claim = _claim_for_publish(post)
+        if not claim_ok:
+            return False, f"Linha {row_index} reservada por outro nó ou Sheet indisponível. Aguarda o próximo ciclo.", None, post
         post_date = post.get("date", "")
         post_time = post.get("time", "")
         logger.info("A publicar post: linha %s, agendado para %s %s", row_index, post_date, post_time)
@@ -302,6 +446,7 @@ def run_publish_next(
             return True, f"Post publicado com sucesso. Media ID: {media_id}", media_id, post
         except Exception as e:
             logger.exception("Erro ao publicar próximo post (linha %s): %s", row_index, e)
+            _release_claim(post, claim)
             return False, str(e), None, post
 
 
@@ -317,9 +462,34 @@ def run_publish_row(row_index: int) -> tuple[bool, str, Optional[str], Optional[
     with _publish_lock() as lock_ok:
         if not lock_ok:
             return False, "Outro processo a publicar. Tenta novamente em breve.", None, post
+        claim_ok, claim = _claim_for_publish(post)
+        if not claim_ok:
+            return False, f"Linha {row_index} reservada por outro nó, já publicada ou Sheet indisponível.", None, post
         try:
             media_id = publish_post(post)
             return True, f"Post publicado com sucesso. Media ID: {media_id}", media_id, post
         except Exception as e:
             logger.exception("Erro ao publicar post da linha %s", row_index)
+            _release_claim(post, claim)
             return False, str(e), None, post
+
+
+def run_archive(older_than_days: int, dry_run: bool = False) -> tuple[bool, str, int]:
+    """
+    Move os posts publicados há mais de older_than_days dias para o separador de arquivo.
+    Corre com o lock de publicação e depois de esvaziar a fila de escritas (os números de linha mudam).
+    Devolve (sucesso, mensagem, nº de linhas arquivadas ou a arquivar em dry_run).
+    """
+    with _publish_lock() as lock_ok:
+        if not lock_ok:
+            return False, "Outro processo a publicar. Arquivo adiado.", 0
+        if sheet_write_queue.drain_until_empty(timeout=30):
+            return False, "Há escritas do Sheet em fila por aplicar. Arquivo adiado.", 0
+        try:
+            n = sheets_client.archive_published_rows(older_than_days, dry_run=dry_run)
+        except Exception as e:
+            logger.exception("Erro ao arquivar linhas publicadas")
+            return False, str(e), 0
+    if dry_run:
+        return True, f"{n} linha(s) publicadas há mais de {older_than_days} dias seriam arquivadas.", n
+    return True, f"{n} linha(s) movidas para o separador de arquivo.", n
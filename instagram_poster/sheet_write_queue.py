@@ -0,0 +1,361 @@
+"""
+Fila persistente (write-behind) de escritas pendentes no Google Sheet.
+- enqueue(): regista a alteração num journal JSON em disco e devolve de imediato.
+- drain(): aplica as entradas devidas num único batch_update; em caso de falha, reagenda com backoff exponencial.
+  Entradas cujo post já não se encontra no Sheet não bloqueiam as restantes: marcas de publicação
+  (Published) ficam em fila com alerta no histórico (nunca se perdem, senão o post seria republicado);
+  as outras vão para a lista de mortas (.sheet_write_queue_dead.json, ver dead_letters()).
+- start_worker(): thread de background que vai esvaziando a fila (Streamlit); o CLI chama drain_until_empty().
+As entradas só saem do journal depois de escritas no Sheet, por isso sobrevivem a reinícios.
+Enquanto pendentes, o sheets_client sobrepõe-nas às leituras (evita republicar um post já publicado).
+"""
+import json
+import logging
+import os
+import random
+import threading
+import time as _time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Generator, Optional
+
+logger = logging.getLogger(__name__)
+
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent
+_QUEUE_FILE = _PROJECT_ROOT / ".sheet_write_queue.json"
+_QUEUE_LOCK_FILE = _PROJECT_ROOT / ".sheet_write_queue.lock"
+_DEAD_LETTER_FILE = _PROJECT_ROOT / ".sheet_write_queue_dead.json"
+_DEAD_LETTER_MAX = 200  # entradas mortas guardadas (as mais antigas saem)
+_QUEUE_LOCK_STALE_SEC = 30  # lock com mais de 30 s é considerado órfão
+_QUEUE_LOCK_WAIT_SEC = 10
+
+_BACKOFF_BASE_SEC = 5.0
+_BACKOFF_MAX_SEC = 900.0
+_ALERT_AFTER_ATTEMPTS = 5  # regista erro no histórico do autopublish a partir desta tentativa
+_PUBLISHED_FIELD = "Published"  # sheets_client.COL_PUBLISHED: marcas de publicação nunca vão para a lista de mortas
+
+_lock = threading.Lock()
+_wake_event = threading.Event()
+_worker: Optional[threading.Thread] = None
+_cache_stamp: Optional[tuple[int, int]] = None
+_cache_entries: list[dict[str, Any]] = []
+
+
+@contextmanager
+def _journal_lock() -> Generator[None, None, None]:
+    """
+    Lock entre processos para ler-modificar-gravar o journal (mesmo esquema O_EXCL dos restantes locks).
+    Ao contrário do lock de publicação, espera pelo lock em vez de desistir.
+    """
+    deadline = _time.monotonic() + _QUEUE_LOCK_WAIT_SEC
+    fd = None
+    while fd is None:
+        try:
+            fd = os.open(_QUEUE_LOCK_FILE, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                if _time.time() - _QUEUE_LOCK_FILE.stat().st_mtime > _QUEUE_LOCK_STALE_SEC:
+                    _QUEUE_LOCK_FILE.unlink(missing_ok=True)
+                    continue
+            except OSError:
+                pass
+            if _time.monotonic() > deadline:
+                raise TimeoutError("Journal de escritas do Sheet bloqueado por outro processo")
+            _time.sleep(0.05)
+    try:
+        yield
+    finally:
+        try:
+            os.close(fd)
+            _QUEUE_LOCK_FILE.unlink(missing_ok=True)
+        except OSError:
+            pass
+
+
+def _read_entries() -> list[dict[str, Any]]:
+    """Lê o journal (com cache por mtime/tamanho). Devolve lista vazia se não existir ou estiver ilegível."""
+    global _cache_stamp, _cache_entries
+    try:
+        st = _QUEUE_FILE.stat()
+    except OSError:
+        return []
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _lock:
+        if _cache_stamp == stamp:
+            return list(_cache_entries)
+    try:
+        data = json.loads(_QUEUE_FILE.read_text(encoding="utf-8"))
+    except Exception as e:
+        logger.warning("Journal de escritas do Sheet ilegível: %s", e)
+        return []
+    entries = data if isinstance(data, list) else []
+    with _lock:
+        _cache_stamp = stamp
+        _cache_entries = entries
+    return list(entries)
+
+
+def _write_entries(entries: list[dict[str, Any]]) -> None:
+    """Grava o journal de forma atómica (ficheiro temporário + replace)."""
+    if not entries:
+        _QUEUE_FILE.unlink(missing_ok=True)
+        return
+    tmp = _QUEUE_FILE.with_suffix(".tmp")
+    tmp.write_text(json.dumps(entries, ensure_ascii=False, indent=0), encoding="utf-8")
+    os.replace(tmp, _QUEUE_FILE)
+
+
+def enqueue(
+    row_index: int,
+    fields: dict[str, str],
+    description: str = "",
+    post_id: Optional[str] = None,
+    caption: Optional[str] = None,
+) -> str:
+    """
+    Regista uma escrita pendente na linha row_index (1-based). fields: {nome da coluna: valor}.
+    Com post_id, a linha é confirmada (e procurada, se o post tiver mudado de posição) antes de escrever;
+    caption identifica o post se Date/Image Text forem editados entretanto (o post_id muda).
+    Devolve o ID da entrada. Não faz pedidos ao Sheet.
+    """
+    entry = {
+        "id": uuid.uuid4().hex,
+        "row_index": int(row_index),
+        "post_id": post_id or None,
+        "caption": (caption or "").strip() or None,
+        "fields": {str(k): str(v) for k, v in fields.items()},
+        "description": description,
+        "created_at": datetime.now().isoformat(),
+        "attempts": 0,
+        "next_attempt_at": 0.0,
+        "last_error": None,
+    }
+    with _journal_lock():
+        entries = _read_entries()
+        entries.append(entry)
+        _write_entries(entries)
+    logger.info("Escrita no Sheet em fila: linha %s %s", row_index, list(entry["fields"]))
+    _wake_event.set()
+    return entry["id"]
+
+
+def pending_count() -> int:
+    return len(_read_entries())
+
+
+def pending_writes() -> list[tuple[int, Optional[str], dict[str, str], Optional[str]]]:
+    """
+    Alterações ainda não escritas no Sheet, agregadas por post: [(linha, post_id, campos, caption)]
+    (as mais recentes prevalecem; entradas sem post_id são agregadas pela linha).
+    """
+    merged: dict[tuple[int, Optional[str]], dict[str, str]] = {}
+    captions: dict[tuple[int, Optional[str]], Optional[str]] = {}
+    for e in _read_entries():
+        key = (int(e["row_index"]), e.get("post_id"))
+        merged.setdefault(key, {}).update(e.get("fields") or {})
+        captions[key] = e.get("caption") or captions.get(key)
+    return [(row_index, post_id, fields, captions[(row_index, post_id)]) for (row_index, post_id), fields in merged.items()]
+
+
+def _backoff_seconds(attempts: int) -> float:
+    delay = min(_BACKOFF_MAX_SEC, _BACKOFF_BASE_SEC * (2 ** max(0, attempts - 1)))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def drain() -> int:
+    """
+    Escreve no Sheet todas as entradas devidas num único batch_update.
+    Cada entrada com post_id é localizada individualmente (pelo post_id e, se Date/Image Text tiverem sido
+    editados, pela Caption). Se o post não for encontrado, uma marca de publicação fica em fila (alerta
+    no histórico à primeira falha) e as outras entradas vão para a lista de mortas. Uma falha de rede/quota
+    reagenda com backoff só as entradas afectadas (a localização de uma, ou o batch_update das aplicáveis).
+    Devolve o número de entradas aplicadas (0 se nada devido ou se falhou).
+    """
+    from instagram_poster import sheets_client
+
+    now = _time.time()
+    due = [e for e in _read_entries() if float(e.get("next_attempt_at") or 0) <= now]
+    if not due:
+        return 0
+    dead: list[dict[str, Any]] = []
+    failed: dict[str, str] = {}  # id -> erro; reagendadas com backoff
+    unresolved: set[str] = set()  # marcas de publicação cujo post não foi encontrado
+    applied: list[dict[str, Any]] = []
+    updates: dict[int, dict[str, str]] = {}
+    located: dict[tuple[int, str], Optional[int]] = {}
+    for e in due:
+        row_index = int(e["row_index"])
+        post_id = e.get("post_id")
+        if post_id:
+            # Linhas inseridas/apagadas desde que a entrada foi posta em fila: seguir o post
+            key = (row_index, post_id)
+            try:
+                if key not in located:
+                    located[key] = sheets_client.locate_post(post_id, hint_row=row_index, caption=e.get("caption"))
+            except Exception as err:
+                failed[e["id"]] = str(err)
+                continue
+            if located[key] is None:
+                if _PUBLISHED_FIELD in (e.get("fields") or {}):
+                    failed[e["id"]] = f"post {post_id} (linha {row_index}) não encontrado no Sheet"
+                    unresolved.add(e["id"])
+                    continue
+                dead.append({**e, "last_error": f"post {post_id} (linha {row_index}) não encontrado no Sheet"})
+                continue
+            row_index = located[key]
+        applied.append(e)
+        updates.setdefault(row_index, {}).update(e.get("fields") or {})
+    if updates:
+        try:
+            sheets_client.update_rows_fields(updates)
+        except Exception as err:
+            failed.update((e["id"], str(err)) for e in applied)
+            applied = []
+    if failed:
+        logger.warning("Escrita em fila no Sheet falhou (%d entrada(s)): %s", len(failed), next(iter(failed.values())))
+    alerts = []
+    unresolved_alerts = []
+    done_ids = {e["id"] for e in applied}
+    with _journal_lock():
+        entries = []
+        for e in _read_entries():
+            if e["id"] in done_ids:
+                continue
+            if e["id"] in failed:
+                e["attempts"] = int(e.get("attempts") or 0) + 1
+                e["next_attempt_at"] = _time.time() + _backoff_seconds(e["attempts"])
+                e["last_error"] = failed[e["id"]][:300]
+                if e["attempts"] == _ALERT_AFTER_ATTEMPTS:
+                    alerts.append(e)
+                if e["attempts"] == 1 and e["id"] in unresolved:
+                    unresolved_alerts.append(e)
+            entries.append(e)
+        _write_entries(entries)
+    for e in alerts:
+        _report_stuck_entry(e)
+    for e in unresolved_alerts:
+        _report_unresolved_publish_mark(e)
+    _move_to_dead_letters(dead)
+    if applied:
+        logger.info("Escritas em fila aplicadas no Sheet: %d entrada(s), linhas %s", len(applied), sorted(updates))
+    return len(applied)
+
+
+def _move_to_dead_letters(dead: list[dict[str, Any]]) -> None:
+    """Retira as entradas da fila e guarda-as na lista de mortas, com erro no log e no histórico do autopublish."""
+    if not dead:
+        return
+    dead_ids = {e["id"] for e in dead}
+    with _journal_lock():
+        _write_entries([e for e in _read_entries() if e["id"] not in dead_ids])
+        letters = dead_letters()
+        for e in dead:
+            letters.append({**e, "dead_at": datetime.now().isoformat()})
+        tmp = _DEAD_LETTER_FILE.with_suffix(".tmp")
+        try:
+            tmp.write_text(json.dumps(letters[-_DEAD_LETTER_MAX:], ensure_ascii=False, indent=0), encoding="utf-8")
+            os.replace(tmp, _DEAD_LETTER_FILE)
+        except OSError as err:
+            logger.warning("Não foi possível gravar %s: %s", _DEAD_LETTER_FILE.name, err)
+    for e in dead:
+        msg = (
+            f"Escrita em fila descartada (linha {e['row_index']}: {e.get('description') or list(e['fields'])}): "
+            f"{e['last_error']}. Guardada em {_DEAD_LETTER_FILE.name}."
+        )
+        logger.error(msg)
+        try:
+            from instagram_poster import autopublish
+            autopublish._add_log_entry(False, msg, entry_type="error")
+        except Exception:
+            pass
+
+
+def dead_letters() -> list[dict[str, Any]]:
+    """Entradas retiradas da fila por não ser possível aplicá-las (post apagado do Sheet, etc.)."""
+    try:
+        data = json.loads(_DEAD_LETTER_FILE.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return []
+    return data if isinstance(data, list) else []
+
+
+def _report_unresolved_publish_mark(entry: dict[str, Any]) -> None:
+    msg = (
+        f"Post publicado mas não encontrado no Sheet para o marcar como publicado (linha {entry['row_index']}, "
+        f"post_id {entry['post_id']}): Date/Image Text/Caption editados ou linha apagada? Marca manualmente "
+        f"Published=yes na linha do post, senão pode ser publicado de novo. A escrita continua em fila e será repetida "
+        f"(depois de corrigido à mão, pode ser removida de {_QUEUE_FILE.name})."
+    )
+    logger.error(msg)
+    try:
+        from instagram_poster import autopublish
+        autopublish._add_log_entry(False, msg, entry_type="error")
+    except Exception:
+        pass
+
+
+def _report_stuck_entry(entry: dict[str, Any]) -> None:
+    msg = (
+        f"Sheet ainda não atualizado após {entry['attempts']} tentativas (linha {entry['row_index']}: "
+        f"{entry.get('description') or list(entry['fields'])}). A escrita continua em fila e será repetida. "
+        f"Erro: {entry.get('last_error')}"
+    )
+    logger.error(msg)
+    try:
+        from instagram_poster import autopublish
+        autopublish._add_log_entry(False, msg, entry_type="error")
+    except Exception:
+        pass
+
+
+def _seconds_until_next_due() -> Optional[float]:
+    entries = _read_entries()
+    if not entries:
+        return None
+    next_at = min(float(e.get("next_attempt_at") or 0) for e in entries)
+    return max(0.0, next_at - _time.time())
+
+
+def drain_until_empty(timeout: float = 60.0) -> int:
+    """Esvazia a fila de forma síncrona (ex.: no fim do CLI), até timeout segundos. Devolve o nº restante."""
+    deadline = _time.monotonic() + timeout
+    while True:
+        try:
+            drain()
+        except Exception:
+            logger.exception("Erro ao esvaziar fila de escritas do Sheet")
+        wait = _seconds_until_next_due()
+        if wait is None:
+            return 0
+        remaining = deadline - _time.monotonic()
+        if remaining <= 0 or wait > remaining:
+            left = pending_count()
+            logger.warning("Ficam %d escrita(s) em fila para o Sheet (serão repetidas na próxima execução)", left)
+            return left
+        _time.sleep(wait)
+
+
+def _worker_loop() -> None:
+    logger.info("Fila de escritas do Sheet: worker iniciado")
+    while True:
+        try:
+            drain()
+        except Exception:
+            logger.exception("Erro no worker da fila de escritas do Sheet")
+        wait = _seconds_until_next_due()
+        _wake_event.clear()
+        _wake_event.wait(timeout=60.0 if wait is None else max(1.0, wait))
+
+
+def start_worker() -> bool:
+    """Inicia o thread de background que esvazia a fila. Devolve False se já estava a correr."""
+    global _worker
+    with _lock:
+        if _worker is not None and _worker.is_alive():
+            _wake_event.set()
+            return False
+        _worker = threading.Thread(target=_worker_loop, daemon=True, name="sheet-write-queue")
+        _worker.start()
+    return True
@@ -5,19 +5,30 @@ Estrutura oficial das colunas:
   1. Date, 2. Time, 3. Image Text, 4. Caption, 5. Gemini_Prompt,
   6. Status, 7. Published, 8. ImageURL, 9. Image Prompt
 """
+import bisect
+import hashlib
 import logging
+import threading
+import time as _time
+from collections.abc import Mapping
 from pathlib import Path
-from datetime import date, datetime, time
-from typing import Any, Optional
+from datetime import date, datetime, time, timedelta
+from typing import Any, Callable, Optional
 
 import gspread
 from google.oauth2.service_account import Credentials as ServiceAccountCredentials
 
+from instagram_poster import local_store, sheet_write_queue, sheets_rate_limit
 from instagram_poster.config import (
+    SHEET_ARCHIVE_TAB_NAME,
     SHEET_TAB_NAME,
     get_google_credentials_dict,
     get_google_credentials_path,
     get_ig_sheet_id,
+    get_publish_claim_stale_seconds,
+    get_publish_node_id,
+    get_sheets_cache_ttl_seconds,
+    get_sheets_change_detection_enabled,
 )
 
 logger = logging.getLogger(__name__)
@@ -38,13 +49,80 @@ COL_STATUS = "Status"
 COL_PUBLISHED = "Published"
 COL_IMAGE_URL = "ImageURL"
 COL_IMAGE_PROMPT = "Image Prompt"
+# Coluna opcional (pode estar oculta) com um ID fixo por post; sem ela, o ID é derivado de Date + Image Text
+COL_ID = "ID"
+
+# Colunas necessárias para escolher o próximo post (leitura projectada, sem Caption/Gemini_Prompt)
+_SCHEDULING_COLUMNS = (COL_DATE, COL_TIME, COL_STATUS, COL_PUBLISHED)
+
+# Leituras de linhas sem formatação: Date chega como número de série (não depende da localização do
+# Sheet, onde 03/04/2025 tanto pode ser 3 de abril como 4 de março) e é convertida para ISO (_cell_text)
+_UNFORMATTED = {
+    "value_render_option": gspread.utils.ValueRenderOption.unformatted,
+    "date_time_render_option": gspread.utils.DateTimeOption.serial_number,
+}
+_SERIAL_EPOCH = date(1899, 12, 30)
+
+# Valores da coluna Published considerados "publicado"
+_PUBLISHED_VALUES = ("yes", "y", "1", "true")
+
+# Reserva de publicação entre nós: Status = "publishing:<nó>:<epoch>" (ver claim_post)
+CLAIM_STATUS_PREFIX = "publishing:"
+# Reserva: da leitura que precede a escrita até ao fim da escrita não podem passar mais de
+# _CLAIM_WRITE_DEADLINE_SEC (senão o nó desiste); a releitura é feita _CLAIM_SETTLE_SEC depois, por isso
+# apanha a escrita de qualquer nó que tenha lido a linha antes da nossa reserva.
+_CLAIM_WRITE_DEADLINE_SEC = 3.0
+_CLAIM_SETTLE_SEC = 4.0
+
+# Metadados do ficheiro no Drive (detecção barata de alterações)
+_DRIVE_FILE_URL = "https://www.googleapis.com/drive/v3/files/{}"
+_DRIVE_MARKER_REUSE_SEC = 2.0  # várias verificações seguidas (ex.: snapshot + índice projectado) fazem um só pedido
+# append_rows: linhas por pedido e tentativas por bloco
+_APPEND_CHUNK_ROWS = 100
+_APPEND_RETRIES = 3
+_APPEND_RETRY_DELAY_SEC = 2.0
 
 # Ficheiros OAuth (na raiz do projeto)
 _OAUTH_CLIENT_JSON = _PROJECT_ROOT / "google_oauth_client.json"
 _OAUTH_AUTHORIZED_JSON = _PROJECT_ROOT / "google_oauth_authorized.json"
 
+# Snapshot partilhado no processo: resultado de get_all_values() reutilizado durante o TTL
+# (SHEETS_CACHE_TTL_SECONDS). Invalidado após escritas feitas por este módulo.
+_snapshot_lock = threading.RLock()
+_snapshot_rows: Optional[list[list[str]]] = None
+_snapshot_loaded_at: float = 0.0
+_snapshot_version: int = 0
+_snapshot_key: Optional[tuple] = None
+_snapshot_records: Optional[list["PostRecord"]] = None
+_snapshot_index: Optional["_PostIndex"] = None
+_snapshot_marker: Optional[str] = None
+# Mapa do cabeçalho e nº de linhas da última leitura completa; sobrevivem à invalidação do snapshot
+# para que as escritas não precisem de reler o Sheet inteiro.
+_header_key: Optional[tuple] = None
+_header_map: dict[str, int] = {}
+_known_row_count: int = 0
+# Índice projectado (só _SCHEDULING_COLUMNS), usado quando o snapshot completo não está fresco
+_projected_index: Optional["_PostIndex"] = None
+_projected_loaded_at: float = 0.0
+_projected_key: Optional[tuple] = None
+_projected_marker: Optional[str] = None
+# Registos publicados do separador de arquivo, carregados só quando um consumidor de histórico os pede
+_archive_records: Optional[list["PostRecord"]] = None
+_archive_loaded_at: float = 0.0
+_archive_key: Optional[tuple] = None
+_archive_marker: Optional[str] = None
+# Último marcador do Drive consultado: (monotonic, chave de configuração, marcador)
+_drive_marker_last: Optional[tuple[float, tuple, Optional[str]]] = None
 
-def _get_client() -> gspread.Client:
+# Pool do cliente gspread e do worksheet: reutilizados enquanto a configuração (Sheet, aba, credenciais)
+# não mudar. A renovação do token é feita pelo google-auth quando expira.
+_pool_lock = threading.Lock()
+_pool_key: Optional[tuple] = None
+_pool_client: Optional[gspread.Client] = None
+_pool_worksheet: Optional[gspread.Worksheet] = None
+
+
+def _build_client() -> gspread.Client:
     """
     Cria cliente gspread autenticado.
     Prioridade:
@@ -78,11 +156,389 @@ def _get_client() -> gspread.Client:
     return gspread.authorize(creds)
 
 
-def _get_sheet():
-    """Abre o workbook e a aba configurados."""
+def _file_mtime(path: Path) -> Optional[float]:
+    try:
+        return path.stat().st_mtime
+    except OSError:
+        return None
+
+
+def _pool_config_key() -> tuple:
+    """Identifica a configuração actual; se mudar, o cliente e o worksheet são recriados."""
+    creds_dict = get_google_credentials_dict()
+    sa_key = None
+    if creds_dict is not None:
+        sa_key = (creds_dict.get("client_email"), creds_dict.get("private_key_id"))
+    creds_path = get_google_credentials_path()
+    return (
+        get_ig_sheet_id(),
+        SHEET_TAB_NAME,
+        _file_mtime(_OAUTH_CLIENT_JSON),
+        sa_key,
+        creds_path,
+        _file_mtime(Path(creds_path)) if creds_path else None,
+    )
+
+
+def _client_credentials_unusable(gc: gspread.Client) -> bool:
+    """True se as credenciais do cliente expiraram e não podem ser renovadas automaticamente."""
+    http_client = getattr(gc, "http_client", None)
+    auth = getattr(http_client, "auth", None) or getattr(gc, "auth", None)
+    if auth is None or not getattr(auth, "expired", False):
+        return False
+    if isinstance(auth, ServiceAccountCredentials):
+        return False
+    return not getattr(auth, "refresh_token", None)
+
+
+def _get_client() -> gspread.Client:
+    """Cliente gspread do pool; só volta a autenticar se a configuração mudar ou as credenciais deixarem de ser válidas."""
+    global _pool_key, _pool_client, _pool_worksheet
+    key = _pool_config_key()
+    with _pool_lock:
+        if _pool_client is not None and _pool_key == key and not _client_credentials_unusable(_pool_client):
+            return _pool_client
+        _pool_client = _build_client()
+        _pool_key = key
+        _pool_worksheet = None
+        logger.debug("Cliente gspread (re)criado")
+        return _pool_client
+
+
+def _get_sheet() -> gspread.Worksheet:
+    """Abre o workbook e a aba configurados (handle reutilizado entre chamadas)."""
+    global _pool_worksheet
     gc = _get_client()
+    with _pool_lock:
+        if _pool_worksheet is not None:
+            return _pool_worksheet
+    sheets_rate_limit.acquire("read", n=2)  # metadados do workbook + da aba
     wb = gc.open_by_key(get_ig_sheet_id())
-    return wb.worksheet(SHEET_TAB_NAME)
+    ws = wb.worksheet(SHEET_TAB_NAME)
+    with _pool_lock:
+        if _pool_client is gc:
+            _pool_worksheet = ws
+    return ws
+
+
+def reset_client_pool() -> None:
+    """Descarta o cliente e o worksheet em pool (ex.: após erro de autenticação ou aba renomeada)."""
+    global _pool_key, _pool_client, _pool_worksheet
+    with _pool_lock:
+        _pool_key = None
+        _pool_client = None
+        _pool_worksheet = None
+
+
+def _get_drive_marker(force: bool = False) -> Optional[str]:
+    """
+    Marcador de alterações do ficheiro (version + modifiedTime do Drive), via o scope drive.readonly.
+    Devolve None se a detecção estiver desligada ou o pedido falhar (nesse caso relê-se o Sheet).
+    force=True ignora o valor consultado há menos de _DRIVE_MARKER_REUSE_SEC (ex.: logo após uma escrita).
+    """
+    global _drive_marker_last
+    if not get_sheets_change_detection_enabled():
+        return None
+    key = _pool_config_key()
+    now = _time.monotonic()
+    last = _drive_marker_last
+    if not force and last is not None and last[1] == key and now - last[0] < _DRIVE_MARKER_REUSE_SEC:
+        return last[2]
+    try:
+        gc = _get_client()
+        http = getattr(gc, "http_client", None) or gc
+        resp = http.request(
+            "get",
+            _DRIVE_FILE_URL.format(get_ig_sheet_id()),
+            params={"fields": "version,modifiedTime", "supportsAllDrives": True},
+        )
+        data = resp.json()
+        marker = f"{data.get('version', '')}|{data.get('modifiedTime', '')}"
+    except Exception as e:
+        logger.debug("Não foi possível obter modifiedTime do Drive: %s", e)
+        marker = None
+    _drive_marker_last = (_time.monotonic(), key, marker)
+    return marker
+
+
+def _revalidate(loaded_at: float, marker: Optional[str]) -> Optional[float]:
+    """
+    Decide se uma entrada em cache (snapshot ou índice projectado) ainda pode ser servida.
+    Dentro do TTL devolve loaded_at; após o TTL, se o ficheiro não mudou no Drive, devolve o
+    instante actual (novo período de TTL); caso contrário None (reler). TTL 0 desliga a cache.
+    """
+    ttl = get_sheets_cache_ttl_seconds()
+    if ttl <= 0:
+        return None
+    if _time.monotonic() - loaded_at < ttl:
+        return loaded_at
+    if marker is None:
+        return None
+    current = _get_drive_marker()
+    if current is None or current != marker:
+        return None
+    logger.debug("Sheet sem alterações no Drive; a reutilizar dados em cache")
+    return _time.monotonic()
+
+
+def _snapshot_is_fresh(key: tuple) -> bool:
+    """True se o snapshot completo pode ser servido sem o reler (TTL ou Drive sem alterações)."""
+    global _snapshot_loaded_at
+    if _snapshot_rows is None or _snapshot_key != key:
+        return False
+    loaded_at = _revalidate(_snapshot_loaded_at, _snapshot_marker)
+    if loaded_at is None:
+        return False
+    _snapshot_loaded_at = loaded_at
+    return True
+
+
+def _mirror_key() -> str:
+    # Sufixo: espelhos de versões anteriores guardavam as datas no formato de apresentação do Sheet
+    return f"{get_ig_sheet_id()}/{SHEET_TAB_NAME}/unformatted"
+
+
+def _load_from_mirror(marker: Optional[str]) -> Optional[list[list[str]]]:
+    """Linhas do espelho local, se activo e sincronizado com o marcador actual do Drive."""
+    if marker is None or not local_store.is_enabled():
+        return None
+    try:
+        rows = local_store.load_rows(_mirror_key(), marker)
+    except Exception as e:
+        logger.warning("Espelho local indisponível: %s", e)
+        return None
+    if rows is not None:
+        logger.debug("Snapshot carregado do espelho local (%d linhas)", len(rows))
+    return rows
+
+
+def _pending_writes() -> list[tuple[int, Optional[str], dict[str, str], Optional[str]]]:
+    """
+    Escritas ainda em fila (sheet_write_queue): [(linha quando foi posta em fila, post_id, campos, caption)].
+    Falhas a ler o journal não bloqueiam leituras.
+    """
+    try:
+        return sheet_write_queue.pending_writes()
+    except Exception as e:
+        logger.warning("Fila de escritas do Sheet ilegível: %s", e)
+        return []
+
+
+def _overlay_row(row: list[str], col: dict[str, int], fields: dict[str, str]) -> None:
+    for name, value in fields.items():
+        idx = col.get(name)
+        if idx is None:
+            continue
+        if idx >= len(row):
+            row.extend([""] * (idx + 1 - len(row)))
+        row[idx] = value
+
+
+def _cell(row: list[Any], col: dict[str, int], key: str) -> str:
+    idx = col.get(key, -1)
+    return str(row[idx]).strip() if 0 <= idx < len(row) and row[idx] is not None else ""
+
+
+def _row_post_id(row: list[Any], col: dict[str, int]) -> str:
+    """post_id de uma linha em bruto (coluna ID, se preenchida; senão hash de Date + Image Text)."""
+    return _cell(row, col, COL_ID) or make_post_id(_cell(row, col, COL_DATE), _cell(row, col, COL_IMAGE_TEXT))
+
+
+def _cell_text(value: Any, key: Optional[str]) -> str:
+    """
+    Célula lida sem formatação como texto: Date (número de série) em ISO, Time em HH:MM, números
+    inteiros sem ".0" e booleanos como o Sheet os apresenta (TRUE/FALSE).
+    """
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float)):
+        if key == COL_DATE:
+            return (_SERIAL_EPOCH + timedelta(days=int(value))).isoformat()
+        if key == COL_TIME:
+            seconds = round((value % 1) * 86400) % 86400
+            h, rest = divmod(seconds, 3600)
+            m, sec = divmod(rest, 60)
+            return f"{h:02d}:{m:02d}" + (f":{sec:02d}" if sec else "")
+        return str(int(value)) if float(value).is_integer() else str(value)
+    return str(value)
+
+
+def _normalize_row(values: list[Any], col: dict[str, int]) -> list[str]:
+    """Linha lida com _UNFORMATTED convertida para texto (ver _cell_text)."""
+    if all(type(v) is str for v in values):
+        return values
+    keys = {i: k for k, i in col.items()}
+    return [v if type(v) is str else _cell_text(v, keys.get(i)) for i, v in enumerate(values)]
+
+
+def _normalize_rows(rows: list[list[Any]]) -> list[list[str]]:
+    """Leitura completa de um separador (rows[0] = cabeçalho) com _UNFORMATTED convertida para texto."""
+    if not rows:
+        return rows
+    header = [_cell_text(v, None) for v in rows[0]]
+    col = _parse_header_row(header)
+    return [header] + [_normalize_row(r, col) for r in rows[1:]]
+
+
+def _pending_matches(
+    row: list[Any], col: dict[str, int], row_index: int, hint: int, post_id: str, caption: Optional[str]
+) -> bool:
+    """
+    A escrita em fila pertence a esta linha: mesmo post_id, ou (Date/Image Text editados desde então)
+    a linha onde foi posta em fila com a mesma Caption.
+    """
+    if _row_post_id(row, col) == post_id:
+        return True
+    return bool(caption) and hint == row_index and _cell(row, col, COL_CAPTION) == caption
+
+
+def _overlay_pending(
+    row: list[str],
+    col: dict[str, int],
+    row_index: int,
+    pending: list[tuple[int, Optional[str], dict[str, str], Optional[str]]],
+) -> None:
+    """Aplica a uma linha as escritas em fila que lhe pertencem (pelo post_id; sem post_id, pela linha)."""
+    for hint, post_id, fields, caption in pending:
+        if post_id is None:
+            if hint == row_index:
+                _overlay_row(row, col, fields)
+            continue
+        if _pending_matches(row, col, row_index, hint, post_id, caption):
+            _overlay_row(row, col, fields)
+
+
+def _apply_pending_writes(
+    rows: list[list[str]], pending: Optional[list[tuple[int, Optional[str], dict[str, str], Optional[str]]]] = None
+) -> None:
+    """
+    Sobrepõe às linhas lidas as escritas ainda em fila (ex.: Published de um post acabado de publicar).
+    Cada escrita é procurada primeiro na linha onde foi posta em fila e, se o post tiver mudado de
+    linha (linhas inseridas/apagadas entretanto), pelo post_id.
+    """
+    if pending is None:
+        pending = _pending_writes()
+    if not pending or not rows:
+        return
+    col = _parse_header_row(rows[0])
+    ids: Optional[dict[str, int]] = None
+    for hint, post_id, fields, caption in pending:
+        target = hint if 2 <= hint <= len(rows) else None
+        if post_id is not None and (
+            target is None or not _pending_matches(rows[target - 1], col, target, hint, post_id, caption)
+        ):
+            if ids is None:
+                ids = {_row_post_id(rows[i], col): i + 1 for i in range(len(rows) - 1, 0, -1)}
+            target = ids.get(post_id)
+        if target is not None:
+            _overlay_row(rows[target - 1], col, fields)
+
+
+def _store_snapshot(rows: list[list[str]], key: tuple, marker: Optional[str]) -> None:
+    """Define o snapshot em memória (chamar com _snapshot_lock)."""
+    global _snapshot_rows, _snapshot_loaded_at, _snapshot_version, _snapshot_key, _snapshot_records, _snapshot_index
+    global _snapshot_marker, _header_key, _header_map, _known_row_count
+    _apply_pending_writes(rows)
+    _snapshot_rows = rows
+    _snapshot_records = None
+    _snapshot_index = None
+    _snapshot_marker = marker
+    _snapshot_key = key
+    _header_key = key
+    _header_map = _parse_header_row(rows[0]) if rows else {}
+    _known_row_count = len(rows)
+    _snapshot_loaded_at = _time.monotonic()
+    _snapshot_version += 1
+    logger.debug("Snapshot do Sheet recarregado (versão %s, %d linhas)", _snapshot_version, len(rows))
+
+
+def _get_all_rows(force_refresh: bool = False) -> list[list[str]]:
+    """
+    Devolve todas as linhas do separador (get_all_values), servidas do snapshot em memória
+    enquanto o TTL não expirar (ou, após o TTL, enquanto o ficheiro não mudar no Drive).
+    Com o espelho local activo, um snapshot ainda válido é carregado da base SQLite.
+    Uma única leitura de cada vez, mesmo com várias threads a pedir ao mesmo tempo.
+    O resultado é partilhado: não alterar as listas devolvidas.
+    """
+    key = _pool_config_key()
+    with _snapshot_lock:
+        if not force_refresh and _snapshot_is_fresh(key):
+            return _snapshot_rows
+        # Marcador lido antes dos dados: uma alteração durante a leitura obriga a reler na próxima vez
+        marker = _get_drive_marker()
+        rows = None if force_refresh else _load_from_mirror(marker)
+        if rows is None:
+            try:
+                sheet = _get_sheet()
+                sheets_rate_limit.acquire("read")
+                rows = _normalize_rows(sheet.get_all_values(**_UNFORMATTED))
+            except Exception:
+                reset_client_pool()
+                raise
+            if local_store.is_enabled():
+                try:
+                    local_store.sync_rows(_mirror_key(), marker, rows)
+                except Exception as e:
+                    logger.warning("Falha a sincronizar espelho local: %s", e)
+        _store_snapshot(rows, key, marker)
+        return rows
+
+
+def _get_rows_covering(row_index: int) -> list[list[str]]:
+    """Como _get_all_rows, mas relê o Sheet se a linha pedida for posterior ao fim do snapshot."""
+    all_rows = _get_all_rows()
+    if all_rows and row_index > len(all_rows):
+        all_rows = _get_all_rows(force_refresh=True)
+    return all_rows
+
+
+def _get_header_map() -> dict[str, int]:
+    """
+    Mapa nome da coluna -> índice (0-based), em cache desde a última leitura.
+    Sem cache, lê apenas a linha do cabeçalho.
+    """
+    global _header_key, _header_map, _known_row_count
+    key = _pool_config_key()
+    with _snapshot_lock:
+        if _header_key == key and _header_map:
+            return _header_map
+        try:
+            sheet = _get_sheet()
+            sheets_rate_limit.acquire("read")
+            header = sheet.row_values(1)
+        except Exception:
+            reset_client_pool()
+            raise
+        _header_key = key
+        _header_map = _parse_header_row(header)
+        _known_row_count = 0
+        return _header_map
+
+
+def _check_row_index(row_index: int) -> None:
+    """Valida row_index (1-based, >= 2) contra o nº de linhas conhecido; relê o Sheet só se a linha estiver além do fim."""
+    if row_index < 2:
+        raise ValueError(f"Linha inválida: {row_index}")
+    with _snapshot_lock:
+        known = _known_row_count if _header_key == _pool_config_key() else 0
+    if row_index <= known:
+        return
+    all_rows = _get_all_rows(force_refresh=True)
+    if row_index > len(all_rows):
+        raise ValueError(f"Linha inválida: {row_index}")
+
+
+def invalidate_cache() -> None:
+    """Descarta o snapshot em memória; a próxima leitura vai ao Sheet."""
+    global _snapshot_rows, _snapshot_records, _snapshot_index, _projected_index, _archive_records
+    with _snapshot_lock:
+        _snapshot_rows = None
+        _snapshot_records = None
+        _snapshot_index = None
+        _projected_index = None
+        _archive_records = None
 
 
 def _parse_header_row(header_values: list[str]) -> dict[str, int]:
@@ -95,29 +551,179 @@ def _parse_header_row(header_values: list[str]) -> dict[str, int]:
     return mapping
 
 
-def _row_to_record(row: list[Any], col: dict[str, int], sheet_row_index: int) -> Optional[dict[str, Any]]:
-    """Converte uma linha do sheet num dicionário com as chaves esperadas. sheet_row_index é 1-based."""
+class PostRecord(Mapping):
+    """
+    Linha de dados do Sheet. Os campos de texto mantêm o valor (strip) da célula; data, hora,
+    status e published são interpretados uma vez, na construção.
+    Também se comporta como dict só de leitura (rec["caption"], rec.get("date"), dict(rec))
+    com as chaves de _FIELDS, para compatibilidade com o código existente.
+    """
+
+    __slots__ = (
+        "row_index", "date", "time", "image_text", "caption", "gemini_prompt",
+        "status", "published", "image_url", "image_prompt",
+        "post_date", "post_time", "is_ready", "is_published", "tab", "_post_id",
+    )
+    _FIELDS = (
+        "row_index", "post_id", "date", "time", "image_text", "caption", "gemini_prompt",
+        "status", "published", "image_url", "image_prompt",
+    )
+
+    def __init__(
+        self,
+        row_index: int,
+        date: str = "",
+        time: str = "",
+        image_text: str = "",
+        caption: str = "",
+        gemini_prompt: str = "",
+        status: str = "",
+        published: str = "",
+        image_url: str = "",
+        image_prompt: str = "",
+        tab: Optional[str] = None,
+        post_id: Optional[str] = None,
+    ):
+        self.row_index = row_index
+        self.date = date
+        self.time = time
+        self.image_text = image_text
+        self.caption = caption
+        self.gemini_prompt = gemini_prompt
+        self.status = status
+        self.published = published
+        self.image_url = image_url
+        self.image_prompt = image_prompt
+        self.post_date = _parse_date(date)
+        self.post_time = _parse_time(time)
+        status_lower = status.lower()
+        # Reservas de publicação abandonadas (nó que caiu a meio) voltam a contar como ready; antes de as
+        # retomar, a publicação confirma no Instagram que o post não chegou a sair (claim_post/confirm_takeover)
+        self.is_ready = status_lower == "ready" or (
+            status_lower.startswith(CLAIM_STATUS_PREFIX) and _claim_is_stale(status)
+        )
+        self.is_published = published.lower() in _PUBLISHED_VALUES
+        # None = separador principal; senão, nome do separador de arquivo (row_index é relativo a esse separador)
+        self.tab = tab
+        self._post_id = post_id or None
+
+    @property
+    def post_id(self) -> str:
+        """ID estável do post (coluna ID ou hash de Date + Image Text); não muda quando as linhas mudam de posição."""
+        if self._post_id is None:
+            self._post_id = make_post_id(self.date, self.image_text)
+        return self._post_id
+
+    @property
+    def sort_key(self) -> tuple[date, time, int]:
+        """(Date, Time, linha); datas/horas inválidas contam como date.min / 00:00."""
+        return (self.post_date or date.min, self.post_time or time(0, 0), self.row_index)
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(self._FIELDS)
+
+    def __len__(self) -> int:
+        return len(self._FIELDS)
+
+    def __repr__(self) -> str:
+        return f"PostRecord(row_index={self.row_index!r}, date={self.date!r}, time={self.time!r}, status={self.status!r})"
+
+
+def _row_to_record(
+    row: list[Any], col: dict[str, int], sheet_row_index: int, tab: Optional[str] = None
+) -> Optional[PostRecord]:
+    """Converte uma linha do sheet num PostRecord. sheet_row_index é 1-based."""
     if not row:
         return None
-    def get(key: str, default: str = "") -> str:
+    n = len(row)
+
+    def get(key: str) -> str:
         idx = col.get(key, -1)
-        if idx < 0 or idx >= len(row):
-            return default
+        if idx < 0 or idx >= n:
+            return ""
         v = row[idx]
-        return str(v).strip() if v is not None else default
-
-    return {
-        "row_index": sheet_row_index,
-        "date": get(COL_DATE),
-        "time": get(COL_TIME),
-        "image_text": get(COL_IMAGE_TEXT),
-        "caption": get(COL_CAPTION),
-        "gemini_prompt": get(COL_GEMINI_PROMPT),
-        "status": get(COL_STATUS),
-        "published": get(COL_PUBLISHED),
-        "image_url": get(COL_IMAGE_URL),
-        "image_prompt": get(COL_IMAGE_PROMPT),
-    }
+        return str(v).strip() if v is not None else ""
+
+    return PostRecord(
+        row_index=sheet_row_index,
+        date=get(COL_DATE),
+        time=get(COL_TIME),
+        image_text=get(COL_IMAGE_TEXT),
+        caption=get(COL_CAPTION),
+        gemini_prompt=get(COL_GEMINI_PROMPT),
+        status=get(COL_STATUS),
+        published=get(COL_PUBLISHED),
+        image_url=get(COL_IMAGE_URL),
+        image_prompt=get(COL_IMAGE_PROMPT),
+        tab=tab,
+        post_id=get(COL_ID),
+    )
+
+
+def make_post_id(date_str: str, image_text: str) -> str:
+    """
+    ID estável de um post a partir de Date + Image Text: a data é normalizada (ISO, se reconhecida; as
+    leituras do Sheet não são formatadas, por isso uma célula de data chega sempre em ISO, qualquer que
+    seja a localização do Sheet) e o texto ignora maiúsculas e espaços repetidos. Editar a quote ou a
+    data gera um ID novo.
+    """
+    d = _parse_date(date_str or "")
+    date_part = d.isoformat() if d else (date_str or "").strip()
+    text_part = " ".join((image_text or "").split()).casefold()
+    return hashlib.sha1(f"{date_part}\x1f{text_part}".encode("utf-8")).hexdigest()[:12]
+
+
+def make_claim_status(node_id: str, at: Optional[float] = None) -> str:
+    """Valor de Status que reserva um post para publicação pelo nó indicado."""
+    return f"{CLAIM_STATUS_PREFIX}{node_id}:{int(at if at is not None else _time.time())}"
+
+
+def parse_claim(status: str) -> Optional[tuple[str, float]]:
+    """(nó, epoch) de um Status "publishing:<nó>:<epoch>"; None se não for uma reserva válida."""
+    s = (status or "").strip()
+    if not s.lower().startswith(CLAIM_STATUS_PREFIX):
+        return None
+    node, sep, ts = s[len(CLAIM_STATUS_PREFIX):].rpartition(":")
+    if not sep or not node:
+        return None
+    try:
+        return node, float(ts)
+    except ValueError:
+        return None
+
+
+def _claim_is_stale(status: str) -> bool:
+    """True se o Status é uma reserva mais antiga que PUBLISH_CLAIM_STALE_MINUTES."""
+    claim = parse_claim(status)
+    return claim is not None and _time.time() - claim[1] >= get_publish_claim_stale_seconds()
+
+
+def _get_records(force_refresh: bool = False) -> tuple[dict[str, int], list[PostRecord]]:
+    """
+    Devolve (mapa do cabeçalho, registos) do snapshot actual. Os PostRecord são construídos
+    uma vez por snapshot e partilhados entre chamadas — não os alterar.
+    """
+    global _snapshot_records
+    with _snapshot_lock:
+        all_rows = _get_all_rows(force_refresh=force_refresh)
+        if not all_rows:
+            return {}, []
+        col = _parse_header_row(all_rows[0])
+        if _snapshot_records is not None and all_rows is _snapshot_rows:
+            return col, _snapshot_records
+        records = []
+        for i in range(1, len(all_rows)):
+            rec = _row_to_record(all_rows[i], col, sheet_row_index=i + 1)
+            if rec is not None:
+                records.append(rec)
+        if all_rows is _snapshot_rows:
+            _snapshot_records = records
+        return col, records
 
 
 def _parse_date(s: str) -> Optional[date]:
@@ -144,7 +750,148 @@ def _parse_time(s: str) -> Optional[time]:
     return None
 
 
-def get_next_ready_post(today: Optional[date] = None, now: Optional[time] = None) -> Optional[dict[str, Any]]:
+class _PostIndex:
+    """
+    Índices em memória construídos uma vez por snapshot:
+      - ready: posts ready e não publicados com data válida, por (Date, Time, linha);
+      - dated: todos os posts com data válida, pela mesma ordem;
+      - published_with_image: publicados com ImageURL, do mais recente para o mais antigo.
+    As consultas usam bisect/slicing em vez de percorrer e ordenar todas as linhas.
+    """
+
+    __slots__ = ("ready", "ready_keys", "dated", "dated_dates", "published_with_image")
+
+    def __init__(self, records: list[PostRecord]):
+        dated = sorted((r for r in records if r.post_date is not None), key=lambda r: r.sort_key)
+        self.dated = dated
+        self.dated_dates = [r.post_date for r in dated]
+        self.ready = [r for r in dated if r.is_ready and not r.is_published]
+        self.ready_keys = [(r.post_date, r.post_time or time(0, 0)) for r in self.ready]
+        published = [r for r in records if r.is_published and r.image_url]
+        # Empates mantêm a ordem do Sheet (sort estável, também com reverse=True)
+        published.sort(key=lambda r: (r.post_date or date.min, r.post_time or time(0, 0)), reverse=True)
+        self.published_with_image = published
+
+    def count_ready_until(self, today: date, now: Optional[time]) -> int:
+        """Nº de posts ready com (Date, Time) <= (today, now); sem now conta o dia inteiro."""
+        return bisect.bisect_right(self.ready_keys, (today, now if now is not None else time.max))
+
+    def dated_from(self, from_date: date) -> list[PostRecord]:
+        """Posts com Date >= from_date, já ordenados."""
+        return self.dated[bisect.bisect_left(self.dated_dates, from_date):]
+
+
+def _get_index() -> tuple[dict[str, int], _PostIndex]:
+    """Devolve (mapa do cabeçalho, índice) do snapshot actual, construindo o índice se necessário."""
+    global _snapshot_index
+    with _snapshot_lock:
+        col, records = _get_records()
+        if _snapshot_index is not None and records is _snapshot_records:
+            return col, _snapshot_index
+        index = _PostIndex(records)
+        if records is _snapshot_records:
+            _snapshot_index = index
+        return col, index
+
+
+def _get_scheduling_index() -> tuple[dict[str, int], _PostIndex, bool]:
+    """
+    Índice para escolher o próximo post. Usa o snapshot completo se estiver fresco; senão lê só as
+    colunas Date, Time, Status e Published (batch_get por coluna) e constrói um índice com registos
+    parciais. Devolve (mapa do cabeçalho, índice, parcial) — com parcial=True os registos não têm
+    Caption/ImageURL/etc. e a linha escolhida deve ser lida com _fetch_row.
+    """
+    global _projected_index, _projected_loaded_at, _projected_key, _projected_marker, _known_row_count
+    key = _pool_config_key()
+    with _snapshot_lock:
+        if _snapshot_is_fresh(key):
+            col, index = _get_index()
+            return col, index, False
+        if _projected_index is not None and _projected_key == key:
+            loaded_at = _revalidate(_projected_loaded_at, _projected_marker)
+            if loaded_at is not None:
+                _projected_loaded_at = loaded_at
+                return _header_map, _projected_index, True
+        if local_store.is_enabled():
+            # Espelho local sincronizado: snapshot completo sem ir ao Sheet
+            marker = _get_drive_marker()
+            rows = _load_from_mirror(marker)
+            if rows is not None:
+                _store_snapshot(rows, key, marker)
+                col, index = _get_index()
+                return col, index, False
+        col = _get_header_map()
+        if any(c not in col for c in _SCHEDULING_COLUMNS):
+            return col, _PostIndex([]), True
+        # Com escritas em fila por post_id, lê também as colunas que identificam o post, para as sobrepor
+        # só à linha desse post (a linha onde foram postas em fila pode ser agora de outro post)
+        pending = _pending_writes()
+        names = list(_SCHEDULING_COLUMNS)
+        if any(post_id for _, post_id, _, _ in pending):
+            names += [c for c in (COL_IMAGE_TEXT, COL_ID, COL_CAPTION) if c in col]
+        letters = [gspread.utils.rowcol_to_a1(1, col[c] + 1).rstrip("1") for c in names]
+        marker = _get_drive_marker()
+        try:
+            sheet = _get_sheet()
+            sheets_rate_limit.acquire("read")
+            value_ranges = sheet.batch_get(
+                [f"{x}2:{x}" for x in letters], major_dimension="COLUMNS", **_UNFORMATTED
+            )
+        except Exception:
+            reset_client_pool()
+            raise
+        columns = [[_cell_text(v, name) for v in vr[0]] if vr else [] for name, vr in zip(names, value_ranges)]
+        n = max((len(c) for c in columns), default=0)
+        for c in columns:
+            c.extend([""] * (n - len(c)))
+        if pending:
+            rows = [names] + [list(r) for r in zip(*columns)]
+            _apply_pending_writes(rows, pending)
+            columns = [[r[j] for r in rows[1:]] for j in range(len(_SCHEDULING_COLUMNS))]
+        dates, times, statuses, published = columns
+        records = [
+            PostRecord(
+                row_index=i + 2,
+                date=str(dates[i]).strip(),
+                time=str(times[i]).strip(),
+                status=str(statuses[i]).strip(),
+                published=str(published[i]).strip(),
+            )
+            for i in range(n)
+        ]
+        index = _PostIndex(records)
+        _projected_index = index
+        _projected_loaded_at = _time.monotonic()
+        _projected_key = key
+        _projected_marker = marker
+        _known_row_count = max(_known_row_count, n + 1)
+        logger.debug("Leitura projectada do Sheet: %d linhas, colunas %s", n, ",".join(letters))
+        return col, index, True
+
+
+def _fetch_row(row_index: int, acquire: bool = True) -> Optional[PostRecord]:
+    """
+    Lê uma única linha completa do Sheet (row_values), sem passar pelo snapshot.
+    acquire=False: a quota do sheets_rate_limit já foi reservada pelo chamador.
+    """
+    if row_index < 2:
+        return None
+    col = _get_header_map()
+    try:
+        sheet = _get_sheet()
+        if acquire:
+            sheets_rate_limit.acquire("read")
+        values = _normalize_row(sheet.row_values(row_index, **_UNFORMATTED), col)
+    except Exception:
+        reset_client_pool()
+        raise
+    pending = _pending_writes()
+    if pending:
+        _overlay_pending(values, col, row_index, pending)
+    return _row_to_record(values, col, sheet_row_index=row_index)
+
+
+def get_next_ready_post(today: Optional[date] = None, now: Optional[time] = None) -> Optional[PostRecord]:
     """
     Devolve o próximo post pronto a publicar:
     Status = "ready", Published vazio, Date <= today (e opcionalmente Time <= now).
@@ -152,172 +899,468 @@ def get_next_ready_post(today: Optional[date] = None, now: Optional[time] = None
     """
     today = today or date.today()
     now_time = now
-    sheet = _get_sheet()
-    all_rows = sheet.get_all_values()
-    if not all_rows:
+    col, index, partial = _get_scheduling_index()
+    if not col:
         logger.info("get_next_ready_post: sheet vazio")
         return None
-    col = _parse_header_row(all_rows[0])
     if COL_DATE not in col or COL_STATUS not in col or COL_PUBLISHED not in col:
         logger.warning("Sheet sem colunas Date/Status/Published. Header: %s", list(col.keys()))
         return None
 
-    candidates = []
-    for i in range(1, len(all_rows)):
-        rec = _row_to_record(all_rows[i], col, sheet_row_index=i + 1)
-        if not rec:
-            continue
-        if rec["status"].lower() != "ready":
-            continue
-        if (rec["published"] or "").strip().lower() in ("yes", "y", "1", "true"):
-            continue
-        d = _parse_date(rec["date"])
-        if d is None:
-            continue
-        if d > today:
-            continue
-        if d == today and now_time is not None:
-            t = _parse_time(rec["time"])
-            if t is not None and t > now_time:
-                continue
-        candidates.append((d, _parse_time(rec["time"]) or time(0, 0), rec))
-
-    if not candidates:
+    n_candidates = index.count_ready_until(today, now_time)
+    if not n_candidates:
         logger.info(
             "get_next_ready_post: 0 candidatos (critérios: Date<=%s, Time<=%s, Status=ready, Published vazio)",
             today,
             now_time,
         )
         return None
-    candidates.sort(key=lambda x: (x[0], x[1]))
-    chosen = candidates[0][2]
+    chosen = index.ready[0]
+    if partial:
+        # Leitura projectada: obter a linha completa apenas do post escolhido
+        full = _fetch_row(chosen.row_index)
+        if full is None or not full.is_ready or full.is_published or full.sort_key != chosen.sort_key:
+            logger.info("get_next_ready_post: linha %s mudou desde a leitura; a reler", chosen.row_index)
+            invalidate_cache()
+            _, index = _get_index()
+            n_candidates = index.count_ready_until(today, now_time)
+            if not n_candidates:
+                return None
+            full = index.ready[0]
+        chosen = full
     logger.info(
         "get_next_ready_post: %s candidato(s), próximo: linha %s (%s %s)",
-        len(candidates),
-        chosen.get("row_index"),
-        chosen.get("date", ""),
-        chosen.get("time", ""),
+        n_candidates,
+        chosen.row_index,
+        chosen.date,
+        chosen.time,
     )
     return chosen
 
 
-def get_upcoming_posts(n: int = 14, from_date: Optional[date] = None) -> list[dict[str, Any]]:
+def get_ready_posts_between(start: datetime, end: datetime) -> list[PostRecord]:
+    """
+    Posts ready e não publicados com Date + Time em ]start, end], por ordem de agendamento.
+    Usa o índice de agendamento (snapshot ou leitura projectada, reutilizados enquanto o ficheiro não
+    mudar no Drive), como get_next_ready_post. Os registos podem ser parciais (só row_index, Date, Time,
+    Status e Published): ler a linha com get_row_by_index(row_index, fresh=True) antes de usar o resto.
+    """
+    col, index, _ = _get_scheduling_index()
+    if COL_DATE not in col or COL_STATUS not in col or COL_PUBLISHED not in col:
+        return []
+    lo = bisect.bisect_right(index.ready_keys, (start.date(), start.time()))
+    hi = bisect.bisect_right(index.ready_keys, (end.date(), end.time()))
+    return [r for r in index.ready[lo:hi] if r.post_time is not None]
+
+
+def get_upcoming_posts(n: int = 14, from_date: Optional[date] = None) -> list[PostRecord]:
     """
     Devolve os próximos n posts a partir de from_date (default: hoje),
     ordenados por Date e Time. Inclui publicados e não publicados (para exibir na UI).
+    Usa o snapshot (reutilizado enquanto o ficheiro não mudar no Drive): os posts futuros ficam no fim
+    de um Sheet ordenado por data, por isso uma leitura em blocos leria o histórico todo.
     """
     from_date = from_date or date.today()
-    sheet = _get_sheet()
-    all_rows = sheet.get_all_values()
-    if not all_rows:
-        return []
-    col = _parse_header_row(all_rows[0])
+    col, index = _get_index()
     if COL_DATE not in col:
         return []
+    return index.dated_from(from_date)[:n]
 
-    candidates = []
-    for i in range(1, len(all_rows)):
-        rec = _row_to_record(all_rows[i], col, sheet_row_index=i + 1)
-        if not rec:
-            continue
-        d = _parse_date(rec["date"])
-        if d is None or d < from_date:
-            continue
-        t = _parse_time(rec["time"]) or time(0, 0)
-        candidates.append((d, t, rec))
 
-    candidates.sort(key=lambda x: (x[0], x[1]))
-    return [rec for _, _, rec in candidates[:n]]
+def update_rows_fields(updates: dict[int, dict[str, str]], acquire: bool = True) -> None:
+    """
+    Escreve várias células num único pedido batch_update.
+    updates: {row_index (1-based): {nome da coluna (ex.: COL_STATUS): valor}}.
+    Valida todas as linhas/colunas antes de escrever; nada é escrito se alguma for inválida.
+    acquire=False: a quota do sheets_rate_limit já foi reservada pelo chamador.
+    """
+    if not updates:
+        return
+    col = _get_header_map()
+    data = []
+    for row_index in sorted(updates):
+        _check_row_index(row_index)
+        for name, value in updates[row_index].items():
+            idx = col.get(name)
+            if idx is None:
+                raise ValueError(f"Sheet sem coluna {name}")
+            data.append({
+                "range": gspread.utils.rowcol_to_a1(row_index, idx + 1),
+                "values": [[value]],
+            })
+    if not data:
+        return
+    try:
+        sheet = _get_sheet()
+        if acquire:
+            sheets_rate_limit.acquire("write")
+        sheet.batch_update(data, value_input_option="USER_ENTERED")
+    finally:
+        invalidate_cache()
+    if local_store.is_enabled():
+        # Write-through: o espelho recebe a mesma escrita e o marcador pós-escrita, para que a próxima
+        # leitura venha da base local. (Uma edição manual entre a escrita e esta consulta ao Drive
+        # só é apanhada na alteração seguinte do ficheiro.)
+        try:
+            local_store.update_cells(_mirror_key(), updates, _get_drive_marker(force=True))
+        except Exception as e:
+            logger.warning("Falha a actualizar espelho local: %s", e)
+    logger.info("Sheet atualizado: %d célula(s) em %d linha(s)", len(data), len(updates))
 
 
-def mark_published(row_index: int) -> None:
+def update_posts_fields(
+    updates: dict[str, dict[str, str]], rows: Optional[dict[str, int]] = None
+) -> list[str]:
     """
-    Escreve na linha row_index (1-based, linha do sheet): Published = "yes", Status = "posted".
+    Como update_rows_fields, mas indexado por post_id. As linhas vêm de rows ({post_id: linha}, ex.: da
+    leitura feita no início de um processamento longo) ou do snapshot; antes do batch_update só as linhas
+    alvo são relidas (um batch_get) para confirmar que ainda têm o mesmo post. Os que mudaram de posição
+    são procurados numa leitura completa, cujas posições actualizam rows para os lotes seguintes.
+    Devolve os post_id que já não existem (não escritos).
     """
-    sheet = _get_sheet()
-    all_rows = sheet.get_all_values()
-    if not all_rows or row_index < 2 or row_index > len(all_rows):
-        raise ValueError(f"Linha inválida: {row_index}")
-    col = _parse_header_row(all_rows[0])
-    status_col = col.get(COL_STATUS)
-    published_col = col.get(COL_PUBLISHED)
-    if status_col is None or published_col is None:
-        raise ValueError("Sheet sem colunas Status ou Published")
-    # gspread: atualizar célula por (row, col) 1-based
-    sheet.update_cell(row_index, status_col + 1, "posted")
-    sheet.update_cell(row_index, published_col + 1, "yes")
+    if not updates:
+        return []
+    if rows is None:
+        _, records = _get_records()
+        rows = {}
+        for rec in records:
+            rows.setdefault(rec.post_id, rec.row_index)
+    confirmed = _confirm_post_rows({post_id: rows[post_id] for post_id in updates if post_id in rows})
+    if len(confirmed) < len(updates):
+        # Linhas inseridas/apagadas desde a leitura: procurar os restantes numa leitura fresca
+        _, records = _get_records(force_refresh=True)
+        fresh: dict[str, int] = {}
+        for rec in records:
+            fresh.setdefault(rec.post_id, rec.row_index)
+        rows.clear()
+        rows.update(fresh)
+        confirmed.update({post_id: fresh[post_id] for post_id in updates if post_id in fresh})
+    missing = [post_id for post_id in updates if post_id not in confirmed]
+    row_updates = {confirmed[post_id]: fields for post_id, fields in updates.items() if post_id in confirmed}
+    if row_updates:
+        update_rows_fields(row_updates)
+    if missing:
+        logger.warning("update_posts_fields: %d post(s) já não existem no Sheet: %s", len(missing), missing)
+    return missing
+
+
+def _confirm_post_rows(located: dict[str, int]) -> dict[str, int]:
+    """
+    Relê só as linhas indicadas ({post_id: linha}), num único batch_get das colunas que identificam o
+    post, e devolve as que ainda têm o mesmo post_id.
+    """
+    if not located:
+        return {}
+    col = _get_header_map()
+    width = max((col[c] for c in (COL_ID, COL_DATE, COL_IMAGE_TEXT) if c in col), default=0) + 1
+    last_col = gspread.utils.rowcol_to_a1(1, width).rstrip("1")
+    ranges: list[list[int]] = []
+    for row_index in sorted(set(located.values())):
+        if ranges and ranges[-1][1] == row_index - 1:
+            ranges[-1][1] = row_index
+        else:
+            ranges.append([row_index, row_index])
+    try:
+        sheet = _get_sheet()
+        sheets_rate_limit.acquire("read")
+        blocks = sheet.batch_get([f"A{start}:{last_col}{end}" for start, end in ranges], **_UNFORMATTED)
+    except Exception:
+        reset_client_pool()
+        raise
+    current: dict[int, str] = {}
+    for (start, _), block in zip(ranges, blocks):
+        for i, values in enumerate(block):
+            current[start + i] = _row_post_id(_normalize_row(values, col), col)
+    return {post_id: row_index for post_id, row_index in located.items() if current.get(row_index) == post_id}
+
+
+def update_row_fields(row_index: int, fields: dict[str, str]) -> None:
+    """Escreve várias colunas da linha row_index (1-based) num único pedido. fields: {nome da coluna: valor}."""
+    update_rows_fields({row_index: fields})
+
+
+def mark_published(row_index: int, image_url: Optional[str] = None) -> None:
+    """
+    Escreve na linha row_index (1-based, linha do sheet): Published = "yes", Status = "posted"
+    e, se indicado, ImageURL — tudo num único pedido.
+    """
+    update_row_fields(row_index, _published_fields(image_url))
     logger.info("Sheet atualizado: linha %s -> Status=posted, Published=yes", row_index)
 
 
+def mark_published_deferred(
+    row_index: int, image_url: Optional[str] = None, post_id: Optional[str] = None, caption: Optional[str] = None
+) -> str:
+    """
+    Como mark_published, mas sem esperar pelo Sheet: a escrita vai para a fila persistente
+    (sheet_write_queue) e as leituras seguintes já vêem a linha como publicada.
+    Com post_id, a escrita segue o post se a linha mudar de posição antes de ser aplicada; com caption,
+    também se Date/Image Text forem editados entretanto.
+    Devolve o ID da entrada na fila.
+    """
+    _check_row_index(row_index)
+    entry_id = sheet_write_queue.enqueue(
+        row_index,
+        _published_fields(image_url),
+        description="Status=posted, Published=yes",
+        post_id=post_id,
+        caption=caption,
+    )
+    invalidate_cache()
+    return entry_id
+
+
+def _published_fields(image_url: Optional[str]) -> dict[str, str]:
+    fields = {COL_STATUS: "posted", COL_PUBLISHED: "yes"}
+    if (image_url or "").strip():
+        fields[COL_IMAGE_URL] = image_url.strip()
+    return fields
+
+
+def claim_post(
+    row_index: int,
+    post_id: str,
+    node_id: Optional[str] = None,
+    confirm_takeover: Optional[Callable[[PostRecord, float], bool]] = None,
+) -> Optional[str]:
+    """
+    Reserva o post para publicação por este nó, para que vários nós possam partilhar o mesmo Sheet
+    sem publicações duplicadas. O Sheet não tem compare-and-set, por isso a reserva é optimista:
+    reserva primeiro a quota do sheets_rate_limit (2 leituras e 1 escrita, para o limitador não atrasar
+    nenhum dos pedidos seguintes), relê a linha, escreve Status = "publishing:<nó>:<epoch>", espera
+    _CLAIM_SETTLE_SEC e relê; só é nossa se o Status relido for exactamente o que escrevemos. Se a
+    leitura + escrita demorarem mais que _CLAIM_WRITE_DEADLINE_SEC, desiste (a releitura de outro nó
+    podia já ter passado).
+    Só reserva posts ready, não publicados e na mesma linha. Reservas mais antigas que
+    PUBLISH_CLAIM_STALE_MINUTES (nó que caiu a meio) só são retomadas se confirm_takeover(post, epoch da
+    reserva) devolver True — ex.: depois de confirmar no Instagram que o post não chegou a ser publicado.
+    Devolve o Status escrito (a passar a release_claim) ou None se o post não ficou reservado.
+    """
+    node_id = node_id or get_publish_node_id()
+    sheets_rate_limit.acquire("read", 2)
+    sheets_rate_limit.acquire("write")
+    started = _time.monotonic()
+    current = _fetch_row(row_index, acquire=False)
+    if current is None or current.post_id != post_id or current.is_published or not current.is_ready:
+        return None
+    existing = parse_claim(current.status)
+    if existing is not None:
+        logger.warning(
+            "Linha %s: reserva do nó %s expirou (%.0f min); a verificar antes de retomar",
+            row_index, existing[0], (_time.time() - existing[1]) / 60.0,
+        )
+        if confirm_takeover is None or not confirm_takeover(current, existing[1]):
+            return None
+        # A verificação pode ter demorado: recomeçar com quota e prazo novos
+        return _retake_claim(row_index, post_id, node_id, current.status)
+    return _write_claim(row_index, post_id, node_id, started, current.status)
+
+
+def _retake_claim(row_index: int, post_id: str, node_id: str, stale_status: str) -> Optional[str]:
+    """Retoma uma reserva abandonada já verificada, se o Status ainda for essa reserva."""
+    sheets_rate_limit.acquire("read", 2)
+    sheets_rate_limit.acquire("write")
+    started = _time.monotonic()
+    current = _fetch_row(row_index, acquire=False)
+    if current is None or current.post_id != post_id or current.is_published or current.status != stale_status:
+        return None
+    return _write_claim(row_index, post_id, node_id, started, stale_status)
+
+
+def _write_claim(row_index: int, post_id: str, node_id: str, started: float, previous_status: str) -> Optional[str]:
+    """Escreve a reserva e confirma-a por releitura (quota já reservada por claim_post)."""
+    claim = make_claim_status(node_id)
+    update_rows_fields({row_index: {COL_STATUS: claim}}, acquire=False)
+    elapsed = _time.monotonic() - started
+    if elapsed > _CLAIM_WRITE_DEADLINE_SEC:
+        logger.warning(
+            "Linha %s: reserva demorou %.1fs (máx. %.0fs); a desistir neste ciclo", row_index, elapsed, _CLAIM_WRITE_DEADLINE_SEC
+        )
+        # Desfazer só se ainda for a nossa (repõe o Status anterior tal como estava, mesmo uma reserva antiga)
+        check = _fetch_row(row_index)
+        if check is not None and check.status == claim:
+            update_row_fields(row_index, {COL_STATUS: previous_status})
+        return None
+    _time.sleep(_CLAIM_SETTLE_SEC)
+    check = _fetch_row(row_index, acquire=False)
+    if check is None or check.post_id != post_id or check.is_published or check.status != claim:
+        logger.info(
+            "Linha %s: reserva perdida para outro nó (Status actual: %s)", row_index, check.status if check else None
+        )
+        return None
+    logger.info("Linha %s reservada para publicação pelo nó %s", row_index, node_id)
+    return claim
+
+
+def release_claim(row_index: int, claim: str, restore_status: str = "ready") -> bool:
+    """
+    Desfaz uma reserva de claim_post (ex.: a publicação falhou), repondo restore_status.
+    Só escreve se o Status ainda for a nossa reserva; devolve True se a reserva foi libertada.
+    """
+    if parse_claim(restore_status) is not None:
+        restore_status = "ready"
+    current = _fetch_row(row_index)
+    if current is None or current.status != claim:
+        return False
+    update_row_fields(row_index, {COL_STATUS: restore_status})
+    logger.info("Linha %s: reserva libertada (Status=%s)", row_index, restore_status)
+    return True
+
+
 def update_image_url(row_index: int, image_url: str) -> None:
     """Escreve o URL da imagem na coluna ImageURL da linha row_index (1-based)."""
     if not (image_url or "").strip():
         return
-    sheet = _get_sheet()
-    all_rows = sheet.get_all_values()
-    if not all_rows or row_index < 2 or row_index > len(all_rows):
-        raise ValueError(f"Linha inválida: {row_index}")
-    col = _parse_header_row(all_rows[0])
-    url_col = col.get(COL_IMAGE_URL)
-    if url_col is None:
-        raise ValueError("Sheet sem coluna ImageURL")
-    sheet.update_cell(row_index, url_col + 1, image_url.strip())
+    update_row_fields(row_index, {COL_IMAGE_URL: image_url.strip()})
     logger.info("ImageURL atualizado: linha %s", row_index)
 
 
-def get_row_by_index(row_index: int) -> Optional[dict[str, Any]]:
-    """Obtém os dados de uma linha específica do sheet (row_index 1-based, 2 = primeira linha de dados)."""
-    sheet = _get_sheet()
-    all_rows = sheet.get_all_values()
+def get_row_by_index(row_index: int, fresh: bool = False) -> Optional[PostRecord]:
+    """
+    Obtém os dados de uma linha específica do sheet (row_index 1-based, 2 = primeira linha de dados).
+    fresh=True ignora o snapshot em cache e relê só essa linha do Sheet (ex.: verificação antes de publicar).
+    """
+    if fresh:
+        return _fetch_row(row_index)
+    all_rows = _get_rows_covering(row_index)
     if not all_rows or row_index < 2 or row_index > len(all_rows):
         return None
     col = _parse_header_row(all_rows[0])
     return _row_to_record(all_rows[row_index - 1], col, sheet_row_index=row_index)
 
 
-def get_all_rows_with_image_text() -> list[dict[str, Any]]:
+def locate_post(post_id: str, hint_row: Optional[int] = None, caption: Optional[str] = None) -> Optional[int]:
+    """
+    Linha actual (1-based) do post com este post_id no separador principal, ou None se já não existir.
+    Confirma primeiro hint_row (uma leitura de linha); só relê o separador se o post tiver mudado de linha.
+    Com caption, um post cujo post_id mudou (Date/Image Text editados) é reconhecido pela Caption:
+    em hint_row, ou noutra linha se for a única com essa Caption.
+    """
+    caption = (caption or "").strip()
+    if hint_row is not None and hint_row >= 2:
+        rec = _fetch_row(hint_row)
+        if rec is not None and (rec.post_id == post_id or (caption and (rec.caption or "").strip() == caption)):
+            return hint_row
+    _, records = _get_records(force_refresh=True)
+    for rec in records:
+        if rec.post_id == post_id:
+            return rec.row_index
+    if caption:
+        same_caption = [rec.row_index for rec in records if (rec.caption or "").strip() == caption]
+        if len(same_caption) == 1:
+            logger.warning("Post %s não encontrado pelo post_id; identificado pela Caption na linha %s", post_id, same_caption[0])
+            return same_caption[0]
+    return None
+
+
+def get_all_rows_with_image_text() -> list[PostRecord]:
     """Devolve todas as linhas de dados que têm Image Text preenchido (para gerar Gemini_Prompt)."""
-    sheet = _get_sheet()
-    all_rows = sheet.get_all_values()
-    if not all_rows:
-        return []
-    col = _parse_header_row(all_rows[0])
+    col, records = _get_records()
     if COL_IMAGE_TEXT not in col:
         return []
-    result = []
-    for i in range(1, len(all_rows)):
-        rec = _row_to_record(all_rows[i], col, sheet_row_index=i + 1)
-        if rec and (rec.get("image_text") or "").strip():
-            result.append(rec)
-    return result
+    return [r for r in records if r.image_text]
 
 
 def update_gemini_prompt(row_index: int, prompt: str) -> None:
     """Escreve o prompt na coluna Gemini_Prompt da linha row_index (1-based)."""
-    sheet = _get_sheet()
-    all_rows = sheet.get_all_values()
-    if not all_rows or row_index < 2 or row_index > len(all_rows):
-        raise ValueError(f"Linha inválida: {row_index}")
-    col = _parse_header_row(all_rows[0])
-    gemini_col = col.get(COL_GEMINI_PROMPT)
-    if gemini_col is None:
-        raise ValueError("Sheet sem coluna Gemini_Prompt")
-    sheet.update_cell(row_index, gemini_col + 1, prompt)
+    update_row_fields(row_index, {COL_GEMINI_PROMPT: prompt})
     logger.info("Gemini_Prompt atualizado: linha %s", row_index)
 
 
-def append_rows(rows: list[list[str]]) -> int:
-    """Adiciona linhas ao final do Sheet. Retorna numero de linhas adicionadas."""
-    sheet = _get_sheet()
-    sheet.append_rows(rows, value_input_option="USER_ENTERED")
-    logger.info("Adicionadas %d linhas ao Sheet", len(rows))
-    return len(rows)
+def append_rows(rows: list[list[str]], chunk_size: int = _APPEND_CHUNK_ROWS) -> int:
+    """
+    Adiciona linhas ao final do Sheet, em blocos de chunk_size, exactamente uma vez.
+    As linhas devem seguir a ordem das colunas do Sheet. Cada linha tem uma chave de idempotência
+    (o post_id: coluna ID ou Date + Image Text); linhas cuja chave já existe no Sheet, ou repetida
+    no próprio lote, são ignoradas — repetir o mesmo pedido (ex.: clicar de novo) não duplica posts.
+    Cada bloco é verificado (valores devolvidos pela API) antes de enviar o seguinte; se um pedido
+    falhar, o Sheet é relido para saber o que ficou escrito antes de tentar de novo.
+    Retorna numero de linhas adicionadas.
+    """
+    if not rows:
+        return 0
+    col, records = _get_records(force_refresh=True)
+    if not col:
+        col = _get_header_map()
+    existing = {r.post_id for r in records}
+    new_rows: list[list[str]] = []
+    keys: list[str] = []
+    for row in rows:
+        key = _row_post_id(row, col)
+        if key in existing:
+            continue
+        existing.add(key)
+        new_rows.append(row)
+        keys.append(key)
+    if len(new_rows) < len(rows):
+        logger.info("append_rows: %d linha(s) já existem no Sheet; ignoradas", len(rows) - len(new_rows))
+    appended = 0
+    try:
+        for start in range(0, len(new_rows), max(1, chunk_size)):
+            appended += _append_chunk(
+                new_rows[start:start + chunk_size], keys[start:start + chunk_size], col
+            )
+    finally:
+        invalidate_cache()
+        if local_store.is_enabled():
+            try:
+                local_store.mark_stale(_mirror_key())
+            except Exception as e:
+                logger.warning("Falha a invalidar espelho local: %s", e)
+    logger.info("Adicionadas %d linhas ao Sheet", appended)
+    return appended
+
+
+def _append_chunk(chunk: list[list[str]], keys: list[str], col: dict[str, int]) -> int:
+    """Acrescenta um bloco e confirma-o; em erro da API só reenvia as linhas que não ficaram escritas."""
+    done = 0
+    for attempt in range(1, _APPEND_RETRIES + 1):
+        try:
+            sheet = _get_sheet()
+            sheets_rate_limit.acquire("write")
+            # Como append_rows, mas com o eco das linhas escritas sem formatação (Date como número de série)
+            response = sheet.spreadsheet.values_append(
+                gspread.utils.absolute_range_name(sheet.title, "A1"),
+                params={
+                    "valueInputOption": "USER_ENTERED",
+                    "includeValuesInResponse": True,
+                    "responseValueRenderOption": "UNFORMATTED_VALUE",
+                    "responseDateTimeRenderOption": "SERIAL_NUMBER",
+                },
+                body={"values": chunk},
+            )
+        except Exception as e:
+            reset_client_pool()
+            logger.warning("append_rows: bloco de %d linha(s) falhou (tentativa %s): %s", len(chunk), attempt, e)
+            # O pedido pode ter sido aplicado apesar do erro (ex.: timeout): confirmar antes de repetir
+            _, records = _get_records(force_refresh=True)
+            present = {r.post_id for r in records}
+            remaining = [(row, key) for row, key in zip(chunk, keys) if key not in present]
+            done += len(chunk) - len(remaining)
+            if not remaining:
+                return done
+            if attempt == _APPEND_RETRIES:
+                raise
+            chunk = [row for row, _ in remaining]
+            keys = [key for _, key in remaining]
+            _time.sleep(_APPEND_RETRY_DELAY_SEC * attempt)
+            continue
+        values = ((response or {}).get("updates") or {}).get("updatedData", {}).get("values") or []
+        if len(values) != len(keys) or not all(
+            _row_post_id(_normalize_row(v, col), col) == key for v, key in zip(values, keys)
+        ):
+            # Não repetir: as linhas foram escritas mas lidas de forma diferente (ex.: Date guardada como texto)
+            raise ValueError(
+                f"append_rows: verificação falhou — {len(values)} linha(s) escritas não correspondem ao bloco "
+                f"enviado ({len(keys)}). Confirma o formato das colunas Date/Image Text no Sheet."
+            )
+        return done + len(chunk)
+    return done
 
 
 def get_last_date() -> Optional[str]:
     """Devolve a data (string) da ultima linha do Sheet, ou None se vazio."""
-    sheet = _get_sheet()
-    all_rows = sheet.get_all_values()
+    all_rows = _get_all_rows()
     if not all_rows or len(all_rows) < 2:
         return None
     col = _parse_header_row(all_rows[0])
@@ -330,82 +1373,235 @@ def get_last_date() -> Optional[str]:
     return None
 
 
-def get_published_rows_missing_image_url() -> list[dict[str, Any]]:
+def get_published_rows_missing_image_url() -> list[PostRecord]:
     """
     Devolve linhas com Published=yes mas ImageURL vazio.
     Útil para preencher ImageURL em publicações antigas (sem republicar no Instagram).
     """
-    sheet = _get_sheet()
-    all_rows = sheet.get_all_values()
-    if not all_rows:
-        return []
-    col = _parse_header_row(all_rows[0])
+    col, records = _get_records()
     if COL_PUBLISHED not in col or COL_IMAGE_URL not in col:
         return []
-    result = []
-    for i in range(1, len(all_rows)):
-        rec = _row_to_record(all_rows[i], col, sheet_row_index=i + 1)
-        if not rec:
-            continue
-        if (rec.get("published") or "").strip().lower() not in ("yes", "y", "1", "true"):
-            continue
-        if (rec.get("image_url") or "").strip():
-            continue
-        result.append(rec)
-    return result
+    return [r for r in records if r.is_published and not r.image_url]
 
 
-def get_published_posts_with_image() -> list[dict[str, Any]]:
+def get_published_posts_with_image(include_archive: bool = False) -> list[PostRecord]:
     """
     Devolve todos os posts já publicados que têm ImageURL preenchido.
     Ordenados por data (mais recente primeiro). Útil para escolher um post para Story.
+    Com include_archive, inclui os posts do separador de arquivo (lido na primeira chamada; por omissão
+    não, para uma consulta a frio não ler também o arquivo).
     """
-    sheet = _get_sheet()
-    all_rows = sheet.get_all_values()
-    if not all_rows:
-        return []
-    col = _parse_header_row(all_rows[0])
+    col, index = _get_index()
     if COL_PUBLISHED not in col or COL_IMAGE_URL not in col or COL_DATE not in col:
         return []
-    result = []
-    for i in range(1, len(all_rows)):
-        rec = _row_to_record(all_rows[i], col, sheet_row_index=i + 1)
-        if not rec:
-            continue
-        if (rec.get("published") or "").strip().lower() not in ("yes", "y", "1", "true"):
-            continue
-        if not (rec.get("image_url") or "").strip():
-            continue
-        result.append(rec)
-    # Ordenar por data descendente (mais recente primeiro)
-    def sort_key(r):
-        d = _parse_date(r.get("date") or "")
-        t = _parse_time(r.get("time") or "")
-        return (d or date.min, t or time(0, 0))
-    result.sort(key=sort_key, reverse=True)
-    return result
+    posts = list(index.published_with_image)
+    if include_archive:
+        posts = _merge_published(posts, _get_archive_published())
+    return posts
 
 
-def get_last_published_posts(n: int = 5) -> list[dict[str, Any]]:
+def get_last_published_posts(n: int = 5, include_archive: bool = False) -> list[PostRecord]:
     """
     Devolve os últimos N posts publicados com ImageURL preenchido, ordenados do mais recente para o mais antigo.
+    Com include_archive, o separador de arquivo é lido se o separador principal tiver menos de N.
     """
-    all_published = get_published_posts_with_image()
-    return all_published[:n]
+    col, index = _get_index()
+    if COL_PUBLISHED not in col or COL_IMAGE_URL not in col or COL_DATE not in col:
+        return []
+    if not include_archive or len(index.published_with_image) >= n:
+        return index.published_with_image[:n]
+    return _merge_published(index.published_with_image, _get_archive_published())[:n]
 
 
-def get_all_rows_with_image_url() -> list[dict[str, Any]]:
+def get_all_rows_with_image_url() -> list[PostRecord]:
     """Devolve todas as linhas (publicadas ou não) que têm ImageURL preenchido."""
-    sheet = _get_sheet()
-    all_rows = sheet.get_all_values()
-    if not all_rows:
-        return []
-    col = _parse_header_row(all_rows[0])
+    col, records = _get_records()
     if COL_IMAGE_URL not in col:
         return []
-    result = []
-    for i in range(1, len(all_rows)):
-        rec = _row_to_record(all_rows[i], col, sheet_row_index=i + 1)
-        if rec and (rec.get("image_url") or "").strip():
-            result.append(rec)
-    return result
+    return [r for r in records if r.image_url]
+
+
+# --- Separador de arquivo (posts publicados antigos) ---
+
+
+def _merge_published(hot: list[PostRecord], archived: list[PostRecord]) -> list[PostRecord]:
+    """Junta publicados do separador principal e do arquivo, do mais recente para o mais antigo."""
+    if not archived:
+        return list(hot)
+    merged = list(hot) + list(archived)
+    merged.sort(key=lambda r: (r.post_date or date.min, r.post_time or time(0, 0)), reverse=True)
+    return merged
+
+
+def _get_archive_sheet(create: bool = False, header: Optional[list[str]] = None) -> Optional[gspread.Worksheet]:
+    """Separador de arquivo; None se não existir (ou criado com o cabeçalho indicado, se create)."""
+    gc = _get_client()
+    sheets_rate_limit.acquire("read", n=2)
+    wb = gc.open_by_key(get_ig_sheet_id())
+    try:
+        return wb.worksheet(SHEET_ARCHIVE_TAB_NAME)
+    except gspread.exceptions.WorksheetNotFound:
+        if not create:
+            return None
+    sheets_rate_limit.acquire("write")
+    ws = wb.add_worksheet(title=SHEET_ARCHIVE_TAB_NAME, rows=1000, cols=max(len(header or []), 1))
+    logger.info("Separador de arquivo '%s' criado", SHEET_ARCHIVE_TAB_NAME)
+    return ws
+
+
+def _get_archive_published() -> list[PostRecord]:
+    """
+    Publicados com ImageURL do separador de arquivo (mais recente primeiro), lidos na primeira
+    chamada e reutilizados enquanto o ficheiro não mudar. Falhas devolvem lista vazia.
+    """
+    global _archive_records, _archive_loaded_at, _archive_key, _archive_marker
+    key = _pool_config_key()
+    with _snapshot_lock:
+        if _archive_records is not None and _archive_key == key:
+            loaded_at = _revalidate(_archive_loaded_at, _archive_marker)
+            if loaded_at is not None:
+                _archive_loaded_at = loaded_at
+                return _archive_records
+        marker = _get_drive_marker()
+        try:
+            ws = _get_archive_sheet()
+            rows = []
+            if ws is not None:
+                sheets_rate_limit.acquire("read")
+                rows = _normalize_rows(ws.get_all_values(**_UNFORMATTED))
+        except Exception as e:
+            logger.warning("Separador de arquivo indisponível: %s", e)
+            return []
+        records = []
+        if rows:
+            col = _parse_header_row(rows[0])
+            for i in range(1, len(rows)):
+                rec = _row_to_record(rows[i], col, sheet_row_index=i + 1, tab=SHEET_ARCHIVE_TAB_NAME)
+                if rec is not None and rec.is_published and rec.image_url:
+                    records.append(rec)
+        records.sort(key=lambda r: (r.post_date or date.min, r.post_time or time(0, 0)), reverse=True)
+        _archive_records = records
+        _archive_loaded_at = _time.monotonic()
+        _archive_key = key
+        _archive_marker = marker
+        logger.debug("Separador de arquivo carregado: %d publicado(s) com imagem", len(records))
+        return records
+
+
+def archive_published_rows(older_than_days: int, dry_run: bool = False) -> int:
+    """
+    Move para o separador de arquivo (SHEET_ARCHIVE_TAB_NAME) as linhas publicadas com Date anterior
+    a hoje - older_than_days. As linhas são acrescentadas ao arquivo (sem duplicar as que já lá estão)
+    e só depois apagadas do separador principal, num único batch_update, depois de confirmar (uma releitura
+    das linhas a apagar) que não mudaram desde a leitura.
+    Os números de linha do separador principal mudam: chamar com o lock de publicação e com a fila de
+    escritas vazia (ver scheduler.run_archive). Devolve o número de linhas arquivadas.
+    """
+    if sheet_write_queue.pending_count():
+        raise RuntimeError("Há escritas do Sheet em fila; arquivo adiado para não desalinhar as linhas")
+    cutoff = date.today() - timedelta(days=max(0, older_than_days))
+    with _snapshot_lock:
+        rows = _get_all_rows(force_refresh=True)
+        if len(rows) < 2:
+            return 0
+        header = list(rows[0])
+        col = _parse_header_row(header)
+        to_archive: list[int] = []
+        for i in range(1, len(rows)):
+            rec = _row_to_record(rows[i], col, sheet_row_index=i + 1)
+            if rec is not None and rec.is_published and rec.post_date is not None and rec.post_date < cutoff:
+                to_archive.append(i + 1)
+        if not to_archive or dry_run:
+            return len(to_archive)
+
+        archive = _get_archive_sheet(create=True, header=header)
+        sheets_rate_limit.acquire("read")
+        existing = _normalize_rows(archive.get_all_values(**_UNFORMATTED))
+        archive_header = existing[0] if existing and any(existing[0]) else header
+        archive_col = _parse_header_row(archive_header)
+
+        def dedup_key(values: list[str], c: dict[str, int]) -> tuple[str, ...]:
+            return tuple(
+                (values[c[k]] if k in c and c[k] < len(values) else "").strip()
+                for k in (COL_DATE, COL_TIME, COL_IMAGE_TEXT)
+            )
+
+        already = {dedup_key(r, archive_col) for r in existing[1:]}
+        new_rows = []
+        for row_index in to_archive:
+            values = rows[row_index - 1]
+            if dedup_key(values, col) in already:
+                continue
+            out = [""] * len(archive_header)
+            for name, idx in archive_col.items():
+                src = col.get(name)
+                if src is not None and src < len(values):
+                    out[idx] = values[src]
+            new_rows.append(out)
+        if not existing or not any(existing[0]):
+            new_rows.insert(0, archive_header)
+        if new_rows:
+            sheets_rate_limit.acquire("write")
+            archive.append_rows(new_rows, value_input_option="USER_ENTERED")
+
+        # Apagar do separador principal, de baixo para cima, agrupando linhas consecutivas
+        ranges: list[list[int]] = []
+        for row_index in sorted(to_archive, reverse=True):
+            if ranges and ranges[-1][0] == row_index + 1:
+                ranges[-1][0] = row_index
+            else:
+                ranges.append([row_index, row_index])
+        sheet = _get_sheet()
+        # Reler as linhas a apagar: se alguma mudou desde a leitura (linha inserida ou movida), apagar por
+        # índice removeria outras linhas. As já copiadas para o arquivo não são duplicadas da próxima vez.
+        last_col = gspread.utils.rowcol_to_a1(1, max(1, len(header))).rstrip("1")
+        ordered = sorted(ranges)
+        sheets_rate_limit.acquire("read")
+        current = sheet.batch_get([f"A{start}:{last_col}{end}" for start, end in ordered], **_UNFORMATTED)
+        for (start, end), got in zip(ordered, current):
+            expected = [_trim_row(rows[i - 1][:len(header)]) for i in range(start, end + 1)]
+            if [_trim_row(_normalize_row(r, col)) for r in got] != expected:
+                _reset_after_row_shift()
+                raise RuntimeError(
+                    f"Linhas {start}-{end} mudaram desde a leitura; arquivo cancelado antes de apagar "
+                    f"(as linhas já copiadas para '{SHEET_ARCHIVE_TAB_NAME}' não serão duplicadas)"
+                )
+        requests_body = [
+            {
+                "deleteDimension": {
+                    "range": {"sheetId": sheet.id, "dimension": "ROWS", "startIndex": start - 1, "endIndex": end}
+                }
+            }
+            for start, end in ranges
+        ]
+        sheets_rate_limit.acquire("write")
+        try:
+            sheet.spreadsheet.batch_update({"requests": requests_body})
+        finally:
+            _reset_after_row_shift()
+    logger.info(
+        "Arquivo: %d linha(s) publicadas antes de %s movidas para '%s'", len(to_archive), cutoff, SHEET_ARCHIVE_TAB_NAME
+    )
+    return len(to_archive)
+
+
+def _trim_row(values: list[Any]) -> list[str]:
+    """Linha sem as células vazias do fim (como a API devolve em batch_get)."""
+    out = [str(v) if v is not None else "" for v in values]
+    while out and out[-1] == "":
+        out.pop()
+    return out
+
+
+def _reset_after_row_shift() -> None:
+    """Após apagar linhas: snapshot, cabeçalho e espelho local deixam de corresponder às linhas do Sheet."""
+    global _header_key, _known_row_count
+    with _snapshot_lock:
+        invalidate_cache()
+        _header_key = None
+        _known_row_count = 0
+    if local_store.is_enabled():
+        try:
+            local_store.mark_stale(_mirror_key())
+        except Exception as e:
+            logger.warning("Falha a invalidar espelho local: %s", e)
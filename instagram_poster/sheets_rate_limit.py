@@ -0,0 +1,94 @@
+"""
+Limitador de pedidos à API do Google Sheets (token bucket), partilhado entre processos.
+O estado dos buckets (leituras e escritas, com orçamentos separados) fica numa base SQLite na raiz do
+projecto, por isso o thread do Streamlit, as páginas e o CLI do Task Scheduler gastam a mesma quota.
+Cada pedido reserva um token; se o bucket estiver vazio, o chamador espera a sua vez (latência
+previsível, por ordem de chegada) em vez de receber um 429.
+"""
+import logging
+import sqlite3
+import threading
+import time as _time
+from pathlib import Path
+from typing import Literal
+
+from instagram_poster.config import get_sheets_read_requests_per_minute, get_sheets_write_requests_per_minute
+
+logger = logging.getLogger(__name__)
+
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent
+_DB_FILE = _PROJECT_ROOT / ".sheets_rate_limit.db"
+_BURST_WINDOW_SEC = 10.0  # capacidade do bucket = pedidos permitidos em 10 s (evita rajadas na mudança de minuto)
+_SLOW_WAIT_LOG_SEC = 5.0
+
+Kind = Literal["read", "write"]
+
+_local_lock = threading.Lock()
+_local_buckets: dict[str, tuple[float, float]] = {}  # fallback se a base SQLite não estiver disponível
+_sqlite_failed = False
+
+
+def _budget(kind: Kind) -> float:
+    if kind == "write":
+        return get_sheets_write_requests_per_minute()
+    return get_sheets_read_requests_per_minute()
+
+
+def _refill(tokens: float, updated_at: float, now: float, rate: float, capacity: float) -> float:
+    return min(capacity, tokens + max(0.0, now - updated_at) * rate)
+
+
+def _reserve_sqlite(kind: str, n: float, rate: float, capacity: float) -> float:
+    """Reserva n tokens no bucket partilhado; devolve o saldo após a reserva (negativo = em dívida)."""
+    conn = sqlite3.connect(str(_DB_FILE), timeout=10, isolation_level=None)
+    try:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        conn.execute("BEGIN IMMEDIATE")
+        now = _time.time()
+        row = conn.execute("SELECT tokens, updated_at FROM buckets WHERE name = ?", (kind,)).fetchone()
+        tokens = capacity if row is None else _refill(row[0], row[1], now, rate, capacity)
+        tokens -= n
+        conn.execute("INSERT OR REPLACE INTO buckets(name, tokens, updated_at) VALUES (?, ?, ?)", (kind, tokens, now))
+        conn.execute("COMMIT")
+        return tokens
+    finally:
+        conn.close()
+
+
+def _reserve_local(kind: str, n: float, rate: float, capacity: float) -> float:
+    with _local_lock:
+        now = _time.time()
+        tokens, updated_at = _local_buckets.get(kind, (capacity, now))
+        tokens = _refill(tokens, updated_at, now, rate, capacity) - n
+        _local_buckets[kind] = (tokens, now)
+        return tokens
+
+
+def acquire(kind: Kind = "read", n: int = 1) -> float:
+    """
+    Bloqueia até haver quota para n pedidos do tipo indicado. Devolve os segundos esperados.
+    Com o orçamento a 0 (sem limite) devolve de imediato.
+    """
+    global _sqlite_failed
+    per_minute = _budget(kind)
+    if per_minute <= 0:
+        return 0.0
+    rate = per_minute / 60.0
+    capacity = max(1.0, rate * _BURST_WINDOW_SEC)
+    tokens = None
+    if not _sqlite_failed:
+        try:
+            tokens = _reserve_sqlite(kind, n, rate, capacity)
+        except sqlite3.Error as e:
+            _sqlite_failed = True
+            logger.warning("Limitador do Sheets: base partilhada indisponível (%s); limite aplicado só neste processo", e)
+    if tokens is None:
+        tokens = _reserve_local(kind, n, rate, capacity)
+    wait = -tokens / rate if tokens < 0 else 0.0
+    if wait > 0:
+        if wait >= _SLOW_WAIT_LOG_SEC:
+            logger.info("Limitador do Sheets: à espera de %.1fs pela quota de %s", wait, kind)
+        _time.sleep(wait)
+    return wait
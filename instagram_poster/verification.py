@@ -3,7 +3,7 @@ Funções de verificação/teste para validar a configuração de cada serviço.
 """
 import io
 import base64
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Tuple
 
 import requests
 
@@ -14,26 +14,17 @@ from instagram_poster.config import (
     get_cloudinary_url,
     get_media_backend,
     get_media_root,
-    IG_GRAPH_API_VERSION,
     get_gemini_api_key,
     get_ig_access_token,
     get_ig_business_id,
     get_image_provider,
+    get_ig_usage_defer_percent,
     get_openai_api_key,
 )
+from instagram_poster import ig_client, ig_usage
+from instagram_poster.ig_usage import RATE_LIMIT_ERROR_CODES, RATE_LIMIT_LABELS, USAGE_HEADERS
 from instagram_poster.providers import AVAILABLE_PROVIDERS
 
-# Códigos de erro da Meta/Instagram que indicam rate limit
-RATE_LIMIT_ERROR_CODES = (4, 17, 32, 613)
-RATE_LIMIT_LABELS = {
-    4: "rate limit da app",
-    17: "rate limit do utilizador",
-    32: "rate limit de páginas",
-    613: "rate limit customizado",
-}
-# Headers de uso da Meta (valor em percentagem; 100 = no limite)
-USAGE_HEADERS = ("X-App-Usage", "X-Ad-Account-Usage", "X-Page-Usage")
-
 
 def verify_google_sheets() -> Tuple[bool, str]:
     """Verifica se a ligação ao Google Sheet funciona (lê 1 linha)."""
@@ -51,10 +42,10 @@ def verify_instagram() -> Tuple[bool, str]:
     token = get_ig_access_token()
     if not ig_id or not token:
         return False, "Instagram: preenche IG_BUSINESS_ID e IG_ACCESS_TOKEN."
-    url = f"https://graph.instagram.com/{IG_GRAPH_API_VERSION}/{ig_id}"
+    url = ig_client._url(f"/{ig_id}")
     params = {"fields": "id,username", "access_token": token}
     try:
-        resp = requests.get(url, params=params, timeout=10)
+        resp = ig_client.get_session().get(url, params=params, timeout=ig_client.TIMEOUT_CHECK)
         resp.raise_for_status()
         data = resp.json()
         username = data.get("username", "?")
@@ -90,10 +81,10 @@ def check_instagram_api_status() -> Dict[str, Any]:
     if not ig_id or not token:
         result["summary"].append("Preenche IG_BUSINESS_ID e IG_ACCESS_TOKEN.")
         return result
-    url = f"https://graph.instagram.com/{IG_GRAPH_API_VERSION}/{ig_id}"
+    url = ig_client._url(f"/{ig_id}")
     params = {"fields": "id,username", "access_token": token}
     try:
-        resp = requests.get(url, params=params, timeout=15)
+        resp = ig_client.get_session().get(url, params=params, timeout=ig_client.TIMEOUT_STATUS)
         result["status_code"] = resp.status_code
         for name in USAGE_HEADERS:
             val = resp.headers.get(name)
@@ -122,26 +113,17 @@ def check_instagram_api_status() -> Dict[str, Any]:
         result["ok"] = True
         result["summary"].append("Request OK — a API respondeu normalmente.")
         for hname, hval in result["usage_headers"].items():
-            try:
-                raw = str(hval).strip()
-                parts = [p.strip() for p in raw.split(",")]
-                pcts: List[Optional[int]] = []
-                for part in parts:
-                    p = part.replace("%", "").strip()
-                    if p.isdigit():
-                        pcts.append(int(p))
-                    else:
-                        pcts.append(None)
-                if pcts:
-                    max_pct = max((x for x in pcts if x is not None), default=None)
-                    if max_pct is not None and max_pct >= 100:
-                        result["summary"].append(f"{hname}: {raw} — no limite (100%).")
-                    elif max_pct is not None:
-                        result["summary"].append(f"{hname}: {raw}")
-                else:
-                    result["summary"].append(f"{hname}: {raw}")
-            except Exception:
-                result["summary"].append(f"{hname}: {hval}")
+            raw = str(hval).strip()
+            max_pct, _ = ig_usage.parse_usage(raw)
+            if max_pct is not None and max_pct >= 100:
+                result["summary"].append(f"{hname}: {raw} — no limite (100%).")
+            else:
+                result["summary"].append(f"{hname}: {raw}")
+        usage = ig_usage.snapshot()
+        result["summary"].append(
+            f"Uso estimado da API: {usage['usage_percent']:.0f}% "
+            f"(autoresposta e Stories/Reels reutilizados adiados a partir de {get_ig_usage_defer_percent():.0f}%)."
+        )
         return result
     except requests.RequestException as e:
         result["summary"].append(f"Falha de rede: {e}")
@@ -17,7 +17,6 @@ from instagram_poster.env_utils import (
     update_env_vars,
 )
 from instagram_poster.providers import AVAILABLE_PROVIDERS
-from instagram_poster.sheets_client import get_all_rows_with_image_text, update_gemini_prompt
 from instagram_poster.verification import (
     check_instagram_api_status,
     verify_all_connections,
@@ -763,28 +762,30 @@ st.caption(
     "Gera descrições visuais (sem texto) a partir da Image Text de cada linha, "
     "usando IA para converter a quote numa cena. A quote é sobreposta na imagem ao publicar."
 )
+gemini_prompt_force = st.checkbox(
+    "Regenerar também as linhas que já têm Gemini_Prompt",
+    value=False,
+    key="gemini_prompt_force",
+)
 if st.button("Preencher Gemini_Prompt no Sheet"):
     _apply_config_from_session()
     try:
-        from instagram_poster.image_generator import _quote_to_scene_prompt
+        from instagram_poster.prompt_backfill import backfill_gemini_prompts
+
+        progress = st.progress(0, text="A converter quotes em descrições visuais...")
 
-        rows = get_all_rows_with_image_text()
-        if not rows:
+        def _on_progress(done: int, total: int) -> None:
+            progress.progress(done / total, text=f"A converter quotes... ({done}/{total})")
+
+        result = backfill_gemini_prompts(force=gemini_prompt_force, on_progress=_on_progress)
+        progress.empty()
+        if not result["total"] and not result["skipped"]:
             st.warning("Nenhuma linha com Image Text encontrada.")
         else:
-            progress = st.progress(0, text="A converter quotes em descrições visuais...")
-            total = len(rows)
-            ok_count = 0
-            for i, rec in enumerate(rows):
-                image_text = (rec.get("image_text") or "").strip()
-                if not image_text:
-                    continue
-                scene_prompt = _quote_to_scene_prompt(image_text)
-                update_gemini_prompt(rec["row_index"], scene_prompt)
-                ok_count += 1
-                progress.progress((i + 1) / total, text=f"Linha {rec['row_index']}... ({i + 1}/{total})")
-            progress.empty()
-            st.success(f"Gemini_Prompt preenchido em {ok_count} linhas (descrição visual sem texto).")
+            st.success(
+                f"Gemini_Prompt preenchido em {result['updated']} linhas (descrição visual sem texto). "
+                f"{result['skipped']} já tinham prompt; {result['failed']} falharam."
+            )
             st.rerun()
     except Exception as e:
         st.error(f"Erro: {e}")
@@ -875,7 +876,7 @@ ap_reel = st.toggle(
     "Publicar Reel automaticamente a cada 5 posts nunca usados em Reels",
     value=_ap_reel,
     key="config_autopublish_reel",
-    help="Critério: 5 posts já publicados no Sheet (com ImageURL) que ainda não tenham sido usados em nenhum Reel (registo em assets/reels_used_rows.json). Gera e publica um Reel (8s/slide, fade, áudio da pasta MUSIC). Não significa «5 posts novos desde o último Reel».",
+    help="Critério: 5 posts já publicados no Sheet (com ImageURL) que ainda não tenham sido usados em nenhum Reel (registo em assets/reels_used_posts.json). Gera e publica um Reel (8s/slide, fade, áudio da pasta MUSIC). Não significa «5 posts novos desde o último Reel».",
 )
 col_reuse_toggle, col_reuse_time, col_reuse_unit = st.columns([2, 1, 0.5])
 with col_reuse_toggle:
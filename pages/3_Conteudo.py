@@ -194,7 +194,10 @@ if "generated_content" in st.session_state and st.session_state["generated_conte
             try:
                 rows = _dataframe_to_sheet_rows(edited_df)
                 count = append_rows(rows)
-                st.success(f"{count} posts adicionados ao Google Sheet!")
+                msg = f"{count} posts adicionados ao Google Sheet!"
+                if count < len(rows):
+                    msg += f" ({len(rows) - count} já existiam no Sheet e foram ignorados.)"
+                st.success(msg)
                 st.session_state["generated_content"] = None
                 st.rerun()
             except Exception as e:
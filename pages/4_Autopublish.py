@@ -114,7 +114,7 @@ ap_reel = st.toggle(
     "Publicar Reel automaticamente a cada 5 posts nunca usados em Reels",
     value=_ap_reel,
     key="ap_menu_reel",
-    help="Critério: 5 posts já publicados no Sheet (com ImageURL) que ainda não tenham sido usados em nenhum Reel (registo em assets/reels_used_rows.json). Gera e publica um Reel (8s/slide, fade, áudio da pasta MUSIC). Não significa «5 posts novos desde o último Reel».",
+    help="Critério: 5 posts já publicados no Sheet (com ImageURL) que ainda não tenham sido usados em nenhum Reel (registo em assets/reels_used_posts.json). Gera e publica um Reel (8s/slide, fade, áudio da pasta MUSIC). Não significa «5 posts novos desde o último Reel».",
 )
 col_reuse_toggle, col_reuse_time, col_reuse_unit = st.columns([2, 1, 0.5])
 with col_reuse_toggle:
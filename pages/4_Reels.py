@@ -176,7 +176,7 @@ if st.button("Gerar Reel", type="primary", key="reel_generate"):
                     audio_volume=audio_volume,
                 )
                 st.session_state.reel_video_bytes = video_bytes
-                st.session_state.reel_posts_for_video = [p.get("row_index") for p in posts_to_use if p.get("row_index") is not None]
+                st.session_state.reel_posts_for_video = [p.get("post_id") for p in posts_to_use if p.get("post_id")]
                 st.success("Reel gerado. Visualiza em baixo e publica no Instagram quando quiseres.")
                 st.rerun()
             except Exception as e:
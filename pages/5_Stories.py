@@ -67,7 +67,7 @@ if rows_missing_url:
                         prompt=gemini_prompt or image_text,
                         quote_text=image_text if image_text else None,
                         use_full_prompt=bool(gemini_prompt),
-                        public_id_prefix=f"keepcalm_{row_index}",
+                        public_id_prefix=f"keepcalm_{rec.get('post_id') or row_index}",
                     )
                     update_image_url(row_index, url)
                     ok += 1
@@ -78,7 +78,13 @@ if rows_missing_url:
             st.rerun()
 
 st.subheader("Publicar Story manualmente")
-posts = get_published_posts_with_image()
+include_archive = st.toggle(
+    "Incluir posts arquivados",
+    value=False,
+    key="stories_include_archive",
+    help="Também lista os posts do separador de arquivo (SHEET_ARCHIVE_TAB_NAME). Lê esse separador do Sheet.",
+)
+posts = get_published_posts_with_image(include_archive=include_archive)
 _no_posts_msg = (
     "Nenhum post publicado com imagem no Sheet. "
     "Se já tens publicações no Instagram, usa o bloco «Reparar: linha(s) publicada(s) sem ImageURL» acima para preencher o ImageURL; ou publica um novo post pela app (o URL passa a ser guardado automaticamente)."
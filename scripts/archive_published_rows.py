@@ -0,0 +1,37 @@
+"""
+Move para o separador de arquivo (SHEET_ARCHIVE_TAB_NAME, default "Arquivo") as linhas já
+publicadas há mais de N dias, para que o separador principal só tenha posts recentes e futuros.
+O separador de arquivo é criado se não existir; Stories/Reels reutilizam também os posts arquivados.
+
+Corre: py -m scripts.archive_published_rows --days 30
+(ou: python scripts/archive_published_rows.py --days 30 --dry-run)
+"""
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def main():
+    from instagram_poster.config import get_sheets_archive_after_days
+    from instagram_poster.scheduler import run_archive
+
+    parser = argparse.ArgumentParser(description="Arquivar posts publicados antigos noutro separador do Sheet.")
+    parser.add_argument(
+        "--days",
+        type=int,
+        default=get_sheets_archive_after_days() or 30,
+        help="Arquivar posts publicados com Date anterior a hoje menos N dias (default: SHEETS_ARCHIVE_AFTER_DAYS ou 30).",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Só contar as linhas, sem mover nada.")
+    args = parser.parse_args()
+
+    ok, message, _ = run_archive(args.days, dry_run=args.dry_run)
+    print(message)
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
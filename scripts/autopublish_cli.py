@@ -21,7 +21,8 @@ if _env_path.exists():
     load_dotenv(_env_path, override=True)
 
 from instagram_poster import config  # noqa: F401 — carrega .env e patch IPv4
-from instagram_poster.autopublish import ensure_log_loaded_for_cli, run_once, try_publish_auto_reel, try_publish_reel_reuse_scheduled, try_publish_story_reuse_scheduled
+from instagram_poster import sheet_write_queue
+from instagram_poster.autopublish import ensure_log_loaded_for_cli, run_once, try_archive_scheduled, try_publish_auto_reel, try_publish_reel_reuse_scheduled, try_publish_story_reuse_scheduled
 
 logging.basicConfig(
     level=logging.INFO,
@@ -30,9 +31,21 @@ logging.basicConfig(
 logger = logging.getLogger("autopublish_cli")
 
 
+def _flush_sheet_writes(timeout: float) -> None:
+    """Aplica no Sheet as escritas em fila (desta execução ou de execuções anteriores)."""
+    try:
+        left = sheet_write_queue.drain_until_empty(timeout=timeout)
+        if left:
+            logger.warning("Autopublish CLI: %d escrita(s) no Sheet continuam em fila para a próxima execução.", left)
+    except Exception:
+        logger.exception("Autopublish CLI: erro ao esvaziar fila de escritas do Sheet")
+
+
 def main():
     # Carregar log existente para não sobrescrever (Reels, Stories, etc.) ao gravar
     ensure_log_loaded_for_cli()
+    # Escritas pendentes de execuções anteriores (ex.: Sheet indisponível) antes de escolher o próximo post
+    _flush_sheet_writes(timeout=15)
 
     logger.info("Autopublish CLI: a verificar posts prontos...")
     try:
@@ -48,6 +61,15 @@ def main():
         logger.exception("Autopublish CLI: erro inesperado")
         sys.exit(1)
 
+    # Pré-preparação dos posts das próximas PUBLISH_PRESTAGE_LEAD_MINUTES (igual ao thread do Streamlit)
+    try:
+        from instagram_poster import prestage
+        staged = prestage.stage_upcoming()
+        if staged:
+            logger.info("Autopublish CLI: %d post(s) pré-preparado(s) para publicação à hora.", staged)
+    except Exception:
+        logger.exception("Autopublish CLI: erro na pré-preparação de posts")
+
     # Reels automáticos (igual ao thread do Streamlit)
     try:
         if config.get_autopublish_reel_every_5():
@@ -60,6 +82,11 @@ def main():
             logger.info("Autopublish CLI: Reel reuse agendado publicado.")
     except Exception:
         logger.exception("Autopublish CLI: erro no Reel reuse")
+    try:
+        if try_archive_scheduled():
+            logger.info("Autopublish CLI: posts publicados antigos movidos para o arquivo.")
+    except Exception:
+        logger.exception("Autopublish CLI: erro no arquivo automático")
     try:
         if try_publish_story_reuse_scheduled():
             logger.info("Autopublish CLI: Story reuse agendada publicada.")
@@ -75,6 +102,8 @@ def main():
     except Exception:
         logger.exception("Autopublish CLI: erro na autoresposta a comentários")
 
+    _flush_sheet_writes(timeout=60)
+
 
 if __name__ == "__main__":
     main()
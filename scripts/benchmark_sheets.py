@@ -0,0 +1,223 @@
+"""
+Benchmark do sheets_client contra um Sheet em memória (scripts/fake_sheet.py), sem tocar no Google.
+Mede o tempo e o número de pedidos à API de get_next_ready_post, get_upcoming_posts,
+get_published_posts_with_image, mark_published, append_rows, etc. com 1k, 10k e 100k linhas.
+
+Os resultados de referência ficam em scripts/benchmark_sheets_baseline.json (versionado):
+  --update-baseline  grava os resultados actuais como nova referência
+  --check            compara com a referência; falha (exit 1) se um caso ficar mais lento que a
+                     tolerância ou fizer mais pedidos à API do que antes
+Os tempos dependem da máquina; o número de pedidos não (é a métrica mais fiável entre máquinas).
+
+Corre: py -m scripts.benchmark_sheets --check
+(ou: python scripts/benchmark_sheets.py --sizes 1000,10000 --latency 0.05)
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+_BASELINE_FILE = Path(__file__).resolve().parent / "benchmark_sheets_baseline.json"
+_DEFAULT_SIZES = (1_000, 10_000, 100_000)
+_MIN_SLACK_MS = 5.0  # diferenças abaixo disto são ruído, mesmo que excedam a tolerância relativa
+
+
+def _isolate_environment(tmp_dir: Path) -> None:
+    """Sem limitador de pedidos, sem espelho local e com a fila de escritas num directório temporário."""
+    os.environ["SHEETS_READ_REQUESTS_PER_MINUTE"] = "0"
+    os.environ["SHEETS_WRITE_REQUESTS_PER_MINUTE"] = "0"
+    os.environ["SHEETS_LOCAL_MIRROR"] = "false"
+    from instagram_poster import sheet_write_queue
+
+    sheet_write_queue._QUEUE_FILE = tmp_dir / ".sheet_write_queue.json"
+    sheet_write_queue._QUEUE_LOCK_FILE = tmp_dir / ".sheet_write_queue.lock"
+
+
+def _new_rows(ws, n: int) -> list[list[str]]:
+    """n linhas novas com datas a seguir à última do separador (append_rows não as trata como duplicadas)."""
+    last = date.fromisoformat(ws.rows[-1][0])
+    return [
+        [(last + timedelta(days=i + 1)).isoformat(), "21:30", f"Novo post {last}+{i}", "Caption", "", "ready", "", "", "yes"]
+        for i in range(n)
+    ]
+
+
+def _cases(ws) -> list[tuple[str, Callable[[], None], Callable[[], Any]]]:
+    """(nome, preparação não cronometrada, operação cronometrada)."""
+    from instagram_poster import sheet_write_queue, sheets_client
+    from scripts.fake_sheet import reset_caches
+
+    def warm() -> None:
+        reset_caches()
+        sheets_client.get_next_ready_post()
+        sheets_client.get_published_posts_with_image()
+
+    def next_ready_row() -> int:
+        post = sheets_client.get_next_ready_post()
+        if post is None:
+            raise RuntimeError("Sem posts ready no Sheet de teste")
+        return post.row_index
+
+    state: dict[str, Any] = {}
+
+    def prepare_mark() -> None:
+        sheet_write_queue.drain()
+        warm()
+        state["row"] = next_ready_row()
+
+    def prepare_drain() -> None:
+        prepare_mark()
+        sheets_client.mark_published_deferred(state["row"])
+
+    def prepare_append() -> None:
+        warm()
+        state["rows"] = _new_rows(ws, 30)
+
+    return [
+        ("get_next_ready_post (frio)", reset_caches, sheets_client.get_next_ready_post),
+        ("get_next_ready_post (quente)", warm, sheets_client.get_next_ready_post),
+        ("get_upcoming_posts(14) (frio)", reset_caches, lambda: sheets_client.get_upcoming_posts(14)),
+        ("get_published_posts_with_image (frio)", reset_caches, sheets_client.get_published_posts_with_image),
+        ("get_published_posts_with_image (quente)", warm, sheets_client.get_published_posts_with_image),
+        ("get_last_published_posts(5) (quente)", warm, lambda: sheets_client.get_last_published_posts(5)),
+        (
+            "mark_published + get_next_ready_post",
+            prepare_mark,
+            lambda: (sheets_client.mark_published(state["row"], "https://media.example.com/x.jpg"),
+                     sheets_client.get_next_ready_post()),
+        ),
+        (
+            "mark_published_deferred + get_next_ready_post",
+            prepare_mark,
+            lambda: (sheets_client.mark_published_deferred(state["row"], "https://media.example.com/x.jpg"),
+                     sheets_client.get_next_ready_post()),
+        ),
+        ("sheet_write_queue.drain", prepare_drain, sheet_write_queue.drain),
+        ("append_rows(30)", prepare_append, lambda: sheets_client.append_rows(state["rows"])),
+    ]
+
+
+def _run_size(size: int, repeat: int, latency: float, latency_per_1k_cells: float) -> dict[str, dict[str, float]]:
+    from scripts.fake_sheet import install, make_rows
+
+    ws = install(make_rows(size), latency=latency, latency_per_1k_cells=latency_per_1k_cells)
+    results: dict[str, dict[str, float]] = {}
+    for name, prepare, op in _cases(ws):
+        times = []
+        calls = 0
+        for _ in range(repeat):
+            prepare()
+            before = sum(ws.calls.values())
+            start = time.perf_counter()
+            op()
+            times.append((time.perf_counter() - start) * 1000.0)
+            calls = sum(ws.calls.values()) - before
+        results[name] = {"ms": round(statistics.median(times), 2), "calls": calls}
+        print(f"  {name:<48} {results[name]['ms']:>10.2f} ms  {calls:>3} pedido(s)")
+    return results
+
+
+def _compare(current: dict[str, Any], baseline: dict[str, Any], tolerance: float) -> list[str]:
+    """Regressões face à referência: mais pedidos à API, ou tempo acima de baseline * tolerance."""
+    problems = []
+    for size, cases in current["results"].items():
+        base_cases = baseline.get("results", {}).get(size, {})
+        for name, res in cases.items():
+            base = base_cases.get(name)
+            if base is None:
+                continue
+            if res["calls"] > base["calls"]:
+                problems.append(f"{size} linhas / {name}: {res['calls']} pedidos (referência {base['calls']})")
+            limit = max(base["ms"] * tolerance, base["ms"] + _MIN_SLACK_MS)
+            if res["ms"] > limit:
+                problems.append(f"{size} linhas / {name}: {res['ms']:.2f} ms (referência {base['ms']:.2f} ms)")
+    return problems
+
+
+def _load_baseline(path: Path) -> Optional[dict[str, Any]]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do sheets_client contra um Sheet em memória.")
+    parser.add_argument(
+        "--sizes",
+        default=",".join(str(s) for s in _DEFAULT_SIZES),
+        help="Números de linhas a testar, separados por vírgula (default: 1000,10000,100000).",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Repetições por caso; reporta a mediana (default: 5).")
+    parser.add_argument("--latency", type=float, default=0.0, help="Latência simulada por pedido, em segundos (default: 0).")
+    parser.add_argument(
+        "--latency-per-1k-cells",
+        type=float,
+        default=0.0,
+        help="Latência extra por 1000 células transferidas, em segundos (default: 0).",
+    )
+    parser.add_argument("--baseline", type=Path, default=_BASELINE_FILE, help="Ficheiro de referência.")
+    parser.add_argument("--check", action="store_true", help="Comparar com a referência e falhar se houver regressões.")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=1.5,
+        help="Factor de tolerância dos tempos no --check (default: 1.5 = até 50%% mais lento).",
+    )
+    parser.add_argument("--update-baseline", action="store_true", help="Gravar os resultados como nova referência.")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    with tempfile.TemporaryDirectory(prefix="benchmark_sheets_") as tmp:
+        _isolate_environment(Path(tmp))
+        current: dict[str, Any] = {
+            "meta": {
+                "repeat": args.repeat,
+                "latency": args.latency,
+                "latency_per_1k_cells": args.latency_per_1k_cells,
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+            },
+            "results": {},
+        }
+        for size in sizes:
+            print(f"{size} linhas:")
+            current["results"][str(size)] = _run_size(size, args.repeat, args.latency, args.latency_per_1k_cells)
+
+    exit_code = 0
+    if args.check:
+        baseline = _load_baseline(args.baseline)
+        if baseline is None:
+            print(f"Sem referência em {args.baseline}; corre com --update-baseline.")
+            exit_code = 1
+        else:
+            base_meta = baseline.get("meta", {})
+            if (base_meta.get("latency"), base_meta.get("latency_per_1k_cells")) != (
+                args.latency, args.latency_per_1k_cells
+            ):
+                print("Aviso: a referência foi gravada com outra latência simulada; os tempos não são comparáveis.")
+            problems = _compare(current, baseline, args.tolerance)
+            if problems:
+                print("Regressões face à referência:")
+                for p in problems:
+                    print(f"  - {p}")
+                exit_code = 1
+            else:
+                print("Sem regressões face à referência.")
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(current, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"Referência gravada em {args.baseline}")
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""
+Substituto local do gspread (cliente, workbook e worksheet em memória) para medir o sheets_client
+sem tocar no Google. Implementa só o que o sheets_client usa: get_all_values, row_values, batch_get,
+update_cell, batch_update, append_rows/values_append, deleteDimension e o pedido de metadados do Drive.
+As células são guardadas como texto: as opções de leitura (value_render_option, ...) são ignoradas.
+Cada chamada pode simular latência de rede (por pedido e por 1000 células transferidas) e é contada
+em FakeWorksheet.calls, para comparar o número de pedidos entre versões.
+
+Uso (ver scripts/benchmark_sheets.py):
+    from scripts.fake_sheet import install, make_rows
+    ws = install(make_rows(10_000), latency=0.05)
+"""
+import re
+import sys
+import time
+from collections import Counter
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import gspread  # noqa: E402
+
+HEADER = ["Date", "Time", "Image Text", "Caption", "Gemini_Prompt", "Status", "Published", "ImageURL", "Image Prompt"]
+
+_A1_RE = re.compile(r"^(?:[^!]*!)?([A-Z]*)(\d*)$")
+
+
+def _col_to_index(letters: str) -> int:
+    n = 0
+    for ch in letters:
+        n = n * 26 + (ord(ch) - 64)
+    return n
+
+
+def _parse_a1(ref: str) -> tuple[Optional[int], Optional[int]]:
+    """'C5' -> (5, 3); 'C' -> (None, 3); '5' -> (5, None). Linhas e colunas 1-based."""
+    m = _A1_RE.match(ref.strip())
+    if not m:
+        raise ValueError(f"Intervalo A1 inválido: {ref}")
+    letters, digits = m.groups()
+    return (int(digits) if digits else None, _col_to_index(letters) if letters else None)
+
+
+def _trim(values: list[Any]) -> list[Any]:
+    """Como a API: corta células vazias no fim da linha."""
+    end = len(values)
+    while end and values[end - 1] in ("", None):
+        end -= 1
+    return values[:end]
+
+
+def make_rows(
+    n: int, published_fraction: float = 0.8, overdue: int = 30, today: Optional[date] = None
+) -> list[list[str]]:
+    """
+    Gera um separador realista com n posts diários: os primeiros published_fraction já publicados
+    (com ImageURL), os restantes ready. Os primeiros `overdue` ready têm data anterior a today
+    (default: hoje), para haver vários candidatos a get_next_ready_post.
+    """
+    today = today or date.today()
+    n_published = int(n * published_fraction)
+    first = today - timedelta(days=n_published + min(overdue, n - n_published))
+    rows = [list(HEADER)]
+    for i in range(n):
+        d = first + timedelta(days=i)
+        published = i < n_published
+        rows.append([
+            d.isoformat(),
+            "21:30",
+            f"Keep calm and carry on #{i}",
+            f"Caption do post {i} #keepcalm",
+            f"A calm landscape, scene {i}",
+            "posted" if published else "ready",
+            "yes" if published else "",
+            f"https://media.example.com/keepcalm_{i}.jpg" if published else "",
+            "yes",
+        ])
+    return rows
+
+
+class FakeWorksheet:
+    def __init__(self, spreadsheet: "FakeSpreadsheet", title: str, rows: list[list[str]], sheet_id: int):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.id = sheet_id
+        self.rows = [list(r) for r in rows]
+
+    @property
+    def calls(self) -> Counter:
+        return self.spreadsheet.client.calls
+
+    def _io(self, method: str, cells: int = 0) -> None:
+        self.spreadsheet.client.simulate(method, cells)
+
+    def _cell_count(self, rows: list[list[Any]]) -> int:
+        return sum(len(r) for r in rows)
+
+    def _touch(self) -> None:
+        self.spreadsheet.version += 1
+
+    def _set(self, row: int, col: int, value: Any) -> None:
+        while len(self.rows) < row:
+            self.rows.append([])
+        r = self.rows[row - 1]
+        if len(r) < col:
+            r.extend([""] * (col - len(r)))
+        r[col - 1] = "" if value is None else str(value)
+
+    # --- leituras ---
+    def get_all_values(self, **kwargs: Any) -> list[list[str]]:
+        width = max((len(r) for r in self.rows), default=0)
+        out = [list(r) + [""] * (width - len(r)) for r in self.rows]
+        while out and not any(out[-1]):
+            out.pop()
+        self._io("get_all_values", self._cell_count(out))
+        return out
+
+    def row_values(self, row: int, **kwargs: Any) -> list[str]:
+        values = _trim(list(self.rows[row - 1])) if row <= len(self.rows) else []
+        self._io("row_values", len(values))
+        return values
+
+    def batch_get(
+        self, ranges: list[str], major_dimension: Optional[str] = None, **kwargs: Any
+    ) -> list[list[list[str]]]:
+        out = []
+        for rng in ranges:
+            start, _, end = rng.partition(":")
+            r0, c0 = _parse_a1(start)
+            r1, c1 = _parse_a1(end or start)
+            r0, c0 = r0 or 1, c0 or 1
+            r1 = r1 or len(self.rows)
+            c1 = c1 or max((len(r) for r in self.rows), default=0)
+            block = []
+            for r in self.rows[r0 - 1:r1]:
+                cells = list(r[c0 - 1:c1])
+                block.append(cells + [""] * (c1 - c0 + 1 - len(cells)))
+            if major_dimension == "COLUMNS":
+                block = [list(col) for col in zip(*block)] if block else []
+            block = [_trim(v) for v in block]
+            while block and not block[-1]:
+                block.pop()
+            out.append(block)
+        self._io("batch_get", sum(self._cell_count(b) for b in out))
+        return out
+
+    # --- escritas ---
+    def update_cell(self, row: int, col: int, value: Any) -> None:
+        self._io("update_cell", 1)
+        self._set(row, col, value)
+        self._touch()
+
+    def batch_update(self, data: list[dict[str, Any]], value_input_option: Optional[str] = None) -> None:
+        cells = 0
+        for item in data:
+            start = item["range"].partition(":")[0]
+            r0, c0 = _parse_a1(start)
+            for i, values in enumerate(item["values"]):
+                for j, v in enumerate(values):
+                    self._set(r0 + i, c0 + j, v)
+                    cells += 1
+        self._io("batch_update", cells)
+        self._touch()
+
+    def append_rows(
+        self,
+        values: list[list[Any]],
+        value_input_option: Optional[str] = None,
+        include_values_in_response: Optional[bool] = None,
+        **kwargs: Any,
+    ) -> dict[str, Any]:
+        while self.rows and not any(self.rows[-1]):
+            self.rows.pop()
+        start = len(self.rows) + 1
+        written = [["" if v is None else str(v) for v in row] for row in values]
+        self.rows.extend(list(r) for r in written)
+        self._io("append_rows", self._cell_count(written))
+        self._touch()
+        updates: dict[str, Any] = {"updatedRange": f"{self.title}!A{start}", "updatedRows": len(written)}
+        if include_values_in_response:
+            updates["updatedData"] = {"values": [_trim(list(r)) for r in written]}
+        return {"updates": updates}
+
+
+class FakeSpreadsheet:
+    def __init__(self, client: "FakeClient", key: str):
+        self.client = client
+        self.id = key
+        self.version = 1
+        self.tabs: dict[str, FakeWorksheet] = {}
+
+    def worksheet(self, title: str) -> FakeWorksheet:
+        self.client.simulate("fetch_sheet_metadata", 0)
+        if title not in self.tabs:
+            raise gspread.exceptions.WorksheetNotFound(title)
+        return self.tabs[title]
+
+    def add_worksheet(self, title: str, rows: int, cols: int, index: Optional[int] = None) -> FakeWorksheet:
+        self.client.simulate("add_worksheet", 0)
+        ws = FakeWorksheet(self, title, [], sheet_id=len(self.tabs))
+        self.tabs[title] = ws
+        self.version += 1
+        return ws
+
+    def values_append(self, range: str, params: dict[str, Any], body: dict[str, Any]) -> dict[str, Any]:
+        title = range.rpartition("!")[0].strip("'")
+        return self.tabs[title].append_rows(
+            body["values"],
+            value_input_option=params.get("valueInputOption"),
+            include_values_in_response=params.get("includeValuesInResponse"),
+        )
+
+    def batch_update(self, body: dict[str, Any]) -> dict[str, Any]:
+        self.client.simulate("spreadsheet_batch_update", 0)
+        by_id = {ws.id: ws for ws in self.tabs.values()}
+        for req in body.get("requests", []):
+            rng = req["deleteDimension"]["range"]
+            ws = by_id[rng["sheetId"]]
+            del ws.rows[rng["startIndex"]:rng["endIndex"]]
+        self.version += 1
+        return {}
+
+
+class _FakeResponse:
+    def __init__(self, data: dict[str, Any]):
+        self._data = data
+
+    def json(self) -> dict[str, Any]:
+        return self._data
+
+
+class _FakeHTTPClient:
+    def __init__(self, client: "FakeClient"):
+        self.client = client
+        self.auth = None
+
+    def request(self, method: str, url: str, params: Optional[dict[str, Any]] = None, **kwargs: Any) -> _FakeResponse:
+        """Metadados do Drive (version/modifiedTime), usados na detecção de alterações."""
+        self.client.simulate("drive_metadata", 0)
+        key = url.rstrip("/").rsplit("/", 1)[-1]
+        wb = self.client.spreadsheets[key]
+        return _FakeResponse({"version": str(wb.version), "modifiedTime": f"v{wb.version}"})
+
+
+class FakeClient:
+    """
+    Cliente em memória. latency: segundos por pedido; latency_per_1k_cells: segundos extra por
+    1000 células enviadas/recebidas (aproxima o custo de transferir separadores grandes).
+    """
+
+    def __init__(self, latency: float = 0.0, latency_per_1k_cells: float = 0.0):
+        self.latency = latency
+        self.latency_per_1k_cells = latency_per_1k_cells
+        self.calls: Counter = Counter()
+        self.spreadsheets: dict[str, FakeSpreadsheet] = {}
+        self.http_client = _FakeHTTPClient(self)
+
+    def simulate(self, method: str, cells: int) -> None:
+        self.calls[method] += 1
+        delay = self.latency + self.latency_per_1k_cells * cells / 1000.0
+        if delay > 0:
+            time.sleep(delay)
+
+    def open_by_key(self, key: str) -> FakeSpreadsheet:
+        self.simulate("open_by_key", 0)
+        if key not in self.spreadsheets:
+            raise gspread.exceptions.SpreadsheetNotFound(key)
+        return self.spreadsheets[key]
+
+    def add_spreadsheet(self, key: str, tabs: dict[str, list[list[str]]]) -> FakeSpreadsheet:
+        wb = FakeSpreadsheet(self, key)
+        for i, (title, rows) in enumerate(tabs.items()):
+            wb.tabs[title] = FakeWorksheet(wb, title, rows, sheet_id=i)
+        self.spreadsheets[key] = wb
+        return wb
+
+
+def reset_caches() -> None:
+    """Esvazia snapshot, índices, cabeçalho e pool do sheets_client (próxima consulta = arranque a frio)."""
+    from instagram_poster import sheets_client
+
+    sheets_client.invalidate_cache()
+    with sheets_client._snapshot_lock:
+        sheets_client._header_key = None
+        sheets_client._header_map = {}
+        sheets_client._known_row_count = 0
+        sheets_client._drive_marker_last = None
+
+
+def install(
+    rows: list[list[str]], latency: float = 0.0, latency_per_1k_cells: float = 0.0
+) -> FakeWorksheet:
+    """
+    Liga o sheets_client a um Sheet em memória com estas linhas no separador SHEET_TAB_NAME.
+    Devolve o worksheet (ws.rows tem o conteúdo; ws.calls conta os pedidos por método).
+    """
+    from instagram_poster import sheets_client
+    from instagram_poster.config import SHEET_TAB_NAME, get_ig_sheet_id
+
+    client = FakeClient(latency=latency, latency_per_1k_cells=latency_per_1k_cells)
+    wb = client.add_spreadsheet(get_ig_sheet_id(), {SHEET_TAB_NAME: rows})
+    sheets_client._build_client = lambda: client
+    sheets_client.reset_client_pool()
+    reset_caches()
+    return wb.tabs[SHEET_TAB_NAME]
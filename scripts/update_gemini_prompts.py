@@ -7,9 +7,13 @@ imagem gere apenas um fundo visual. O texto da quote é sobreposto depois via Pi
 
 Requisitos: .env com GOOGLE_SERVICE_ACCOUNT_JSON e IG_SHEET_ID.
 
-Corre: py -m scripts.update_gemini_prompts
+Linhas que já têm Gemini_Prompt são ignoradas (usa --force para regenerar). As conversões correm
+em paralelo e os resultados são gravados em lotes (um pedido ao Sheet por lote).
+
+Corre: py -m scripts.update_gemini_prompts [--force] [--workers 4] [--batch-size 50]
 (ou: python scripts/update_gemini_prompts.py)
 """
+import argparse
 import sys
 from pathlib import Path
 
@@ -17,26 +21,28 @@ sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
 
 def main():
-    from instagram_poster.image_generator import _quote_to_scene_prompt
-    from instagram_poster.sheets_client import get_all_rows_with_image_text, update_gemini_prompt
-
-    rows = get_all_rows_with_image_text()
-    if not rows:
-        print("Nenhuma linha com Image Text encontrada.")
+    from instagram_poster.prompt_backfill import backfill_gemini_prompts
+
+    parser = argparse.ArgumentParser(description="Preencher Gemini_Prompt no Sheet a partir da Image Text.")
+    parser.add_argument("--force", action="store_true", help="Regenerar também as linhas que já têm Gemini_Prompt.")
+    parser.add_argument("--workers", type=int, default=4, help="Conversões LLM em paralelo (default: 4).")
+    parser.add_argument("--batch-size", type=int, default=50, help="Linhas gravadas por pedido ao Sheet (default: 50).")
+    args = parser.parse_args()
+
+    def progress(done: int, total: int) -> None:
+        print(f"  {done}/{total} convertidas", end="\r", flush=True)
+
+    result = backfill_gemini_prompts(
+        force=args.force, max_workers=args.workers, batch_size=args.batch_size, on_progress=progress
+    )
+    if not result["total"]:
+        print(f"Nada a converter ({result['skipped']} linha(s) já com Gemini_Prompt; usa --force para regenerar).")
         return
-
-    print(f"A converter quotes em descrições visuais para {len(rows)} linhas...")
-    ok = 0
-    for rec in rows:
-        image_text = (rec.get("image_text") or "").strip()
-        if not image_text:
-            continue
-        row_index = rec["row_index"]
-        scene_prompt = _quote_to_scene_prompt(image_text)
-        update_gemini_prompt(row_index, scene_prompt)
-        ok += 1
-        print(f"  Linha {row_index} ({rec.get('date')}): OK")
-    print(f"Concluído — {ok} linhas actualizadas.")
+    print()
+    print(
+        f"Concluído — {result['updated']} linhas actualizadas, {result['skipped']} ignoradas, "
+        f"{result['failed']} falhadas (tenta de novo para as repetir)."
+    )
 
 
 if __name__ == "__main__":